@@ -1,82 +1,30 @@
 # -*- coding: utf-8 -*-
 """將測站的 TWD97 座標轉換為 WGS84 經緯度,供 NeoDash 地圖使用"""
-from neo4j import GraphDatabase
 import math
+import sys
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from batch_writer import BatchWriter
+from neo4j_connection import Neo4jConnection
+from twd97 import twd97_to_wgs84
 
-class CoordinateConverter:
-    """TWD97 轉 WGS84 座標轉換器"""
 
-    @staticmethod
-    def twd97_to_wgs84(x, y):
-        """
-        TWD97 (TWD97 TM2) 轉 WGS84 經緯度
+UPDATE_COORDINATES = """
+    UNWIND $rows AS row
+    MATCH (s:Station)
+    WHERE id(s) = row.id
+    SET s.latitude = row.lat,
+        s.longitude = row.lon
+"""
 
-        參考: https://github.com/snksos3/twd97-to-wgs84
 
-        Args:
-            x: TWD97 X 座標 (橫座標)
-            y: TWD97 Y 座標 (縱座標)
-
-        Returns:
-            (latitude, longitude) WGS84 經緯度
-        """
-        # TWD97 TM2 投影參數
-        a = 6378137.0  # 長半軸
-        b = 6356752.314245  # 短半軸
-        lon0 = 121.0 * math.pi / 180.0  # 中央子午線 121°E
-        k0 = 0.9999  # 比例因子
-        dx = 250000  # 東偏移
-
-        # 計算 e^2 (第一離心率平方)
-        e = math.pow((1 - math.pow(b, 2) / math.pow(a, 2)), 0.5)
-
-        # 計算 x, y
-        x_real = x - dx
-        y_real = y
-
-        # 計算 M (子午線弧長)
-        M = y_real / k0
-        mu = M / (a * (1.0 - math.pow(e, 2) / 4.0 - 3 * math.pow(e, 4) / 64.0 - 5 * math.pow(e, 6) / 256.0))
-
-        # 計算 e1
-        e1 = (1.0 - math.pow((1.0 - math.pow(e, 2)), 0.5)) / (1.0 + math.pow((1.0 - math.pow(e, 2)), 0.5))
-
-        # 計算 J1-J4
-        J1 = (3 * e1 / 2 - 27 * math.pow(e1, 3) / 32.0)
-        J2 = (21 * math.pow(e1, 2) / 16 - 55 * math.pow(e1, 4) / 32.0)
-        J3 = (151 * math.pow(e1, 3) / 96.0)
-        J4 = (1097 * math.pow(e1, 4) / 512.0)
-
-        # 計算 footprint latitude
-        fp = mu + J1 * math.sin(2 * mu) + J2 * math.sin(4 * mu) + J3 * math.sin(6 * mu) + J4 * math.sin(8 * mu)
-
-        # 計算 e', N, T, C, R, D
-        e_prime = (e * a / b)
-        C1 = math.pow(e_prime, 2) * math.pow(math.cos(fp), 2)
-        T1 = math.pow(math.tan(fp), 2)
-        R1 = a * (1 - math.pow(e, 2)) / math.pow((1 - math.pow(e, 2) * math.pow(math.sin(fp), 2)), (3.0 / 2.0))
-        N1 = a / math.pow((1 - math.pow(e, 2) * math.pow(math.sin(fp), 2)), 0.5)
-        D = x_real / (N1 * k0)
-
-        # 計算 Q1-Q7
-        Q1 = N1 * math.tan(fp) / R1
-        Q2 = (math.pow(D, 2) / 2.0)
-        Q3 = (5 + 3 * T1 + 10 * C1 - 4 * math.pow(C1, 2) - 9 * math.pow(e_prime, 2)) * math.pow(D, 4) / 24.0
-        Q4 = (61 + 90 * T1 + 298 * C1 + 45 * math.pow(T1, 2) - 3 * math.pow(C1, 2) - 252 * math.pow(e_prime, 2)) * math.pow(D, 6) / 720.0
-        Q5 = D
-        Q6 = (1 + 2 * T1 + C1) * math.pow(D, 3) / 6
-        Q7 = (5 - 2 * C1 + 28 * T1 - 3 * math.pow(C1, 2) + 8 * math.pow(e_prime, 2) + 24 * math.pow(T1, 2)) * math.pow(D, 5) / 120.0
-
-        # 計算經緯度 (弧度)
-        lat_rad = fp - Q1 * (Q2 - Q3 + Q4)
-        lon_rad = lon0 + (Q5 - Q6 + Q7) / math.cos(fp)
-
-        # 轉換為度
-        latitude = lat_rad * 180.0 / math.pi
-        longitude = lon_rad * 180.0 / math.pi
-
-        return latitude, longitude
+def _to_float(value):
+    """座標轉為 float（無法解析時為 NaN）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
 
 
 def convert_all_stations():
@@ -86,16 +34,12 @@ def convert_all_stations():
     print("TWD97 → WGS84 座標轉換")
     print("="*80)
 
-    # Neo4j 連線
-    NEO4J_URI = "bolt://localhost:7687"
-    NEO4J_USER = "neo4j"
-    NEO4J_PASSWORD = "geoinfor"
-
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    converter = CoordinateConverter()
+    # Neo4j 連線（設定見 scripts/neo4j_connection.py）
+    connection = Neo4jConnection()
+    writer = BatchWriter(connection, database=connection.database)
 
     try:
-        with driver.session(database="neo4j") as session:
+        with connection.session() as session:
             # 取得所有有座標的測站
             print("\n讀取測站座標...")
             result = session.run("""
@@ -111,37 +55,20 @@ def convert_all_stations():
             stations = list(result)
             print(f"  找到 {len(stations)} 個有座標的測站")
 
-            # 轉換座標
+            # 轉換座標（整批向量化），無法解析為數值的座標為 NaN
             print("\n開始轉換座標...")
-            success_count = 0
-            error_count = 0
-
-            for idx, record in enumerate(stations):
-                try:
-                    station_id = record['id']
-                    name = record['name']
-                    x = float(record['x'])
-                    y = float(record['y'])
-
-                    # 轉換座標
-                    lat, lon = converter.twd97_to_wgs84(x, y)
-
-                    # 更新 Neo4j
-                    session.run("""
-                        MATCH (s:Station)
-                        WHERE id(s) = $id
-                        SET s.latitude = $lat,
-                            s.longitude = $lon
-                    """, id=station_id, lat=lat, lon=lon)
-
-                    success_count += 1
-
-                    if (idx + 1) % 100 == 0:
-                        print(f"  已轉換 {idx + 1}/{len(stations)} 個測站...")
-
-                except Exception as e:
-                    print(f"  [錯誤] 轉換失敗: {name} - {e}")
-                    error_count += 1
+            lon, lat = twd97_to_wgs84([_to_float(record['x']) for record in stations],
+                                      [_to_float(record['y']) for record in stations])
+            rows = []
+            for record, station_lon, station_lat in zip(stations, lon.tolist(), lat.tolist()):
+                if math.isfinite(station_lon) and math.isfinite(station_lat):
+                    rows.append({'id': record['id'], 'lat': station_lat, 'lon': station_lon})
+                else:
+                    print(f"  [錯誤] 轉換失敗: {record['name']} - 座標無效 ({record['x']}, {record['y']})")
+            error_count = len(stations) - len(rows)
+
+            # 更新 Neo4j（UNWIND 批次寫入）
+            success_count = writer.write(UPDATE_COORDINATES, rows, unit="個測站")
 
             print(f"\n[完成] 座標轉換完成!")
             print(f"  成功: {success_count} 個")
@@ -200,7 +127,7 @@ LIMIT 100
         traceback.print_exc()
 
     finally:
-        driver.close()
+        connection.close()
         print("\n已關閉 Neo4j 連線")
 
 
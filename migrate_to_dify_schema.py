@@ -12,26 +12,21 @@ DIFY Schema (更直觀):
 重要: 使用河川代碼 (code) 而非名稱,避免同名河川配對錯誤!
 """
 
-from neo4j import GraphDatabase
+import sys
 import pandas as pd
 from pathlib import Path
 
-NEO4J_URI = "bolt://localhost:7687"
-NEO4J_USER = "neo4j"
-NEO4J_PASSWORD = "geoinfor"
-NEO4J_DATABASE = "neo4j"
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from neo4j_connection import Neo4jConnection
 
 
-class SchemaM migrator:
+class SchemaMigrator:
     """Schema 遷移器"""
 
-    def __init__(self, uri, user, password, database="neo4j"):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, connection, database="neo4j"):
+        self.connection = connection
         self.database = database
 
-    def close(self):
-        self.driver.close()
-
     def backup_current_schema(self):
         """備份當前 Schema 資訊"""
         print("=" * 80)
@@ -39,7 +34,7 @@ class SchemaM migrator:
         print("=" * 80)
         print()
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             # 統計現有關係
             print("現有關係統計:")
 
@@ -66,7 +61,7 @@ class SchemaM migrator:
         print("=" * 80)
         print()
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             # 檢查是否已有 FLOWS_INTO
             result = session.run("""
                 MATCH ()-[r:FLOWS_INTO]->()
@@ -128,7 +123,7 @@ class SchemaM migrator:
         print("=" * 80)
         print()
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             # 檢查是否已有 LOCATED_ON
             result = session.run("""
                 MATCH ()-[r:LOCATED_ON]->()
@@ -170,7 +165,7 @@ class SchemaM migrator:
         print("=" * 80)
         print()
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             # 找出所有跨水系錯誤
             result = session.run("""
                 MATCH (from:River)-[r:FLOWS_INTO]->(to:River)
@@ -207,7 +202,7 @@ class SchemaM migrator:
         print("=" * 80)
         print()
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             # 找出連到多條同名河川的測站
             result = session.run("""
                 MATCH (s:Station)-[:LOCATED_ON]->(r:River)
@@ -277,7 +272,7 @@ class SchemaM migrator:
         print(f"讀取原始河川資料: {excel_path}")
         df = pd.read_excel(excel_path)
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             added_count = 0
             skipped_count = 0
 
@@ -319,7 +314,7 @@ class SchemaM migrator:
         print("=" * 80)
         print()
 
-        with self.driver.session(database=self.database) as session:
+        with self.connection.session(database=self.database) as session:
             # 統計所有關係
             print("關係統計:")
             for rel_type in ['IS_TRIBUTARY_OF', 'MONITORS', 'FLOWS_INTO', 'LOCATED_ON']:
@@ -416,7 +411,9 @@ def main():
         print("取消遷移")
         return
 
-    migrator = SchemaMigrator(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_DATABASE)
+    # 連線設定見 scripts/neo4j_connection.py
+    connection = Neo4jConnection()
+    migrator = SchemaMigrator(connection, connection.database)
 
     try:
         # 步驟 0: 備份當前狀態
@@ -451,7 +448,7 @@ def main():
         delete_old = input("刪除後無法復原! (yes/no): ")
 
         if delete_old.lower() in ['yes', 'y']:
-            with migrator.driver.session(database=migrator.database) as session:
+            with migrator.connection.session(database=migrator.database) as session:
                 result = session.run("MATCH ()-[r:IS_TRIBUTARY_OF]->() DELETE r RETURN count(r) as deleted")
                 deleted1 = result.single()['deleted']
 
@@ -476,7 +473,7 @@ def main():
         traceback.print_exc()
 
     finally:
-        migrator.close()
+        connection.close()
 
 
 if __name__ == "__main__":
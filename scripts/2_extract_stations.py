@@ -3,25 +3,27 @@
 import pandas as pd
 from pathlib import Path
 
+from ingest_schema import STATION_TABLE, normalize
+from report_writer import write_report
+from source_cache import read_excel, sheet_names
+
 def extract_stations():
     """提取水位和氣象測站資料"""
 
-    xl = pd.ExcelFile('data/測站基本資料2025.xlsx')
-
-    print(f"可用的工作表: {xl.sheet_names}")
+    print(f"可用的工作表: {sheet_names('data/測站基本資料2025.xlsx')}")
 
     all_stations = []
 
     # 1. 讀取水位測站 (使用索引而非名稱)
     print("\n讀取水位測站...")
-    df_water = pd.read_excel('data/測站基本資料2025.xlsx', sheet_name=0)  # 第一個工作表
+    df_water = read_excel('data/測站基本資料2025.xlsx', sheet_name=0)  # 第一個工作表
     df_water['測站類型'] = '水位測站'
     all_stations.append(df_water)
     print(f"  水位測站: {len(df_water)} 個")
 
     # 2. 讀取氣象測站 (使用索引而非名稱)
     print("讀取氣象測站...")
-    df_meteor = pd.read_excel('data/測站基本資料2025.xlsx', sheet_name=1)  # 第二個工作表
+    df_meteor = read_excel('data/測站基本資料2025.xlsx', sheet_name=1)  # 第二個工作表
     df_meteor['測站類型'] = '氣象測站'
     all_stations.append(df_meteor)
     print(f"  氣象測站: {len(df_meteor)} 個")
@@ -32,11 +34,9 @@ def extract_stations():
 
     # 清理文字欄位的空白（重要！測站資料的欄位後面有很多空白）
     print("\n清理資料（移除空白）...")
-    text_columns = ['測站名稱', '水系', '河川', '管理單位', '地址']
-    for col in text_columns:
-        if col in df_all.columns:
-            df_all[col] = df_all[col].apply(lambda x: str(x).strip() if pd.notna(x) and x != 'nan' else x)
-            print(f"  已清理 {col} 欄位")
+    # 依測站綱要整欄轉換：文字欄位去除空白、重複值多的欄位轉為類別型別、座標與高程轉為數值
+    df_all = normalize(df_all, STATION_TABLE, name='測站基本資料')
+    print(f"  已清理 {len(df_all.columns)} 個欄位")
 
     return df_all
 
@@ -83,15 +83,8 @@ def save_stations(df, output_path):
     output_path = Path(output_path)
     output_path.parent.mkdir(exist_ok=True)
 
-    # 儲存為 Excel
-    df.to_excel(output_path, index=False, engine='openpyxl')
-
-    # 設定凍結窗格
-    from openpyxl import load_workbook
-    wb = load_workbook(output_path)
-    ws = wb.active
-    ws.freeze_panes = 'A2'
-    wb.save(output_path)
+    # 儲存為 Excel（寫出時一併設定凍結窗格）
+    write_report(output_path, {'Sheet1': df})
 
     print(f"\n已儲存至: {output_path}")
     print("已設定標題列凍結")
@@ -1,132 +1,48 @@
 # -*- coding: utf-8 -*-
 """產生完整的配對報表（使用改進的匹配邏輯）"""
 import pandas as pd
-import re
+import time
 from pathlib import Path
 
-def extract_river_names(text):
-    """從河川名稱中提取所有可能的名稱（主名稱+括號內的別名）
-
-    例如：
-    - '乾溪(里仁溪)' -> ['乾溪', '里仁溪']
-    - '那都魯薩溪（老人溪）' -> ['那都魯薩溪', '老人溪']
-    - '東興坑溪【東坑溪】' -> ['東興坑溪', '東坑溪']
-    """
-    if pd.isna(text) or text == '' or text == 'nan':
-        return []
-
-    text = str(text).strip()
-    names = []
-
-    # 提取主名稱（移除所有括號及其內容）
-    main_name = re.sub(r'[\[\]【】\(\)（）].*?[\]\】\)\）]', '', text).strip()
-    if main_name:
-        names.append(main_name)
-
-    # 提取所有括號內的內容
-    brackets = re.findall(r'[\[\【\(\（](.*?)[\]\】\)\）]', text)
-    for bracket_content in brackets:
-        bracket_content = bracket_content.strip()
-        if bracket_content:
-            names.append(bracket_content)
-
-    return names
-
-def build_river_name_mapping(rivers_df):
-    """建立河川名稱到河川資訊的映射（包含所有別名）
-
-    Returns:
-        dict: {河川名稱變體: (原始河川名稱, 河川代碼, DataFrame索引)}
-    """
-    mapping = {}
-
-    for idx, row in rivers_df.iterrows():
-        original_name = row['河川名稱']
-        river_code = row['河川代碼']
-
-        # 提取所有可能的名稱
-        all_names = extract_river_names(original_name)
-
-        for name in all_names:
-            if name not in mapping:
-                mapping[name] = (original_name, river_code, idx)
-
-    return mapping
-
-def match_station_to_river(station_river, river_mapping):
-    """將測站的河川名稱匹配到河川資料
-
-    Args:
-        station_river: 測站的河川名稱
-        river_mapping: 河川名稱映射字典
-
-    Returns:
-        tuple: (是否匹配, 匹配的河川名稱, 河川代碼, 匹配方式)
-    """
-    if pd.isna(station_river) or station_river == '' or station_river == 'nan':
-        return (False, None, None, '河川欄位為空')
-
-    station_river = str(station_river).strip()
-
-    # 1. 直接匹配
-    if station_river in river_mapping:
-        matched_name, river_code, _ = river_mapping[station_river]
-        return (True, matched_name, river_code, '直接匹配')
-
-    # 2. 提取測站河川的所有可能名稱並嘗試匹配
-    station_names = extract_river_names(station_river)
-    for name in station_names:
-        if name in river_mapping:
-            matched_name, river_code, _ = river_mapping[name]
-            return (True, matched_name, river_code, '別名匹配')
-
-    # 3. 無法匹配
-    return (False, None, None, '無法匹配')
+from ingest_schema import RIVER, STATION_TABLE, normalize
+from report_writer import ReportWriter
+from river_alias_index import load_alias_index
+from river_fuzzy_index import FuzzyRiverIndex
+from river_matching import classify_unmatched, match_stations, station_counts
+from river_nearest_index import RIVER_BOUNDARY_POINTS, NearestRiverIndex, load_boundary_points
+from source_cache import read_excel
 
 def generate_complete_report_improved():
     """產生完整配對報表（使用改進的匹配邏輯）"""
 
     print("讀取資料...")
-    stations = pd.read_excel('data/測站資料_水位與氣象.xlsx')
-    rivers = pd.read_excel('data/河川關係_完整版.xlsx')
+    stations = normalize(read_excel('data/測站資料_水位與氣象.xlsx'), STATION_TABLE, name='測站資料')
+    rivers = normalize(read_excel('data/河川關係_完整版.xlsx'), RIVER, name='河川關係表')
 
     print(f"測站數量: {len(stations)}")
     print(f"河川數量: {len(rivers)}")
 
-    # 建立河川名稱映射
-    print("\n建立河川名稱映射（包含別名）...")
-    river_mapping = build_river_name_mapping(rivers)
-    print(f"河川名稱變體總數: {len(river_mapping)}")
+    # 河川名稱變體對照表（讀取編譯好的別名索引，河川關係表變動時自動重建）
+    print("\n讀取河川別名索引（包含別名）...")
+    t0 = time.perf_counter()
+    alias_index = load_alias_index()
+    variant_index = alias_index.variant_frame()
+    print(f"河川名稱變體總數: {len(variant_index)}")
 
-    # 對測站進行匹配
+    # 對測站進行匹配（欄式運算，一次處理所有測站）
     print("執行改進的匹配...")
-    match_results = []
-    for idx, row in stations.iterrows():
-        station_river = row.get('河川', None)
-        is_matched, matched_name, river_code, match_type = match_station_to_river(
-            station_river, river_mapping
-        )
-        match_results.append({
-            'is_matched': is_matched,
-            'matched_river': matched_name,
-            'river_code': river_code,
-            'match_type': match_type
-        })
-
-    # 添加到資料框
-    stations['能否配對'] = [r['is_matched'] for r in match_results]
-    stations['匹配的河川'] = [r['matched_river'] for r in match_results]
-    stations['河川代碼'] = [r['river_code'] for r in match_results]
-    stations['匹配方式'] = [r['match_type'] for r in match_results]
+    station_rivers = stations['河川'] if '河川' in stations.columns else pd.Series(None, index=stations.index)
+    matches = match_stations(station_rivers, variant_index)
+    for col in matches.columns:
+        stations[col] = matches[col]
 
     matched_stations = stations[stations['能否配對']].copy()
     unmatched_stations = stations[~stations['能否配對']].copy()
 
     # 建立河川與測站的對應關係（使用匹配的河川名稱）
-    rivers['測站數量'] = rivers['河川名稱'].apply(
-        lambda x: len(matched_stations[matched_stations['匹配的河川'] == x])
-    )
+    rivers['測站數量'] = station_counts(rivers['河川名稱'], matched_stations['匹配的河川'])
     rivers['有測站'] = rivers['測站數量'] > 0
+    print(f"配對耗時: {time.perf_counter() - t0:.3f} 秒")
 
     rivers_without_stations_df = rivers[rivers['測站數量'] == 0].copy()
     rivers_with_stations_df = rivers[rivers['測站數量'] > 0].copy()
@@ -142,20 +58,32 @@ def generate_complete_report_improved():
         print(f"  {match_type}: {count} ({count/len(matched_stations)*100:.1f}%)")
 
     # 分類無法配對的測站
-    def classify_reason(row):
-        river = row['河川']
-        if pd.isna(river) or river == '' or river == 'nan':
-            return '河川欄位為空'
-        elif '排水' in river:
-            return '排水系統'
-        elif '圳' in river or '溝' in river:
-            return '灌溉渠道'
-        elif river in ['0000', '??']:
-            return '資料錯誤'
-        else:
-            return '其他（可能是小支流）'
-
-    unmatched_stations['無法配對原因'] = unmatched_stations.apply(classify_reason, axis=1)
+    unmatched_stations['無法配對原因'] = classify_unmatched(unmatched_stations['河川'])
+
+    # 無法配對測站的候選河川（bigram 索引 + 編輯距離，依水系與站號前綴限縮）
+    print("\n搜尋無法配對測站的候選河川...")
+    t0 = time.perf_counter()
+    fuzzy_index = FuzzyRiverIndex(alias_index)
+    suggestions = fuzzy_index.suggest_frame(unmatched_stations)
+    elapsed = time.perf_counter() - t0
+    suggested_count = suggestions['source'].nunique()
+    print(f"有候選建議的測站: {suggested_count} / {len(unmatched_stations)}"
+          f"（{elapsed:.3f} 秒，平均每站 {elapsed / max(len(unmatched_stations), 1) * 1000:.2f} 毫秒）")
+
+    # 測站鄰近河川（河川邊界點 KD-tree），檢查名稱配對結果並補充無法配對的測站
+    nearest = None
+    if RIVER_BOUNDARY_POINTS.exists():
+        print("\n搜尋測站鄰近河川（河川邊界點）...")
+        t0 = time.perf_counter()
+        boundary_points, unresolved = load_boundary_points(alias_index)
+        nearest = NearestRiverIndex(boundary_points).cross_check(stations)
+        elapsed = time.perf_counter() - t0
+        print(f"河川邊界點: {len(boundary_points)} 個（{len(unresolved)} 個河川名稱對應不到河川代碼）")
+        checked = nearest.drop_duplicates('source')['比對結果'].value_counts()
+        print(f"有鄰近河川的測站: {nearest['source'].nunique()} / {len(stations)}（{elapsed:.3f} 秒）"
+              f" 一致 {checked.get('一致', 0)}、不一致 {checked.get('不一致', 0)}、補充 {checked.get('補充', 0)}")
+    else:
+        print(f"\n[INFO] 找不到河川邊界點 {RIVER_BOUNDARY_POINTS}，略過鄰近河川檢查")
 
     # 按主流水系和階層排序
     rivers_without_stations_df = rivers_without_stations_df.sort_values(['主流水系', '階層', '河川名稱'])
@@ -248,51 +176,63 @@ def generate_complete_report_improved():
     output_path = Path('data/測站河川配對分析報表.xlsx')
     print(f"\n正在產生報表: {output_path}")
 
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+    with ReportWriter(output_path) as writer:
         # 工作表1: 摘要統計
-        summary_df.to_excel(writer, sheet_name='摘要統計', index=False)
+        writer.write_sheet(summary_df, '摘要統計')
 
         # 工作表2: 能配對的測站
-        matched_cols = ['測站名稱', '測站編號', '編號', '測站類型', '水系', '河川',
+        matched_cols = ['站號', '站名', '測站類型', '流域', '河川',
                        '匹配的河川', '河川代碼', '匹配方式', '管理單位', '高程(m)']
         matched_cols = [c for c in matched_cols if c in matched_stations.columns]
         matched_output = matched_stations[matched_cols].copy()
 
         # 只按存在的欄位排序
-        sort_cols = [c for c in ['水系', '匹配的河川', '測站名稱'] if c in matched_output.columns]
+        sort_cols = [c for c in ['流域', '匹配的河川', '站名'] if c in matched_output.columns]
         if sort_cols:
             matched_output = matched_output.sort_values(sort_cols)
 
-        matched_output.to_excel(writer, sheet_name='能配對的測站', index=False)
+        writer.write_sheet(matched_output, '能配對的測站')
 
         # 工作表3: 無法配對的測站
-        unmatched_cols = ['測站名稱', '測站編號', '編號', '測站類型', '水系', '河川',
+        unmatched_cols = ['站號', '站名', '測站類型', '流域', '河川',
                          '無法配對原因', '管理單位', '高程(m)']
         unmatched_cols = [c for c in unmatched_cols if c in unmatched_stations.columns]
         unmatched_output = unmatched_stations[unmatched_cols].copy()
 
         # 只按存在的欄位排序
-        sort_cols = [c for c in ['無法配對原因', '測站名稱'] if c in unmatched_output.columns]
+        sort_cols = [c for c in ['無法配對原因', '站名'] if c in unmatched_output.columns]
         if sort_cols:
             unmatched_output = unmatched_output.sort_values(sort_cols)
 
-        unmatched_output.to_excel(writer, sheet_name='無法配對的測站', index=False)
+        writer.write_sheet(unmatched_output, '無法配對的測站')
 
         # 工作表4: 已配對的河川
         river_cols = ['河川名稱', '河川代碼', '階層', '主流水系', '測站數量']
-        rivers_with_stations_df[river_cols].to_excel(writer, sheet_name='已配對的河川', index=False)
+        writer.write_sheet(rivers_with_stations_df[river_cols], '已配對的河川')
 
         # 工作表5: 未配對的河川（有待確認）
         river_cols_no_count = ['河川名稱', '河川代碼', '階層', '上游河川', '主流水系']
-        rivers_without_stations_df[river_cols_no_count].to_excel(writer, sheet_name='未配對的河川', index=False)
-
-    # 設定凍結窗格
-    from openpyxl import load_workbook
-    wb = load_workbook(output_path)
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        ws.freeze_panes = 'A2'
-    wb.save(output_path)
+        writer.write_sheet(rivers_without_stations_df[river_cols_no_count], '未配對的河川')
+
+        # 工作表6: 無法配對測站的候選河川（依相似度排序，需人工確認）
+        station_cols = [c for c in ['站號', '站名', '測站類型', '流域', '河川'] if c in unmatched_stations.columns]
+        suggestion_output = unmatched_stations[station_cols].loc[suggestions['source']].reset_index(drop=True)
+        suggestion_output = pd.concat([
+            suggestion_output,
+            suggestions.drop(columns='source').rename(columns={'河川名稱': '建議河川'}).reset_index(drop=True),
+        ], axis=1)
+        writer.write_sheet(suggestion_output, '候選河川建議')
+
+        # 工作表7: 依座標的鄰近河川（與名稱配對交叉檢查）
+        if nearest is not None:
+            station_cols = [c for c in ['站號', '站名', '測站類型', '流域', '河川', '匹配的河川', '河川代碼']
+                            if c in stations.columns]
+            nearest_output = pd.concat([
+                stations[station_cols].loc[nearest['source']].reset_index(drop=True),
+                nearest.drop(columns='source').rename(columns={'河川代碼': '鄰近河川代碼', '河川名稱': '鄰近河川'})
+                .reset_index(drop=True),
+            ], axis=1)
+            writer.write_sheet(nearest_output, '鄰近河川候選')
 
     print(f"\n報表已產生: {output_path}")
     print("\n報表內容:")
@@ -301,6 +241,9 @@ def generate_complete_report_improved():
     print(f"  - 工作表3: 無法配對的測站 ({len(unmatched_stations)} 個)")
     print(f"  - 工作表4: 已配對的河川 ({len(rivers_with_stations_df)} 條)")
     print(f"  - 工作表5: 未配對的河川 ({len(rivers_without_stations_df)} 條) [有待確認]")
+    print(f"  - 工作表6: 候選河川建議 ({suggested_count} 個無法配對的測站，共 {len(suggestions)} 筆建議)")
+    if nearest is not None:
+        print(f"  - 工作表7: 鄰近河川候選 ({nearest['source'].nunique()} 個測站，共 {len(nearest)} 筆候選)")
 
     # 顯示摘要
     print("\n" + "=" * 80)
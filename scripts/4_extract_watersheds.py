@@ -1,69 +1,63 @@
 # -*- coding: utf-8 -*-
 """提取集水區資料並與河川建立關聯"""
 import pandas as pd
-from dbfread import DBF
 from pathlib import Path
 
+from ingest_schema import RIVER, TEXT, WATERSHED_SOURCE, convert, normalize
+from report_writer import ReportWriter
+from source_cache import read_excel
+from watershed_source import WATERSHED_SHAPEFILE, read_watersheds
+
 def read_watershed_data():
-    """讀取集水區 DBF 資料"""
+    """讀取集水區圖層屬性"""
 
     print("讀取集水區資料...")
-    dbf_path = 'file/110年度全臺839子集水區範圍圖_UTF8.dbf'
-    table = DBF(dbf_path, encoding='utf-8')
-
-    # 轉換為 DataFrame
-    df = pd.DataFrame(iter(table))
+    # 只讀取報表需要的屬性欄位（欄式讀取 + Feather 快取，見 watershed_source.py）
+    columns = [field.column for field in WATERSHED_SOURCE]
+    df = normalize(read_watersheds(WATERSHED_SHAPEFILE, columns=columns), WATERSHED_SOURCE,
+                   name=WATERSHED_SHAPEFILE.name)
 
     print(f"集水區數量: {len(df)}")
     print(f"流域數量: {df['BASIN_ID'].nunique()}")
 
     return df
 
+def river_basin_codes(rivers_df):
+    """河川所屬的流域代碼（河川代碼前4碼，代碼不足4碼者不列入）
+
+    Returns:
+        DataFrame: 流域代碼、河川名稱、河川代碼、主流水系、階層（河川表順序）
+    """
+    river_codes = rivers_df['河川代碼'].astype(str)
+    rivers = rivers_df[river_codes.str.len() >= 4]
+    return pd.DataFrame({
+        '流域代碼': river_codes[rivers.index].str[:4],
+        '河川名稱': rivers['河川名稱'],
+        '河川代碼': river_codes[rivers.index],
+        '主流水系': rivers['主流水系'],
+        '階層': rivers['階層'],
+    }).reset_index(drop=True)
+
 def match_watersheds_to_rivers(watersheds_df, rivers_df):
-    """將集水區與河川建立關聯"""
+    """將集水區與河川建立關聯（欄式運算，一次處理所有集水區）"""
 
     print("\n建立集水區與河川的關聯...")
 
-    # 建立河川代碼到河川名稱的映射（使用前4碼）
-    river_mapping = {}
-    for idx, row in rivers_df.iterrows():
-        river_code = str(row['河川代碼'])
-        river_name = row['河川名稱']
-        main_stream = row['主流水系']
-        level = row['階層']
-
-        # 提取前4碼作為流域代碼
-        if len(river_code) >= 4:
-            basin_code = river_code[:4]
-            if basin_code not in river_mapping:
-                river_mapping[basin_code] = []
-            river_mapping[basin_code].append({
-                '河川名稱': river_name,
-                '河川代碼': river_code,
-                '主流水系': main_stream,
-                '階層': level
-            })
+    # 河川依代碼前4碼分組
+    river_basins = river_basin_codes(rivers_df)
+    print(f"河川流域代碼（前4碼）數量: {river_basins['流域代碼'].nunique()}")
 
-    print(f"河川流域代碼（前4碼）數量: {len(river_mapping)}")
+    # 每個流域代碼的河川數與主要河川（階層最小者，同階層取河川表中較前面的）
+    river_counts = river_basins['流域代碼'].value_counts()
+    main_rivers = (river_basins.sort_values('階層', kind='stable')
+                   .drop_duplicates('流域代碼').set_index('流域代碼')['河川名稱'])
 
-    # 為每個集水區匹配河川
-    watersheds_df['流域代碼'] = watersheds_df['WS_ID'].apply(lambda x: str(x)[:4] if pd.notna(x) else None)
-
-    # 統計匹配情況
-    matched_count = 0
-    watersheds_df['關聯河川數量'] = 0
-    watersheds_df['主要河川'] = None
-
-    for idx, row in watersheds_df.iterrows():
-        basin_code = row['流域代碼']
-        if basin_code in river_mapping:
-            rivers = river_mapping[basin_code]
-            matched_count += 1
-            watersheds_df.at[idx, '關聯河川數量'] = len(rivers)
-            # 選擇階層最小的（主流）作為主要河川
-            main_river = min(rivers, key=lambda x: x['階層'])
-            watersheds_df.at[idx, '主要河川'] = main_river['河川名稱']
+    # 集水區編號前4碼為流域代碼
+    watersheds_df['流域代碼'] = convert(watersheds_df['WS_ID'], TEXT).str[:4]
+    watersheds_df['關聯河川數量'] = watersheds_df['流域代碼'].map(river_counts).fillna(0).astype(int)
+    watersheds_df['主要河川'] = watersheds_df['流域代碼'].map(main_rivers)
 
+    matched_count = int((watersheds_df['關聯河川數量'] > 0).sum())
     print(f"能匹配到河川的集水區: {matched_count} / {len(watersheds_df)} ({matched_count/len(watersheds_df)*100:.1f}%)")
 
     # 統計每個流域的集水區數量
@@ -77,15 +71,28 @@ def match_watersheds_to_rivers(watersheds_df, rivers_df):
         '關聯河川數量': '關聯河川總數'
     }).sort_values('集水區數量', ascending=False)
 
-    return watersheds_df, basin_stats, river_mapping
-
-def generate_watershed_report(watersheds_df, basin_stats, river_mapping, rivers_df):
+    return watersheds_df, basin_stats, river_basins
+
+def watershed_river_relations(watersheds_df, river_basins):
+    """集水區 - 河川關聯表（以流域代碼一次合併，依集水區ID、河川階層排序）"""
+    linked = watersheds_df[watersheds_df['關聯河川數量'] > 0]
+    relations = linked[['WS_ID', 'WS_NAME', '流域代碼', 'BASIN_NAME']].merge(
+        river_basins, on='流域代碼', how='inner')
+    relations = relations.rename(columns={
+        'WS_ID': '集水區ID',
+        'WS_NAME': '集水區名稱',
+        'BASIN_NAME': '流域名稱',
+        '階層': '河川階層',
+    })[['集水區ID', '集水區名稱', '流域代碼', '流域名稱', '河川代碼', '河川名稱', '河川階層', '主流水系']]
+    return relations.sort_values(['集水區ID', '河川階層'], kind='stable')
+
+def generate_watershed_report(watersheds_df, basin_stats, river_basins, rivers_df):
     """產生集水區分析報表"""
 
     output_path = Path('data/集水區分析報表.xlsx')
     print(f"\n正在產生報表: {output_path}")
 
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+    with ReportWriter(output_path) as writer:
         # 工作表1: 摘要統計
         summary_data = []
 
@@ -122,7 +129,7 @@ def generate_watershed_report(watersheds_df, basin_stats, river_mapping, rivers_
         })
         summary_data.append({
             '項目': '流域代碼匹配數',
-            '數量': len(river_mapping),
+            '數量': river_basins['流域代碼'].nunique(),
             '備註': '可與河川代碼前4碼匹配'
         })
 
@@ -137,58 +144,33 @@ def generate_watershed_report(watersheds_df, basin_stats, river_mapping, rivers_
             })
 
         summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='摘要統計', index=False)
+        writer.write_sheet(summary_df, '摘要統計')
 
         # 工作表2: 集水區列表
         ws_cols = ['WS_ID', 'WS_NAME', 'BASIN_ID', 'BASIN_NAME', 'AREA_M2',
                    '流域代碼', '關聯河川數量', '主要河川', 'BRANCH']
         ws_output = watersheds_df[ws_cols].copy()
         ws_output = ws_output.sort_values(['BASIN_ID', 'WS_ID'])
-        ws_output.to_excel(writer, sheet_name='集水區列表', index=False)
+        writer.write_sheet(ws_output, '集水區列表')
 
         # 工作表3: 流域統計
         basin_stats_output = basin_stats.copy()
         basin_stats_output['平均集水區面積(km2)'] = basin_stats_output['總面積(m2)'] / basin_stats_output['集水區數量'] / 1e6
         basin_stats_output['總面積(km2)'] = basin_stats_output['總面積(m2)'] / 1e6
         basin_stats_output = basin_stats_output.drop('總面積(m2)', axis=1)
-        basin_stats_output.to_excel(writer, sheet_name='流域統計', index=True)
+        writer.write_sheet(basin_stats_output, '流域統計', index=True)
 
         # 工作表4: 集水區-河川關聯表
-        relation_data = []
-        for idx, row in watersheds_df[watersheds_df['關聯河川數量'] > 0].iterrows():
-            basin_code = row['流域代碼']
-            if basin_code in river_mapping:
-                for river in river_mapping[basin_code]:
-                    relation_data.append({
-                        '集水區ID': row['WS_ID'],
-                        '集水區名稱': row['WS_NAME'],
-                        '流域代碼': basin_code,
-                        '流域名稱': row['BASIN_NAME'],
-                        '河川代碼': river['河川代碼'],
-                        '河川名稱': river['河川名稱'],
-                        '河川階層': river['階層'],
-                        '主流水系': river['主流水系']
-                    })
-
-        if relation_data:
-            relation_df = pd.DataFrame(relation_data)
-            relation_df = relation_df.sort_values(['集水區ID', '河川階層'])
-            relation_df.to_excel(writer, sheet_name='集水區-河川關聯', index=False)
-
-    # 設定凍結窗格
-    from openpyxl import load_workbook
-    wb = load_workbook(output_path)
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        ws.freeze_panes = 'A2'
-    wb.save(output_path)
+        relation_df = watershed_river_relations(watersheds_df, river_basins)
+        if not relation_df.empty:
+            writer.write_sheet(relation_df, '集水區-河川關聯')
 
     print(f"\n報表已產生: {output_path}")
     print("\n報表內容:")
     print("  - 工作表1: 摘要統計")
     print(f"  - 工作表2: 集水區列表 ({len(watersheds_df)} 個)")
     print(f"  - 工作表3: 流域統計 ({len(basin_stats)} 個)")
-    print(f"  - 工作表4: 集水區-河川關聯 ({len(relation_data)} 筆關係)")
+    print(f"  - 工作表4: 集水區-河川關聯 ({len(relation_df)} 筆關係)")
 
     # 顯示摘要
     print("\n" + "=" * 80)
@@ -209,14 +191,14 @@ def main():
 
     # 2. 讀取河川資料
     print("\n讀取河川資料...")
-    rivers = pd.read_excel('data/河川關係_完整版.xlsx')
+    rivers = normalize(read_excel('data/河川關係_完整版.xlsx'), RIVER, name='河川關係表')
     print(f"河川數量: {len(rivers)}")
 
     # 3. 建立關聯
-    watersheds, basin_stats, river_mapping = match_watersheds_to_rivers(watersheds, rivers)
+    watersheds, basin_stats, river_basins = match_watersheds_to_rivers(watersheds, rivers)
 
     # 4. 產生報表
-    generate_watershed_report(watersheds, basin_stats, river_mapping, rivers)
+    generate_watershed_report(watersheds, basin_stats, river_basins, rivers)
 
     print("\n" + "=" * 80)
     print("完成！")
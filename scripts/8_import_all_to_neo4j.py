@@ -4,278 +4,425 @@
 整合河川、集水區、測站匯入功能
 
 使用方式:
-    python 8_import_all_to_neo4j.py              # 互動模式
-    python 8_import_all_to_neo4j.py --auto-clear # 自動清空重建
+    python 8_import_all_to_neo4j.py                     # 互動模式
+    python 8_import_all_to_neo4j.py --auto-clear        # 自動清空重建
+    python 8_import_all_to_neo4j.py --auto-clear --clear-batch-size 50000  # 清空時每個交易刪除筆數
+    python 8_import_all_to_neo4j.py --batch-size 5000   # 每個交易寫入筆數
+    python 8_import_all_to_neo4j.py --offline-build     # 產生 neo4j-admin 匯入用 CSV
+    python 8_import_all_to_neo4j.py --incremental       # 只同步有變動的資料（不清空）
+    python 8_import_all_to_neo4j.py --workers 8         # 平行匯入的工作執行緒數
+    python 8_import_all_to_neo4j.py --async-relations   # 關係依水系分區以非同步連線平行寫入
+    python 8_import_all_to_neo4j.py --metrics-report data/run.json  # 效能統計 JSON 輸出路徑
+
+連線設定由環境變數 / .env 讀取（NEO4J_URI、NEO4J_USER、NEO4J_PASSWORD 與連線池設定，
+詳見 neo4j_connection.py）
 """
+import argparse
 import sys
+import time
 import pandas as pd
 from pathlib import Path
-from neo4j import GraphDatabase
+
+from async_relation_writer import PartitionedAsyncWriter, DEFAULT_CONCURRENCY
+from batch_writer import BatchWriter, DeltaSync, DEFAULT_BATCH_SIZE, content_hashes, dataframe_to_rows
+from import_metrics import ImportMetrics
+from ingest_schema import (BASIN_STATS, KEY, MATCHED_STATION, RAINFALL_STATION, RIVER, TEXT,
+                           WATER_LEVEL_STATION, WATERSHED_LIST, WATERSHED_RIVER, convert, normalize,
+                           optional, select)
+from neo4j_connection import Neo4jConnection
+from river_alias_index import load_alias_index
+from source_cache import read_excel
+from stage_scheduler import Stage, run_stages
+from station_watershed_join import WatershedLocator, station_points
+from watershed_source import WATERSHED_SHAPEFILE, read_watersheds, source_files
+
+
+# 資料檔案
+RIVER_EXCEL = Path("data/河川關係_完整版.xlsx")
+WATERSHED_EXCEL = Path("data/集水區分析報表.xlsx")
+STATION_EXCEL = Path("data/測站基本資料2025.xlsx")
+MATCHING_REPORT = Path("data/測站河川配對分析報表.xlsx")
+OFFLINE_BUILD_DIR = Path("data/neo4j_import")
+METRICS_REPORT = Path("data/import_metrics.json")
+
+# 清空資料庫: 每個交易刪除的筆數；節點數超過門檻時先移除一般索引，
+# 清空後再重建（大量刪除時逐筆維護索引比清空後重建慢）
+CLEAR_BATCH_SIZE = 10000
+INDEX_REBUILD_THRESHOLD = 500000
 
 
 # =============================================================================
 # 資料清理工具
 # =============================================================================
 
-def clean_dataframe(df):
-    """清理 DataFrame：去除欄位名稱和字串值的空格"""
-    df.columns = df.columns.str.strip()
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            df[col] = df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
-    return df
+def read_source(path, fields, sheet_name=0):
+    """讀取工作表並套用欄位綱要（見 ingest_schema.py）
+
+    字串去除空白、代碼正規化（去除空白、轉大寫，查詢可直接以 {code: $code}
+    走唯一約束的索引）與數值轉換都在讀取時以整欄運算完成，各匯入器直接依欄位名稱取用
+    """
+    return normalize(read_excel(path, sheet_name=sheet_name), fields,
+                     name=f"{Path(path).name} [{sheet_name}]")
+
+
+# =============================================================================
+# 匯入器基底類別
+# =============================================================================
+
+class BaseImporter:
+    """匯入器基底類別 - 批次寫入與增量同步
+
+    所有匯入器共用同一個 Neo4jConnection（同一個連線池），連線由呼叫端關閉；
+    傳入 metrics (ImportMetrics) 時記錄每次查詢的耗時、筆數與 counters
+
+    incremental=True 時不重建資料，改以內容指紋比對只寫入差異；
+    關係直接以 DIFY Schema（FLOWS_INTO / LOCATED_ON）寫入
+
+    async_relations 為同時寫入的分區數時，關係改依水系 / 流域分區，
+    以非同步連線平行寫入（增量模式不適用）
+    """
+
+    def __init__(self, connection, batch_size=DEFAULT_BATCH_SIZE, incremental=False,
+                 async_relations=None, metrics=None):
+        self.connection = connection
+        self.writer = BatchWriter(connection, batch_size=batch_size, metrics=metrics)
+        self.delta = DeltaSync(self.writer) if incremental else None
+        self.relation_writer = None
+        if async_relations and not incremental:
+            self.relation_writer = PartitionedAsyncWriter(connection, batch_size=batch_size,
+                                                          max_concurrency=async_relations,
+                                                          metrics=metrics)
+
+    def create_schema(self):
+        """建立唯一約束與索引
+
+        唯一約束本身即帶有索引，同一屬性若已有舊版的一般索引需先移除，
+        否則約束無法建立。Community 版只支援唯一約束（不支援 node key）
+        """
+        for old_index, constraint_query in self.CONSTRAINTS:
+            self.writer.read(f"DROP INDEX {old_index} IF EXISTS")
+            self.writer.read(constraint_query)
+            print(f"  [OK] {constraint_query.split('FOR')[0].strip()}")
+        for idx_query in self.INDEXES:
+            self.writer.read(idx_query)
+            print(f"  [OK] {idx_query.split('FOR')[0].strip()}")
+
+    def write_nodes(self, label, key, frame, query, unit):
+        """寫入節點（query 需設定 content_hash = row.content_hash）"""
+        if self.delta:
+            self.delta.sync_nodes(label, key, frame, query, unit=unit)
+            return len(frame)
+        frame = frame.assign(content_hash=content_hashes(frame).values)
+        return self.writer.write(query, dataframe_to_rows(frame), unit=unit)
+
+    def write_relationships(self, rel_type, start_label, start_key, start_column, frame, query,
+                            unit="條關係", partitions=None):
+        """寫入關係
+
+        partitions: 與 frame 對齊的分區鍵（同一分區的關係共用端點節點），
+                    啟用非同步分區寫入時使用
+        """
+        if self.delta:
+            return self.delta.sync_relationships(rel_type, start_label, start_key, start_column,
+                                                 frame, query, unit=unit)
+        if self.relation_writer and partitions is not None:
+            return self.relation_writer.write(query, frame, partitions, unit=unit)
+        return self.writer.write(query, dataframe_to_rows(frame), unit=unit)
 
 
 # =============================================================================
 # 河川資料匯入器
 # =============================================================================
 
-class RiverImporter:
+class RiverImporter(BaseImporter):
     """河川資料匯入器"""
 
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-
-    def close(self):
-        self.driver.close()
+    # (舊版一般索引名稱, 唯一約束)
+    CONSTRAINTS = [
+        ("river_code", "CREATE CONSTRAINT river_code_unique IF NOT EXISTS FOR (r:River) REQUIRE r.code IS UNIQUE"),
+        ("water_system", "CREATE CONSTRAINT water_system_unique IF NOT EXISTS FOR (w:WaterSystem) REQUIRE w.name IS UNIQUE"),
+        ("river_alias", "CREATE CONSTRAINT river_alias_key_unique IF NOT EXISTS FOR (a:RiverAlias) REQUIRE a.key IS UNIQUE"),
+    ]
+    INDEXES = [
+        "CREATE INDEX river_name IF NOT EXISTS FOR (r:River) ON (r.name)",
+    ]
 
     def create_indexes(self):
-        """建立索引"""
-        print("\n建立河川索引...")
-        indexes = [
-            "CREATE INDEX river_code IF NOT EXISTS FOR (r:River) ON (r.code)",
-            "CREATE INDEX river_name IF NOT EXISTS FOR (r:River) ON (r.name)",
-            "CREATE INDEX water_system IF NOT EXISTS FOR (w:WaterSystem) ON (w.name)",
-        ]
-        with self.driver.session(database="neo4j") as session:
-            for idx_query in indexes:
-                session.run(idx_query)
-                print(f"  [OK] {idx_query.split('FOR')[0].strip()}")
+        """建立約束與索引"""
+        print("\n建立河川約束與索引...")
+        self.create_schema()
+
+    @staticmethod
+    def river_frame(df):
+        """河川節點屬性"""
+        return pd.DataFrame({
+            'code': df['河川代碼'],
+            'name': df['河川名稱'],
+            'level': df['階層'].astype(int),
+            'main_stream': df['主流水系'],
+            'seq_no': df['序號'],
+        })
+
+    @staticmethod
+    def water_system_frame(df):
+        """水系節點屬性"""
+        return pd.DataFrame({'name': [str(ws) for ws in df['主流水系'].dropna().unique()]})
+
+    @staticmethod
+    def belongs_to_frame(df):
+        """河川 -> 水系關係"""
+        linked = df[df['主流水系'].notna()]
+        return pd.DataFrame({
+            'river_code': linked['河川代碼'],
+            'water_system': linked['主流水系'],
+        })
+
+    @staticmethod
+    def hierarchy_frame(df):
+        """支流 -> 上游河川關係（以名稱對應代碼，同名時取最後一筆）"""
+        river_name_to_code = dict(zip(df['河川名稱'], df['河川代碼']))
+        parent_code = df['上游河川'].map(river_name_to_code)
+        linked = df[df['上游河川'].notna() & parent_code.notna()]
+        return pd.DataFrame({
+            'tributary_code': linked['河川代碼'],
+            'main_code': parent_code[linked.index],
+        })
 
     def import_rivers(self, excel_path):
         """匯入河川節點"""
         print(f"\n讀取河川資料: {excel_path}")
-        df = pd.read_excel(excel_path)
-        df = clean_dataframe(df)
+        df = read_source(excel_path, RIVER)
         print(f"  共 {len(df)} 條河川")
 
         print("\n建立河川節點 (River)...")
-        with self.driver.session(database="neo4j") as session:
-            for idx, row in df.iterrows():
-                session.run("""
-                    MERGE (r:River {code: $code})
-                    SET r.name = $name,
-                        r.level = $level,
-                        r.main_stream = $main_stream,
-                        r.seq_no = $seq_no
-                """,
-                    code=str(row['河川代碼']),
-                    name=str(row['河川名稱']),
-                    level=int(row['階層']),
-                    main_stream=str(row['主流水系']) if pd.notna(row['主流水系']) else None,
-                    seq_no=str(row['序號']) if pd.notna(row['序號']) else None
-                )
-                if (idx + 1) % 100 == 0:
-                    print(f"  已匯入 {idx + 1}/{len(df)} 條河川...")
+        self.write_nodes('River', 'code', self.river_frame(df), """
+            UNWIND $rows AS row
+            MERGE (r:River {code: row.code})
+            SET r.name = row.name,
+                r.level = row.level,
+                r.main_stream = row.main_stream,
+                r.seq_no = row.seq_no,
+                r.content_hash = row.content_hash
+        """, unit="條河川")
         print(f"[OK] 完成! 共匯入 {len(df)} 個河川節點")
 
     def import_water_systems(self, excel_path):
         """匯入水系節點並建立河川與水系的關係"""
         print(f"\n建立水系節點與關係...")
-        df = pd.read_excel(excel_path)
-        df = clean_dataframe(df)
+        df = read_source(excel_path, RIVER)
 
-        water_systems = df['主流水系'].dropna().unique()
+        water_systems = self.water_system_frame(df)
         print(f"  發現 {len(water_systems)} 個水系")
 
-        with self.driver.session(database="neo4j") as session:
-            for ws in water_systems:
-                session.run("MERGE (w:WaterSystem {name: $name})", name=str(ws))
+        self.write_nodes('WaterSystem', 'name', water_systems, """
+            UNWIND $rows AS row
+            MERGE (w:WaterSystem {name: row.name})
+            SET w.content_hash = row.content_hash
+        """, unit="個水系")
         print(f"[OK] 已建立 {len(water_systems)} 個水系節點")
 
         print("\n建立河川 BELONGS_TO 水系關係...")
-        with self.driver.session(database="neo4j") as session:
-            count = 0
-            for idx, row in df.iterrows():
-                if pd.notna(row['主流水系']):
-                    session.run("""
-                        MATCH (r:River {code: $river_code})
-                        MATCH (w:WaterSystem {name: $water_system})
-                        MERGE (r)-[:BELONGS_TO]->(w)
-                    """,
-                        river_code=str(row['河川代碼']),
-                        water_system=str(row['主流水系'])
-                    )
-                    count += 1
+        belongs_to = self.belongs_to_frame(df)
+        count = self.write_relationships('BELONGS_TO', 'River', 'code', 'river_code', belongs_to, """
+            UNWIND $rows AS row
+            MATCH (r:River {code: row.river_code})
+            MATCH (w:WaterSystem {name: row.water_system})
+            MERGE (r)-[:BELONGS_TO]->(w)
+        """, partitions=belongs_to['water_system'])
         print(f"[OK] 已建立 {count} 條河川-水系關係")
 
     def import_river_hierarchy(self, excel_path):
         """匯入河川階層關係 (支流 -> 主流)"""
-        print("\n建立河川階層關係 (IS_TRIBUTARY_OF)...")
-        df = pd.read_excel(excel_path)
-        df = clean_dataframe(df)
+        df = read_source(excel_path, RIVER)
+        hierarchy = self.hierarchy_frame(df)
+
+        if self.delta:
+            print("\n建立河川流向關係 (FLOWS_INTO)...")
+            count = self.write_relationships('FLOWS_INTO', 'River', 'code', 'tributary_code',
+                                             hierarchy, """
+                UNWIND $rows AS row
+                MATCH (tributary:River {code: row.tributary_code})
+                MATCH (main:River {code: row.main_code})
+                MERGE (tributary)-[:FLOWS_INTO]->(main)
+            """)
+        else:
+            print("\n建立河川階層關係 (IS_TRIBUTARY_OF)...")
+            # 支流與主流同屬一個水系，依主流水系分區
+            count = self.write_relationships('IS_TRIBUTARY_OF', 'River', 'code', 'tributary_code',
+                                             hierarchy, """
+                UNWIND $rows AS row
+                MATCH (tributary:River {code: row.tributary_code})
+                MATCH (main:River {code: row.main_code})
+                MERGE (tributary)-[r:IS_TRIBUTARY_OF]->(main)
+                SET r.level_diff = 1
+            """, partitions=df.loc[hierarchy.index, '主流水系'])
+        print(f"[OK] 已建立 {count} 條河川階層關係")
 
-        river_name_to_code = dict(zip(df['河川名稱'], df['河川代碼']))
+    def import_river_aliases(self, excel_path):
+        """匯入河川別名鍵 (RiverAlias) 與 ALIAS_OF 關係
+
+        鍵集合來自編譯好的別名索引（見 river_alias_index.py），
+        自定義程序以 (:RiverAlias {key: $name}) 走唯一約束的索引找到河川
+        """
+        index = load_alias_index(excel_path)
+        print("\n建立河川別名節點 (RiverAlias)...")
+        aliases = index.alias_frame()
+        self.write_nodes('RiverAlias', 'key', aliases, """
+            UNWIND $rows AS row
+            MERGE (a:RiverAlias {key: row.key})
+            SET a.kind = row.kind,
+                a.collision = row.collision,
+                a.content_hash = row.content_hash
+        """, unit="個別名")
+        print(f"[OK] 已建立 {len(aliases)} 個河川別名節點（{len(index.collisions)} 個對應多條河川）")
+
+        print("\n建立別名 ALIAS_OF 河川關係...")
+        alias_of = self.alias_of_frame(index)
+        count = self.write_relationships('ALIAS_OF', 'RiverAlias', 'key', 'alias_key', alias_of, """
+            UNWIND $rows AS row
+            MATCH (a:RiverAlias {key: row.alias_key})
+            MATCH (r:River {code: row.river_code})
+            MERGE (a)-[rel:ALIAS_OF]->(r)
+            SET rel.rank = row.rank
+        """)
+        print(f"[OK] 已建立 {count} 條別名-河川關係")
 
-        with self.driver.session(database="neo4j") as session:
-            count = 0
-            for idx, row in df.iterrows():
-                if pd.notna(row['上游河川']):
-                    parent_name = str(row['上游河川'])
-                    if parent_name in river_name_to_code:
-                        parent_code = river_name_to_code[parent_name]
-                        session.run("""
-                            MATCH (tributary:River {code: $tributary_code})
-                            MATCH (main:River {code: $main_code})
-                            MERGE (tributary)-[r:IS_TRIBUTARY_OF]->(main)
-                            SET r.level_diff = $level_diff
-                        """,
-                            tributary_code=str(row['河川代碼']),
-                            main_code=str(parent_code),
-                            level_diff=1
-                        )
-                        count += 1
-                if (idx + 1) % 100 == 0:
-                    print(f"  已處理 {idx + 1}/{len(df)} 條河川...")
-        print(f"[OK] 已建立 {count} 條河川階層關係")
+    @staticmethod
+    def alias_of_frame(index):
+        """別名 -> 河川關係（河川代碼與 River 節點相同方式正規化）"""
+        alias_of = index.alias_of_frame()
+        return alias_of.assign(river_code=convert(alias_of['river_code'], KEY))
 
 
 # =============================================================================
 # 集水區資料匯入器
 # =============================================================================
 
-class WatershedImporter:
+class WatershedImporter(BaseImporter):
     """集水區資料匯入器"""
 
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-
-    def close(self):
-        self.driver.close()
+    # (舊版一般索引名稱, 唯一約束)
+    CONSTRAINTS = [
+        ("watershed_id", "CREATE CONSTRAINT watershed_id_unique IF NOT EXISTS FOR (w:Watershed) REQUIRE w.id IS UNIQUE"),
+        ("basin_name", "CREATE CONSTRAINT basin_name_unique IF NOT EXISTS FOR (b:Basin) REQUIRE b.name IS UNIQUE"),
+    ]
+    INDEXES = [
+        "CREATE INDEX watershed_name IF NOT EXISTS FOR (w:Watershed) ON (w.name)",
+        "CREATE INDEX basin_id IF NOT EXISTS FOR (b:Basin) ON (b.id)",
+    ]
 
     def create_indexes(self):
-        """建立索引"""
-        print("\n建立集水區索引...")
-        indexes = [
-            "CREATE INDEX watershed_id IF NOT EXISTS FOR (w:Watershed) ON (w.id)",
-            "CREATE INDEX watershed_name IF NOT EXISTS FOR (w:Watershed) ON (w.name)",
-            "CREATE INDEX basin_id IF NOT EXISTS FOR (b:Basin) ON (b.id)",
-            "CREATE INDEX basin_name IF NOT EXISTS FOR (b:Basin) ON (b.name)",
-        ]
-        with self.driver.session(database="neo4j") as session:
-            for idx_query in indexes:
-                session.run(idx_query)
-                print(f"  [OK] {idx_query.split('FOR')[0].strip()}")
+        """建立約束與索引"""
+        print("\n建立集水區約束與索引...")
+        self.create_schema()
+
+    @staticmethod
+    def basin_frame(df):
+        """流域節點屬性（來源: 流域統計工作表）"""
+        basins = select(df[df['BASIN_NAME'].notna()], BASIN_STATS)
+        return basins.fillna({'watershed_count': 0, 'river_count': 0, 'area_km2': 0.0, 'avg_area_km2': 0.0})
+
+    @staticmethod
+    def watershed_frame(df):
+        """集水區節點屬性（來源: 集水區列表工作表）"""
+        area_m2 = df['AREA_M2'].fillna(0.0).astype(float)
+        return pd.DataFrame({
+            'id': convert(df['WS_ID'], KEY),
+            'name': df['WS_NAME'],
+            'basin_id': convert(df['BASIN_ID'], TEXT),
+            'basin_name': df['BASIN_NAME'],
+            'area_m2': area_m2,
+            'area_km2': area_m2 / 1e6,
+            'basin_code': df['流域代碼'],
+            'river_count': df['關聯河川數量'].fillna(0).astype(int),
+            'main_river': df['主要河川'],
+            'branch': df['BRANCH'],
+        })
+
+    @staticmethod
+    def part_of_frame(df):
+        """集水區 -> 流域關係"""
+        linked = df[df['BASIN_NAME'].notna()]
+        return pd.DataFrame({
+            'ws_id': convert(linked['WS_ID'], KEY),
+            'basin_name': linked['BASIN_NAME'],
+        })
+
+    @staticmethod
+    def contains_river_frame(df):
+        """集水區 -> 河川關係（來源: 集水區-河川關聯工作表）"""
+        return select(df, WATERSHED_RIVER[:3])
 
     def import_basins(self, excel_path):
         """匯入流域節點"""
         print(f"\n讀取流域統計資料: {excel_path}")
-        df = pd.read_excel(excel_path, sheet_name='流域統計')
-        df = clean_dataframe(df)
+        df = read_source(excel_path, BASIN_STATS, sheet_name='流域統計')
         print(f"  共 {len(df)} 個流域")
 
         print("\n建立流域節點 (Basin)...")
-        cols = list(df.columns)
-        with self.driver.session(database="neo4j") as session:
-            for idx, row in df.iterrows():
-                basin_name = str(row[cols[0]]) if pd.notna(row[cols[0]]) else None
-                if basin_name:
-                    session.run("""
-                        MERGE (b:Basin {name: $name})
-                        SET b.watershed_count = $watershed_count,
-                            b.river_count = $river_count,
-                            b.area_km2 = $area_km2,
-                            b.avg_area_km2 = $avg_area_km2
-                    """,
-                        name=basin_name,
-                        watershed_count=int(row[cols[1]]) if pd.notna(row[cols[1]]) else 0,
-                        river_count=int(row[cols[2]]) if pd.notna(row[cols[2]]) else 0,
-                        area_km2=float(row[cols[4]]) if pd.notna(row[cols[4]]) else 0.0,
-                        avg_area_km2=float(row[cols[3]]) if pd.notna(row[cols[3]]) else 0.0
-                    )
+        self.write_nodes('Basin', 'name', self.basin_frame(df), """
+            UNWIND $rows AS row
+            MERGE (b:Basin {name: row.name})
+            SET b.watershed_count = row.watershed_count,
+                b.river_count = row.river_count,
+                b.area_km2 = row.area_km2,
+                b.avg_area_km2 = row.avg_area_km2,
+                b.content_hash = row.content_hash
+        """, unit="個流域")
         print(f"[OK] 已匯入 {len(df)} 個流域節點")
 
     def import_watersheds(self, excel_path):
         """匯入集水區節點"""
         print(f"\n讀取集水區資料...")
-        df = pd.read_excel(excel_path, sheet_name='集水區列表')
-        df = clean_dataframe(df)
+        df = read_source(excel_path, WATERSHED_LIST, sheet_name='集水區列表')
         print(f"  共 {len(df)} 個集水區")
 
         print("\n建立集水區節點 (Watershed)...")
-        with self.driver.session(database="neo4j") as session:
-            for idx, row in df.iterrows():
-                session.run("""
-                    MERGE (w:Watershed {id: $id})
-                    SET w.name = $name,
-                        w.basin_id = $basin_id,
-                        w.basin_name = $basin_name,
-                        w.area_m2 = $area_m2,
-                        w.area_km2 = $area_km2,
-                        w.basin_code = $basin_code,
-                        w.river_count = $river_count,
-                        w.main_river = $main_river,
-                        w.branch = $branch
-                """,
-                    id=str(row['WS_ID']),
-                    name=str(row['WS_NAME']) if pd.notna(row['WS_NAME']) else None,
-                    basin_id=str(row['BASIN_ID']) if pd.notna(row['BASIN_ID']) else None,
-                    basin_name=str(row['BASIN_NAME']) if pd.notna(row['BASIN_NAME']) else None,
-                    area_m2=float(row['AREA_M2']) if pd.notna(row['AREA_M2']) else 0.0,
-                    area_km2=float(row['AREA_M2']) / 1e6 if pd.notna(row['AREA_M2']) else 0.0,
-                    basin_code=str(row['流域代碼']) if pd.notna(row['流域代碼']) else None,
-                    river_count=int(row['關聯河川數量']) if pd.notna(row['關聯河川數量']) else 0,
-                    main_river=str(row['主要河川']) if pd.notna(row['主要河川']) else None,
-                    branch=str(row['BRANCH']) if pd.notna(row['BRANCH']) else None
-                )
-                if (idx + 1) % 100 == 0:
-                    print(f"  已匯入 {idx + 1}/{len(df)} 個集水區...")
+        self.write_nodes('Watershed', 'id', self.watershed_frame(df), """
+            UNWIND $rows AS row
+            MERGE (w:Watershed {id: row.id})
+            SET w.name = row.name,
+                w.basin_id = row.basin_id,
+                w.basin_name = row.basin_name,
+                w.area_m2 = row.area_m2,
+                w.area_km2 = row.area_km2,
+                w.basin_code = row.basin_code,
+                w.river_count = row.river_count,
+                w.main_river = row.main_river,
+                w.branch = row.branch,
+                w.content_hash = row.content_hash
+        """, unit="個集水區")
         print(f"[OK] 已匯入 {len(df)} 個集水區節點")
 
     def link_watersheds_to_basins(self, excel_path):
         """建立集水區 -> 流域關係"""
         print("\n建立集水區 PART_OF 流域關係...")
-        df = pd.read_excel(excel_path, sheet_name='集水區列表')
-        df = clean_dataframe(df)
-
-        with self.driver.session(database="neo4j") as session:
-            count = 0
-            for idx, row in df.iterrows():
-                if pd.notna(row['BASIN_NAME']):
-                    session.run("""
-                        MATCH (w:Watershed {id: $ws_id})
-                        MATCH (b:Basin {name: $basin_name})
-                        MERGE (w)-[:PART_OF]->(b)
-                    """,
-                        ws_id=str(row['WS_ID']),
-                        basin_name=str(row['BASIN_NAME'])
-                    )
-                    count += 1
+        df = read_source(excel_path, WATERSHED_LIST, sheet_name='集水區列表')
+
+        part_of = self.part_of_frame(df)
+        count = self.write_relationships('PART_OF', 'Watershed', 'id', 'ws_id', part_of, """
+            UNWIND $rows AS row
+            MATCH (w:Watershed {id: row.ws_id})
+            MATCH (b:Basin {name: row.basin_name})
+            MERGE (w)-[:PART_OF]->(b)
+        """, partitions=part_of['basin_name'])
         print(f"[OK] 已建立 {count} 條集水區-流域關係")
 
     def link_watersheds_to_rivers(self, excel_path):
         """建立集水區 -> 河川關係"""
         print("\n建立集水區 CONTAINS_RIVER 河川關係...")
-        df = pd.read_excel(excel_path, sheet_name='集水區-河川關聯')
-        df = clean_dataframe(df)
+        df = read_source(excel_path, WATERSHED_RIVER, sheet_name='集水區-河川關聯')
         print(f"  共 {len(df)} 條關聯記錄")
 
-        with self.driver.session(database="neo4j") as session:
-            count = 0
-            for idx, row in df.iterrows():
-                session.run("""
-                    MATCH (w:Watershed {id: $ws_id})
-                    MATCH (r:River {code: $river_code})
-                    MERGE (w)-[rel:CONTAINS_RIVER]->(r)
-                    SET rel.river_level = $river_level
-                """,
-                    ws_id=str(row['集水區ID']),
-                    river_code=str(row['河川代碼']),
-                    river_level=int(row['河川階層']) if pd.notna(row['河川階層']) else None
-                )
-                count += 1
-                if (idx + 1) % 500 == 0:
-                    print(f"  已建立 {idx + 1}/{len(df)} 條關係...")
+        # 每條河川與每個集水區都只屬於一個流域，依流域代碼分區
+        count = self.write_relationships('CONTAINS_RIVER', 'Watershed', 'id', 'ws_id',
+                                         self.contains_river_frame(df), """
+            UNWIND $rows AS row
+            MATCH (w:Watershed {id: row.ws_id})
+            MATCH (r:River {code: row.river_code})
+            MERGE (w)-[rel:CONTAINS_RIVER]->(r)
+            SET rel.river_level = row.river_level
+        """, partitions=df['流域代碼'])
         print(f"[OK] 已建立 {count} 條集水區-河川關係")
 
 
@@ -283,176 +430,152 @@ class WatershedImporter:
 # 測站資料匯入器
 # =============================================================================
 
-class StationImporter:
+class StationImporter(BaseImporter):
     """測站資料匯入器"""
 
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-
-    def close(self):
-        self.driver.close()
+    # (舊版一般索引名稱, 唯一約束)
+    CONSTRAINTS = [
+        ("station_code", "CREATE CONSTRAINT station_code_unique IF NOT EXISTS FOR (s:Station) REQUIRE s.code IS UNIQUE"),
+    ]
+    INDEXES = [
+        "CREATE INDEX station_name IF NOT EXISTS FOR (s:Station) ON (s.name)",
+        "CREATE INDEX station_type IF NOT EXISTS FOR (s:Station) ON (s.type)",
+    ]
 
     def create_indexes(self):
-        """建立索引"""
-        print("\n建立測站索引...")
-        indexes = [
-            "CREATE INDEX station_code IF NOT EXISTS FOR (s:Station) ON (s.code)",
-            "CREATE INDEX station_name IF NOT EXISTS FOR (s:Station) ON (s.name)",
-            "CREATE INDEX station_type IF NOT EXISTS FOR (s:Station) ON (s.type)",
-        ]
-        with self.driver.session(database="neo4j") as session:
-            for idx_query in indexes:
-                session.run(idx_query)
-                print(f"  [OK] {idx_query.split('FOR')[0].strip()}")
+        """建立約束與索引"""
+        print("\n建立測站約束與索引...")
+        self.create_schema()
+
+    @staticmethod
+    def rainfall_frame(df):
+        """雨量測站節點屬性（來源: 測站基本資料第 1 個工作表）"""
+        return select(df, RAINFALL_STATION)
+
+    @staticmethod
+    def water_level_frame(df):
+        """水位測站節點屬性（來源: 測站基本資料第 2 個工作表）"""
+        return select(df, WATER_LEVEL_STATION)
+
+    @staticmethod
+    def station_link_frame(df):
+        """測站 -> 河川關係（來源: 配對報表「能配對的測站」工作表）
+
+        Returns:
+            tuple: (關係 DataFrame, 缺少代碼筆數, 代碼不匹配筆數)
+        """
+        station_code = df['站號']
+        river_code = df['河川代碼']
+
+        # 缺少測站代號或河川代碼者跳過；前 4 碼與前 3 碼皆不同者視為代碼不匹配
+        has_codes = station_code.notna() & river_code.notna()
+        prefix_match = ((station_code.str[:4] == river_code.str[:4]) |
+                        (station_code.str[:3] == river_code.str[:3]))
+        linked = has_codes & prefix_match
+
+        links = select(df[linked], MATCHED_STATION)
+        links['match_type'] = links['match_type'].astype(object).fillna('unknown')
+        return links, int((~has_codes).sum()), int((has_codes & ~prefix_match).sum())
+
+    @staticmethod
+    def located_in_frame(rainfall, water_level, watersheds):
+        """測站 -> 集水區關係（點在多邊形內，見 station_watershed_join.py）
+
+        Args:
+            rainfall / water_level: 測站基本資料第 1 / 2 個工作表
+            watersheds: 集水區圖層（WS_ID 與 geometry）
+        """
+        points = station_points(StationImporter.rainfall_frame(rainfall),
+                                StationImporter.water_level_frame(water_level))
+        locator = WatershedLocator(convert(watersheds['WS_ID'], KEY), watersheds['geometry'])
+        return locator.assign(points)
 
     def import_rainfall_stations(self, excel_path):
         """匯入雨量測站"""
         print(f"\n讀取雨量測站資料: {excel_path}")
-        df = pd.read_excel(excel_path, sheet_name=0)
-        df = clean_dataframe(df)
+        df = read_source(excel_path, RAINFALL_STATION, sheet_name=0)
         print(f"  共 {len(df)} 個雨量測站")
 
         print("\n建立雨量測站節點 (Station:Rainfall)...")
-        cols = list(df.columns)
-        with self.driver.session(database="neo4j") as session:
-            for idx, row in df.iterrows():
-                session.run("""
-                    MERGE (s:Station:Rainfall {code: $code})
-                    SET s.name = $name, s.type = '雨量測站',
-                        s.category = $category, s.status = $status,
-                        s.cwa_code = $cwa_code, s.management_unit = $management_unit,
-                        s.water_system = $water_system, s.river = $river,
-                        s.elevation = $elevation, s.city = $city, s.address = $address,
-                        s.x_twd97 = $x, s.y_twd97 = $y,
-                        s.backup_station_code = $backup_station_code,
-                        s.rainfall_minute_years = $rainfall_minute_years,
-                        s.rainfall_hour_years = $rainfall_hour_years,
-                        s.rainfall_daily_years = $rainfall_daily_years,
-                        s.rainfall_monthly_years = $rainfall_monthly_years
-                """,
-                    code=str(row[cols[2]]) if pd.notna(row[cols[2]]) else None,
-                    name=str(row[cols[4]]) if pd.notna(row[cols[4]]) else None,
-                    category=str(row[cols[0]]) if pd.notna(row[cols[0]]) else None,
-                    status=str(row[cols[1]]) if pd.notna(row[cols[1]]) else None,
-                    cwa_code=str(row[cols[3]]) if pd.notna(row[cols[3]]) else None,
-                    management_unit=str(row[cols[5]]) if pd.notna(row[cols[5]]) else None,
-                    water_system=str(row[cols[6]]) if pd.notna(row[cols[6]]) else None,
-                    river=str(row[cols[7]]) if pd.notna(row[cols[7]]) else None,
-                    elevation=float(row[cols[8]]) if pd.notna(row[cols[8]]) else None,
-                    city=str(row[cols[9]]) if pd.notna(row[cols[9]]) else None,
-                    address=str(row[cols[10]]) if pd.notna(row[cols[10]]) else None,
-                    x=float(row[cols[11]]) if pd.notna(row[cols[11]]) else None,
-                    y=float(row[cols[12]]) if pd.notna(row[cols[12]]) else None,
-                    backup_station_code=str(row[cols[13]]) if pd.notna(row[cols[13]]) else None,
-                    rainfall_minute_years=str(row[cols[14]]) if pd.notna(row[cols[14]]) else None,
-                    rainfall_hour_years=str(row[cols[15]]) if pd.notna(row[cols[15]]) else None,
-                    rainfall_daily_years=str(row[cols[16]]) if pd.notna(row[cols[16]]) else None,
-                    rainfall_monthly_years=str(row[cols[17]]) if pd.notna(row[cols[17]]) else None
-                )
-                if (idx + 1) % 50 == 0:
-                    print(f"  已匯入 {idx + 1}/{len(df)} 個雨量測站...")
+        self.write_nodes('Station:Rainfall', 'code', self.rainfall_frame(df), """
+            UNWIND $rows AS row
+            MERGE (s:Station {code: row.code})
+            SET s:Rainfall,
+                s.name = row.name, s.type = '雨量測站',
+                s.category = row.category, s.status = row.status,
+                s.cwa_code = row.cwa_code, s.management_unit = row.management_unit,
+                s.water_system = row.water_system, s.river = row.river,
+                s.elevation = row.elevation, s.city = row.city, s.address = row.address,
+                s.x_twd97 = row.x, s.y_twd97 = row.y,
+                s.backup_station_code = row.backup_station_code,
+                s.rainfall_minute_years = row.rainfall_minute_years,
+                s.rainfall_hour_years = row.rainfall_hour_years,
+                s.rainfall_daily_years = row.rainfall_daily_years,
+                s.rainfall_monthly_years = row.rainfall_monthly_years,
+                s.content_hash = row.content_hash
+        """, unit="個雨量測站")
         print(f"[OK] 已匯入 {len(df)} 個雨量測站")
 
     def import_water_level_stations(self, excel_path):
         """匯入水位測站"""
         print(f"\n讀取水位測站資料...")
-        df = pd.read_excel(excel_path, sheet_name=1)
-        df = clean_dataframe(df)
+        df = read_source(excel_path, WATER_LEVEL_STATION, sheet_name=1)
         print(f"  共 {len(df)} 個水位測站")
 
         print("\n建立水位測站節點 (Station:WaterLevel)...")
-        cols = list(df.columns)
-        with self.driver.session(database="neo4j") as session:
-            for idx, row in df.iterrows():
-                session.run("""
-                    MERGE (s:Station:WaterLevel {code: $code})
-                    SET s.name = $name, s.type = '水位測站',
-                        s.category = $category, s.status = $status,
-                        s.management_unit = $management_unit,
-                        s.water_system = $water_system, s.river = $river,
-                        s.elevation = $elevation, s.city = $city, s.address = $address,
-                        s.x_twd97 = $x, s.y_twd97 = $y,
-                        s.backup_station_code = $backup_station_code,
-                        s.water_level_hour_years = $water_level_hour_years,
-                        s.water_level_daily_years = $water_level_daily_years,
-                        s.water_level_monthly_years = $water_level_monthly_years,
-                        s.flow_hour_years = $flow_hour_years,
-                        s.flow_daily_years = $flow_daily_years,
-                        s.flow_monthly_years = $flow_monthly_years,
-                        s.sediment_years = $sediment_years
-                """,
-                    code=str(row[cols[2]]) if pd.notna(row[cols[2]]) else None,
-                    name=str(row[cols[3]]) if pd.notna(row[cols[3]]) else None,
-                    category=str(row[cols[0]]) if pd.notna(row[cols[0]]) else None,
-                    status=str(row[cols[1]]) if pd.notna(row[cols[1]]) else None,
-                    management_unit=str(row[cols[4]]) if pd.notna(row[cols[4]]) else None,
-                    water_system=str(row[cols[5]]) if pd.notna(row[cols[5]]) else None,
-                    river=str(row[cols[6]]) if pd.notna(row[cols[6]]) else None,
-                    elevation=float(row[cols[7]]) if pd.notna(row[cols[7]]) else None,
-                    city=str(row[cols[8]]) if pd.notna(row[cols[8]]) else None,
-                    address=str(row[cols[9]]) if pd.notna(row[cols[9]]) else None,
-                    x=float(row[cols[10]]) if pd.notna(row[cols[10]]) else None,
-                    y=float(row[cols[11]]) if pd.notna(row[cols[11]]) else None,
-                    backup_station_code=str(row[cols[12]]) if pd.notna(row[cols[12]]) else None,
-                    water_level_hour_years=str(row[cols[13]]) if pd.notna(row[cols[13]]) else None,
-                    water_level_daily_years=str(row[cols[14]]) if pd.notna(row[cols[14]]) else None,
-                    water_level_monthly_years=str(row[cols[15]]) if pd.notna(row[cols[15]]) else None,
-                    flow_hour_years=str(row[cols[16]]) if pd.notna(row[cols[16]]) else None,
-                    flow_daily_years=str(row[cols[17]]) if pd.notna(row[cols[17]]) else None,
-                    flow_monthly_years=str(row[cols[18]]) if pd.notna(row[cols[18]]) else None,
-                    sediment_years=str(row[cols[19]]) if pd.notna(row[cols[19]]) else None
-                )
-                if (idx + 1) % 50 == 0:
-                    print(f"  已匯入 {idx + 1}/{len(df)} 個水位測站...")
+        self.write_nodes('Station:WaterLevel', 'code', self.water_level_frame(df), """
+            UNWIND $rows AS row
+            MERGE (s:Station {code: row.code})
+            SET s:WaterLevel,
+                s.name = row.name, s.type = '水位測站',
+                s.category = row.category, s.status = row.status,
+                s.management_unit = row.management_unit,
+                s.water_system = row.water_system, s.river = row.river,
+                s.elevation = row.elevation, s.city = row.city, s.address = row.address,
+                s.x_twd97 = row.x, s.y_twd97 = row.y,
+                s.backup_station_code = row.backup_station_code,
+                s.water_level_hour_years = row.water_level_hour_years,
+                s.water_level_daily_years = row.water_level_daily_years,
+                s.water_level_monthly_years = row.water_level_monthly_years,
+                s.flow_hour_years = row.flow_hour_years,
+                s.flow_daily_years = row.flow_daily_years,
+                s.flow_monthly_years = row.flow_monthly_years,
+                s.sediment_years = row.sediment_years,
+                s.content_hash = row.content_hash
+        """, unit="個水位測站")
         print(f"[OK] 已匯入 {len(df)} 個水位測站")
 
     def link_stations_to_rivers(self, matching_report_path):
         """建立測站 -> 河川關係"""
-        print(f"\n建立測站 MONITORS 河川關係...")
-        df = pd.read_excel(matching_report_path, sheet_name='能配對的測站')
-        df = clean_dataframe(df)
+        rel_type = 'LOCATED_ON' if self.delta else 'MONITORS'
+        print(f"\n建立測站 {rel_type} 河川關係...")
+        df = read_source(matching_report_path, MATCHED_STATION, sheet_name='能配對的測站')
         print(f"  共 {len(df)} 個能配對的測站")
 
-        cols = list(df.columns)
-        with self.driver.session(database="neo4j") as session:
-            count = 0
-            skipped = 0
-            code_mismatch = 0
-
-            for idx, row in df.iterrows():
-                station_code = str(row[cols[1]]).strip() if pd.notna(row[cols[1]]) and str(row[cols[1]]).strip() != '' else None
-                river_code = str(row[cols[5]]) if pd.notna(row[cols[5]]) else None
-
-                if station_code and river_code:
-                    station_prefix_4 = station_code[:4]
-                    river_prefix_4 = river_code[:4]
-                    station_prefix_3 = station_code[:3]
-                    river_prefix_3 = river_code[:3]
-
-                    if station_prefix_4 != river_prefix_4 and station_prefix_3 != river_prefix_3:
-                        code_mismatch += 1
-                        continue
-
-                    session.run("""
-                        MATCH (s:Station) WHERE trim(s.code) = $station_code
-                        MATCH (r:River {code: $river_code})
-                        MERGE (s)-[rel:MONITORS]->(r)
-                        SET rel.match_type = $match_type,
-                            rel.original_river_name = $original_river,
-                            rel.matched_river_name = $matched_river
-                    """,
-                        station_code=station_code,
-                        river_code=river_code,
-                        match_type=str(row[cols[6]]) if pd.notna(row[cols[6]]) else 'unknown',
-                        original_river=str(row[cols[3]]) if pd.notna(row[cols[3]]) else None,
-                        matched_river=str(row[cols[4]]) if pd.notna(row[cols[4]]) else None
-                    )
-                    count += 1
-                else:
-                    skipped += 1
-
-                if (idx + 1) % 100 == 0:
-                    print(f"  已處理 {idx + 1}/{len(df)} 條...")
+        links, skipped, code_mismatch = self.station_link_frame(df)
+        if self.delta:
+            count = self.write_relationships('LOCATED_ON', 'Station', 'code', 'station_code', links, """
+                UNWIND $rows AS row
+                MATCH (s:Station {code: row.station_code})
+                MATCH (r:River {code: row.river_code})
+                MERGE (s)-[:LOCATED_ON]->(r)
+            """)
+        else:
+            # 依河川所屬水系分區（來源: 配對報表「已配對的河川」工作表）
+            partitions = None
+            if self.relation_writer:
+                rivers = read_source(matching_report_path, optional(RIVER), sheet_name='已配對的河川')
+                water_systems = dict(zip(rivers['河川代碼'], rivers['主流水系']))
+                partitions = links['river_code'].map(water_systems)
+            count = self.write_relationships('MONITORS', 'Station', 'code', 'station_code', links, """
+                UNWIND $rows AS row
+                MATCH (s:Station {code: row.station_code})
+                MATCH (r:River {code: row.river_code})
+                MERGE (s)-[rel:MONITORS]->(r)
+                SET rel.match_type = row.match_type,
+                    rel.original_river_name = row.original_river,
+                    rel.matched_river_name = row.matched_river
+            """, partitions=partitions)
 
         print(f"[OK] 已建立 {count} 條測站-河川關係")
         if skipped > 0:
@@ -460,56 +583,83 @@ class StationImporter:
         if code_mismatch > 0:
             print(f"[INFO] 過濾 {code_mismatch} 條代碼不匹配")
 
+    def link_stations_to_watersheds(self, excel_path, shapefile=WATERSHED_SHAPEFILE):
+        """建立測站 -> 集水區關係（依測站座標做空間配對）"""
+        print("\n建立測站 LOCATED_IN 集水區關係...")
+        if source_files(shapefile)[0] is None:
+            print(f"  [略過] 找不到集水區圖層幾何: {Path(shapefile).with_suffix('.shp')}")
+            return 0
+
+        rainfall = read_source(excel_path, RAINFALL_STATION, sheet_name=0)
+        water_level = read_source(excel_path, WATER_LEVEL_STATION, sheet_name=1)
+        watersheds = read_watersheds(shapefile, columns=['WS_ID'], geometry=True)
+        start = time.perf_counter()
+        links = self.located_in_frame(rainfall, water_level, watersheds)
+        print(f"  {len(links)} 個測站位於集水區內（空間配對 {(time.perf_counter() - start) * 1000:.1f} ms）")
+
+        # 依集水區所屬流域（集水區 ID 前 4 碼）分區
+        count = self.write_relationships('LOCATED_IN', 'Station', 'code', 'station_code', links, """
+            UNWIND $rows AS row
+            MATCH (s:Station {code: row.station_code})
+            MATCH (w:Watershed {id: row.ws_id})
+            MERGE (s)-[:LOCATED_IN]->(w)
+        """, partitions=links['ws_id'].str[:4])
+        print(f"[OK] 已建立 {count} 條測站-集水區關係")
+        return count
+
 
 # =============================================================================
 # 主匯入器與 Schema 遷移
 # =============================================================================
 
-def migrate_schema(uri, user, password):
+def migrate_schema(connection, metrics=None):
     """Schema 遷移: 轉換為 DIFY 兼容格式
     - IS_TRIBUTARY_OF -> FLOWS_INTO
     - MONITORS -> LOCATED_ON
     """
-    driver = GraphDatabase.driver(uri, auth=(user, password))
+    def run(session, query):
+        if metrics is not None:
+            return metrics.run(session, query)
+        return list(session.run(query))
 
-    with driver.session(database="neo4j") as session:
+    with connection.session(database="neo4j") as session:
         print("  轉換 IS_TRIBUTARY_OF -> FLOWS_INTO...")
-        result = session.run("""
+        result = run(session, """
             MATCH (child:River)-[r:IS_TRIBUTARY_OF]->(parent:River)
             MERGE (child)-[:FLOWS_INTO]->(parent)
             DELETE r
             RETURN count(r) as count
         """)
-        count = result.single()['count']
+        count = result[0]['count']
         print(f"    [OK] 轉換 {count} 條河川支流關係")
 
         print("  轉換 MONITORS -> LOCATED_ON...")
-        result = session.run("""
+        result = run(session, """
             MATCH (s:Station)-[r:MONITORS]->(river:River)
             MERGE (s)-[:LOCATED_ON]->(river)
             DELETE r
             RETURN count(r) as count
         """)
-        count = result.single()['count']
+        count = result[0]['count']
         print(f"    [OK] 轉換 {count} 條測站監測關係")
 
         print("  驗證資料完整性...")
-        result = session.run("""
+        result = run(session, """
             MATCH (s:Station)-[:LOCATED_ON]->(r:River)
-            WITH s, r, trim(s.code) as station_code, r.code as river_code
+            WITH s, r, s.code as station_code, r.code as river_code
             WHERE station_code IS NOT NULL AND river_code IS NOT NULL
               AND left(station_code, 4) <> left(river_code, 4)
               AND left(station_code, 3) <> left(river_code, 3)
             RETURN count(*) as mismatch_count
         """)
-        mismatch = result.single()['mismatch_count']
+        mismatch = result[0]['mismatch_count']
         if mismatch == 0:
             print(f"    [OK] 無代碼不匹配的錯誤")
         else:
             print(f"    [WARNING] 發現 {mismatch} 個代碼不匹配，正在清理...")
-            session.run("""
+            run(session, """
                 MATCH (s:Station)-[r:LOCATED_ON]->(river:River)
-                WITH s, r, river, trim(s.code) as station_code, river.code as river_code
+                WITH s, r, river, s.code as station_code, river.code as river_code
                 WHERE station_code IS NOT NULL AND river_code IS NOT NULL
                   AND left(station_code, 4) <> left(river_code, 4)
                   AND left(station_code, 3) <> left(river_code, 3)
@@ -517,27 +667,20 @@ def migrate_schema(uri, user, password):
             """)
             print(f"    [OK] 已清理代碼不匹配的關係")
 
-    driver.close()
     print("  [OK] Schema 遷移完成")
 
 
 class MasterImporter:
     """主匯入器 - 統一執行所有匯入流程"""
 
-    def __init__(self, uri, user, password):
-        self.uri = uri
-        self.user = user
-        self.password = password
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-
-    def close(self):
-        self.driver.close()
+    def __init__(self, connection):
+        self.connection = connection
 
     def test_connection(self):
         """測試連線"""
         print("\n測試 Neo4j 連線...")
         try:
-            with self.driver.session(database="neo4j") as session:
+            with self.connection.session(database="neo4j") as session:
                 result = session.run("RETURN 1 as test")
                 result.single()
             print("[OK] 連線成功!")
@@ -546,8 +689,12 @@ class MasterImporter:
             print(f"[錯誤] 連線失敗: {e}")
             return False
 
-    def clear_database(self, auto_confirm=False):
-        """清空資料庫"""
+    def clear_database(self, auto_confirm=False, batch_size=CLEAR_BATCH_SIZE):
+        """清空資料庫
+
+        以 CALL { ... } IN TRANSACTIONS 分批刪除：先依類型刪除關係，再依標籤刪除節點，
+        每批各自提交，記憶體用量固定，中途失敗時重新執行即可從剩餘資料繼續
+        """
         print("\n[警告] 清空 Neo4j 資料庫...")
 
         if auto_confirm:
@@ -556,25 +703,76 @@ class MasterImporter:
         else:
             response = input("確定要清空所有資料嗎? 此操作無法復原! (yes/no): ")
 
-        if response.lower() == 'yes':
-            with self.driver.session(database="neo4j") as session:
-                session.run("MATCH (n) DETACH DELETE n")
-            print("[OK] 資料庫已清空")
-            return True
-        else:
+        if response.lower() != 'yes':
             print("[提示] 取消清空，將在現有資料上新增/更新")
             return False
 
+        with self.connection.session(database="neo4j") as session:
+            node_count = session.run("MATCH (n) RETURN count(n) as count").single()["count"]
+            rel_types = [r["relationshipType"] for r in session.run("CALL db.relationshipTypes()")]
+            labels = [r["label"] for r in session.run("CALL db.labels()")]
+
+            dropped = []
+            if node_count > INDEX_REBUILD_THRESHOLD:
+                dropped = self._drop_plain_indexes(session)
+
+            try:
+                for idx, rel_type in enumerate(rel_types, 1):
+                    count = self._delete_in_transactions(session, f"MATCH ()-[r:`{rel_type}`]->()", "r",
+                                                         "DELETE r", batch_size)
+                    print(f"  [清除] ({idx}/{len(rel_types)}) 關係 {rel_type}: {count} 條")
+
+                for idx, label in enumerate(labels, 1):
+                    count = self._delete_in_transactions(session, f"MATCH (n:`{label}`)", "n",
+                                                         "DETACH DELETE n", batch_size)
+                    print(f"  [清除] ({idx}/{len(labels)}) 節點 {label}: {count} 個")
+
+                # 沒有標籤的節點
+                self._delete_in_transactions(session, "MATCH (n)", "n", "DETACH DELETE n", batch_size)
+            finally:
+                for statement in dropped:
+                    session.run(statement)
+                if dropped:
+                    print(f"  [OK] 已重建 {len(dropped)} 個索引")
+
+        print(f"[OK] 資料庫已清空（原有 {node_count} 個節點）")
+        return True
+
+    @staticmethod
+    def _delete_in_transactions(session, match, variable, delete, batch_size):
+        """以 CALL IN TRANSACTIONS 分批刪除，回傳刪除前的筆數"""
+        count = session.run(f"{match} RETURN count({variable}) as count").single()["count"]
+        if count:
+            session.run(f"""
+                {match}
+                CALL {{ WITH {variable} {delete} }} IN TRANSACTIONS OF {batch_size} ROWS
+            """).consume()
+        return count
+
+    @staticmethod
+    def _drop_plain_indexes(session):
+        """移除一般索引（約束的索引與 LOOKUP 索引保留），回傳重建語法"""
+        result = session.run("""
+            SHOW INDEXES YIELD name, type, owningConstraint, createStatement
+            WHERE type <> 'LOOKUP' AND owningConstraint IS NULL
+            RETURN name, createStatement
+        """)
+        indexes = [(r["name"], r["createStatement"]) for r in result]
+        for name, _ in indexes:
+            session.run(f"DROP INDEX `{name}` IF EXISTS")
+        print(f"  [INFO] 節點數超過 {INDEX_REBUILD_THRESHOLD}，已暫時移除 {len(indexes)} 個索引")
+        return [statement for _, statement in indexes]
+
     def show_final_statistics(self):
         """顯示最終統計資料"""
         print("\n" + "="*80)
         print("完整知識圖譜統計")
         print("="*80)
 
-        with self.driver.session(database="neo4j") as session:
+        with self.connection.session(database="neo4j") as session:
             print("\n【節點統計】")
             node_types = [
-                ("River", "河川"), ("WaterSystem", "水系"), ("Basin", "流域"),
+                ("River", "河川"), ("RiverAlias", "河川別名"), ("WaterSystem", "水系"), ("Basin", "流域"),
                 ("Watershed", "集水區"), ("Station", "測站 (總數)"),
                 ("Rainfall", "  - 雨量測站"), ("WaterLevel", "  - 水位測站"),
             ]
@@ -584,17 +782,249 @@ class MasterImporter:
 
             print("\n【關係統計】")
             rel_types = [
-                ("FLOWS_INTO", "河川流向關係"), ("BELONGS_TO", "河川屬於水系"),
+                ("FLOWS_INTO", "河川流向關係"), ("BELONGS_TO", "河川屬於水系"), ("ALIAS_OF", "別名指向河川"),
                 ("PART_OF", "集水區屬於流域"), ("LOCATED_ON", "測站位於河川"),
+                ("LOCATED_IN", "測站位於集水區"),
             ]
             for rel_type, desc in rel_types:
                 count = session.run(f"MATCH ()-[r:{rel_type}]->() RETURN count(r) as count").single()["count"]
                 print(f"  {desc}: {count}")
 
 
+# =============================================================================
+# 離線建置 (neo4j-admin database import)
+# =============================================================================
+
+def _typed_header(frame, column):
+    """依欄位型別產生 neo4j-admin 標頭（boolean / int / double / 預設 string）"""
+    if pd.api.types.is_bool_dtype(frame[column]):
+        return f"{column}:boolean"
+    if pd.api.types.is_integer_dtype(frame[column]):
+        return f"{column}:int"
+    if pd.api.types.is_float_dtype(frame[column]):
+        return f"{column}:double"
+    return column
+
+
+class OfflineBuilder:
+    """離線建置器 - 直接由 Excel 報表產生 neo4j-admin 匯入用 CSV
+
+    寫出前已套用 migrate_schema() 的轉換:
+    - 河川階層直接寫成 FLOWS_INTO（不經過 IS_TRIBUTARY_OF）
+    - 測站關係直接寫成 LOCATED_ON（不經過 MONITORS），代碼不匹配者已過濾
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.node_files = []
+        self.relationship_files = []
+
+    def write_nodes(self, filename, frame, id_column, id_space, labels):
+        """寫出節點 CSV，回傳節點 ID 集合
+
+        與 MERGE 相同: 同一個鍵只建立一個節點，屬性以最後一筆為準
+        """
+        if 'content_hash' not in frame.columns:
+            frame = frame.assign(content_hash=content_hashes(frame).values)
+        frame = frame[frame[id_column].notna()].drop_duplicates(subset=id_column, keep='last')
+        header = {col: _typed_header(frame, col) for col in frame.columns}
+        header[id_column] = f"{id_column}:ID({id_space})"
+        output = frame.rename(columns=header)
+        output[':LABEL'] = labels
+
+        path = self.output_dir / filename
+        output.to_csv(path, index=False, encoding='utf-8')
+        self.node_files.append(path)
+        print(f"  [OK] {filename}: {len(output)} 個節點")
+        return set(frame[id_column])
+
+    def write_relationships(self, filename, frame, rel_type,
+                            start_column, start_space, start_ids,
+                            end_column, end_space, end_ids):
+        """寫出關係 CSV
+
+        與 MATCH + MERGE 相同: 端點不存在的關係略過，重複關係只保留一條
+        """
+        exists = frame[start_column].isin(start_ids) & frame[end_column].isin(end_ids)
+        frame = frame[exists].drop_duplicates(subset=[start_column, end_column], keep='last')
+        header = {col: _typed_header(frame, col) for col in frame.columns}
+        header[start_column] = f":START_ID({start_space})"
+        header[end_column] = f":END_ID({end_space})"
+        output = frame.rename(columns=header)
+        output[':TYPE'] = rel_type
+
+        path = self.output_dir / filename
+        output.to_csv(path, index=False, encoding='utf-8')
+        self.relationship_files.append(path)
+        skipped = int((~exists).sum())
+        note = f"（略過 {skipped} 條端點不存在）" if skipped else ""
+        print(f"  [OK] {filename}: {len(output)} 條關係{note}")
+
+    def write_schema(self, importers):
+        """寫出約束與索引建立語法，匯入完成後以 cypher-shell 執行"""
+        path = self.output_dir / 'schema.cypher'
+        constraints = [query for importer in importers for _, query in importer.CONSTRAINTS]
+        indexes = [query for importer in importers for query in importer.INDEXES]
+        path.write_text(';\n'.join(constraints + indexes) + ';\n', encoding='utf-8')
+        print(f"  [OK] {path.name}: {len(constraints)} 個唯一約束、{len(indexes)} 個索引")
+
+    def build(self, river_path, watershed_path, station_path, matching_report_path,
+              shapefile=WATERSHED_SHAPEFILE):
+        """讀取 Excel 報表並寫出所有節點與關係 CSV"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"\n輸出目錄: {self.output_dir}")
+
+        rivers = read_source(river_path, RIVER)
+        basins = read_source(watershed_path, BASIN_STATS, sheet_name='流域統計')
+        watersheds = read_source(watershed_path, WATERSHED_LIST, sheet_name='集水區列表')
+        watershed_rivers = read_source(watershed_path, WATERSHED_RIVER, sheet_name='集水區-河川關聯')
+        rainfall = read_source(station_path, RAINFALL_STATION, sheet_name=0)
+        water_level = read_source(station_path, WATER_LEVEL_STATION, sheet_name=1)
+        matched = read_source(matching_report_path, MATCHED_STATION, sheet_name='能配對的測站')
+
+        print("\n寫出節點...")
+        river_ids = self.write_nodes('rivers.csv', RiverImporter.river_frame(rivers),
+                                     'code', 'River', 'River')
+        water_system_ids = self.write_nodes('water_systems.csv', RiverImporter.water_system_frame(rivers),
+                                            'name', 'WaterSystem', 'WaterSystem')
+        alias_index = load_alias_index(river_path)
+        alias_ids = self.write_nodes('river_aliases.csv', alias_index.alias_frame(),
+                                     'key', 'RiverAlias', 'RiverAlias')
+        basin_ids = self.write_nodes('basins.csv', WatershedImporter.basin_frame(basins),
+                                     'name', 'Basin', 'Basin')
+        watershed_ids = self.write_nodes('watersheds.csv', WatershedImporter.watershed_frame(watersheds),
+                                         'id', 'Watershed', 'Watershed')
+
+        # 指紋以匯入器的原始欄位計算，與線上匯入 / 增量同步一致
+        station_columns = {'x': 'x_twd97', 'y': 'y_twd97'}
+        rainfall_nodes = StationImporter.rainfall_frame(rainfall)
+        rainfall_nodes = rainfall_nodes.assign(content_hash=content_hashes(rainfall_nodes).values)
+        rainfall_nodes = rainfall_nodes.rename(columns=station_columns)
+        rainfall_nodes.insert(2, 'type', '雨量測站')
+        water_level_nodes = StationImporter.water_level_frame(water_level)
+        water_level_nodes = water_level_nodes.assign(content_hash=content_hashes(water_level_nodes).values)
+        water_level_nodes = water_level_nodes.rename(columns=station_columns)
+        water_level_nodes.insert(2, 'type', '水位測站')
+        station_ids = self.write_nodes('rainfall_stations.csv', rainfall_nodes,
+                                       'code', 'Station', 'Station;Rainfall')
+        station_ids |= self.write_nodes('water_level_stations.csv', water_level_nodes,
+                                        'code', 'Station', 'Station;WaterLevel')
+
+        print("\n寫出關係...")
+        self.write_relationships('flows_into.csv', RiverImporter.hierarchy_frame(rivers), 'FLOWS_INTO',
+                                 'tributary_code', 'River', river_ids,
+                                 'main_code', 'River', river_ids)
+        self.write_relationships('belongs_to.csv', RiverImporter.belongs_to_frame(rivers), 'BELONGS_TO',
+                                 'river_code', 'River', river_ids,
+                                 'water_system', 'WaterSystem', water_system_ids)
+        self.write_relationships('alias_of.csv', RiverImporter.alias_of_frame(alias_index), 'ALIAS_OF',
+                                 'alias_key', 'RiverAlias', alias_ids,
+                                 'river_code', 'River', river_ids)
+        self.write_relationships('part_of.csv', WatershedImporter.part_of_frame(watersheds), 'PART_OF',
+                                 'ws_id', 'Watershed', watershed_ids,
+                                 'basin_name', 'Basin', basin_ids)
+        self.write_relationships('contains_river.csv', WatershedImporter.contains_river_frame(watershed_rivers),
+                                 'CONTAINS_RIVER',
+                                 'ws_id', 'Watershed', watershed_ids,
+                                 'river_code', 'River', river_ids)
+        links, skipped, code_mismatch = StationImporter.station_link_frame(matched)
+        self.write_relationships('located_on.csv', links[['station_code', 'river_code']], 'LOCATED_ON',
+                                 'station_code', 'Station', station_ids,
+                                 'river_code', 'River', river_ids)
+        if skipped > 0:
+            print(f"  [INFO] 跳過 {skipped} 條 (缺少測站代號或河川代碼)")
+        if code_mismatch > 0:
+            print(f"  [INFO] 過濾 {code_mismatch} 條代碼不匹配")
+        if source_files(shapefile)[0] is not None:
+            watershed_polygons = read_watersheds(shapefile, columns=['WS_ID'], geometry=True)
+            self.write_relationships('located_in.csv',
+                                     StationImporter.located_in_frame(rainfall, water_level, watershed_polygons),
+                                     'LOCATED_IN',
+                                     'station_code', 'Station', station_ids,
+                                     'ws_id', 'Watershed', watershed_ids)
+        else:
+            print(f"  [略過] located_in.csv: 找不到集水區圖層幾何 {Path(shapefile).with_suffix('.shp')}")
+
+        self.write_schema([RiverImporter, WatershedImporter, StationImporter])
+        self.print_import_command()
+
+    def print_import_command(self):
+        """顯示 neo4j-admin 匯入指令"""
+        print("\n" + "="*80)
+        print("請先停止 Neo4j（docker compose stop neo4j），再執行:")
+        print("="*80)
+        lines = ["neo4j-admin database import full neo4j --overwrite-destination --multiline-fields=true"]
+        lines += [f"    --nodes={path.as_posix()}" for path in self.node_files]
+        lines += [f"    --relationships={path.as_posix()}" for path in self.relationship_files]
+        print(" \\\n".join(lines))
+        print("\n啟動 Neo4j 後建立約束與索引:")
+        print(f"    cypher-shell -u neo4j -p <password> -f {(self.output_dir / 'schema.cypher').as_posix()}")
+
+
+# =============================================================================
+# 匯入階段（依節點標籤相依）
+# =============================================================================
+
+def build_import_stages(river_importer, watershed_importer, station_importer):
+    """建立匯入階段清單
+
+    每個階段宣告需要先存在的節點標籤 (requires) 與自己建立的標籤 (provides)，
+    互不相依的階段（如河川與流域、雨量與水位測站）可同時執行
+    """
+    return [
+        Stage("河川節點", lambda: river_importer.import_rivers(RIVER_EXCEL),
+              provides=['River']),
+        Stage("水系節點與關係", lambda: river_importer.import_water_systems(RIVER_EXCEL),
+              requires=['River'], provides=['WaterSystem']),
+        Stage("河川階層關係", lambda: river_importer.import_river_hierarchy(RIVER_EXCEL),
+              requires=['River']),
+        Stage("河川別名", lambda: river_importer.import_river_aliases(RIVER_EXCEL),
+              requires=['River'], provides=['RiverAlias']),
+        Stage("流域節點", lambda: watershed_importer.import_basins(WATERSHED_EXCEL),
+              provides=['Basin']),
+        Stage("集水區節點", lambda: watershed_importer.import_watersheds(WATERSHED_EXCEL),
+              provides=['Watershed']),
+        Stage("集水區-流域關係", lambda: watershed_importer.link_watersheds_to_basins(WATERSHED_EXCEL),
+              requires=['Watershed', 'Basin']),
+        Stage("集水區-河川關係", lambda: watershed_importer.link_watersheds_to_rivers(WATERSHED_EXCEL),
+              requires=['Watershed', 'River']),
+        Stage("雨量測站節點", lambda: station_importer.import_rainfall_stations(STATION_EXCEL),
+              provides=['Station', 'Rainfall']),
+        Stage("水位測站節點", lambda: station_importer.import_water_level_stations(STATION_EXCEL),
+              provides=['Station', 'WaterLevel']),
+        Stage("測站-河川關係", lambda: station_importer.link_stations_to_rivers(MATCHING_REPORT),
+              requires=['Station', 'River']),
+        Stage("測站-集水區關係", lambda: station_importer.link_stations_to_watersheds(STATION_EXCEL),
+              requires=['Station', 'Watershed']),
+    ]
+
+
+def parse_args():
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="HydroGraph-TW 完整資料匯入 Neo4j")
+    parser.add_argument('--auto-clear', action='store_true',
+                        help="自動清空並重建資料庫（不詢問確認）")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"每個交易寫入的筆數（預設 {DEFAULT_BATCH_SIZE}）")
+    parser.add_argument('--clear-batch-size', type=int, default=CLEAR_BATCH_SIZE,
+                        help=f"清空資料庫時每個交易刪除的筆數（預設 {CLEAR_BATCH_SIZE}）")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="平行匯入的工作執行緒數（預設 4，1 表示依序執行）")
+    parser.add_argument('--async-relations', type=int, nargs='?', const=DEFAULT_CONCURRENCY, metavar='N',
+                        help=f"關係依水系 / 流域分區，以非同步連線同時寫入 N 個分區（預設 {DEFAULT_CONCURRENCY}）")
+    parser.add_argument('--metrics-report', type=Path, default=METRICS_REPORT, metavar='PATH',
+                        help=f"匯入效能統計 JSON 報告輸出路徑（預設 {METRICS_REPORT}）")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量同步：比對內容指紋只寫入差異，不清空資料庫")
+    parser.add_argument('--offline-build', nargs='?', const=OFFLINE_BUILD_DIR, metavar='DIR',
+                        help=f"不連線 Neo4j，改為產生 neo4j-admin 匯入用 CSV（預設輸出 {OFFLINE_BUILD_DIR}）")
+    return parser.parse_args()
+
+
 def main():
     """主程式 - 一鍵匯入所有資料"""
-    auto_clear = '--auto-clear' in sys.argv
+    args = parse_args()
+    auto_clear = args.auto_clear
 
     print("="*80)
     print("HydroGraph-TW 完整資料匯入 Neo4j")
@@ -603,18 +1033,8 @@ def main():
     if auto_clear:
         print("[自動模式] 將自動清空並重建資料庫")
 
-    # Neo4j 連線設定
-    NEO4J_URI = "bolt://localhost:7687"
-    NEO4J_USER = "neo4j"
-    NEO4J_PASSWORD = "geoinfor"
-
     # 檢查必要檔案
-    required_files = [
-        Path("data/河川關係_完整版.xlsx"),
-        Path("data/集水區分析報表.xlsx"),
-        Path("data/測站基本資料2025.xlsx"),
-        Path("data/測站河川配對分析報表.xlsx"),
-    ]
+    required_files = [RIVER_EXCEL, WATERSHED_EXCEL, STATION_EXCEL, MATCHING_REPORT]
 
     print("\n檢查必要檔案...")
     all_exist = True
@@ -627,74 +1047,88 @@ def main():
 
     if not all_exist:
         print("\n[錯誤] 缺少必要檔案，請先執行 1-4 號腳本產生資料檔案")
-        return
+        return 1
 
-    master = MasterImporter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    if args.offline_build:
+        print("\n[離線模式] 產生 neo4j-admin 匯入用 CSV")
+        OfflineBuilder(args.offline_build).build(RIVER_EXCEL, WATERSHED_EXCEL, STATION_EXCEL, MATCHING_REPORT)
+        return 0
+
+    # Neo4j 連線（設定見 neo4j_connection.py，所有匯入步驟共用同一個連線池）
+    # 分區非同步寫入時，連線上限中的 N 條分給非同步 driver（每個同時寫入的分區一條）
+    async_relations = args.async_relations if not args.incremental else None
+    connection = Neo4jConnection(async_pool_size=async_relations or 0)
+    master = MasterImporter(connection)
+    metrics = ImportMetrics()
 
     if not master.test_connection():
         print("\n[錯誤] 無法連線到 Neo4j")
-        master.close()
-        return
+        connection.close()
+        return 1
 
     try:
-        cleared = master.clear_database(auto_confirm=auto_clear)
+        if args.incremental:
+            print("\n[增量模式] 不清空資料庫，只同步有變動的節點與關係")
+        else:
+            with metrics.stage("清空資料庫"):
+                master.clear_database(auto_confirm=auto_clear, batch_size=args.clear_batch_size)
 
         print("\n" + "="*80)
         print("開始匯入資料...")
         print("="*80)
 
-        # 步驟 1: 匯入河川資料
-        print("\n【步驟 1/3】匯入河川與水系資料")
+        importer_args = (connection, args.batch_size, args.incremental, args.async_relations, metrics)
+        river_importer = RiverImporter(*importer_args)
+        watershed_importer = WatershedImporter(*importer_args)
+        station_importer = StationImporter(*importer_args)
+
+        # 步驟 1: 建立索引
+        print("\n【步驟 1/3】建立約束與索引")
         print("-" * 80)
-        river_importer = RiverImporter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
-        if cleared:
+        with metrics.stage("約束與索引"):
             river_importer.create_indexes()
-        river_importer.import_rivers(Path("data/河川關係_完整版.xlsx"))
-        river_importer.import_water_systems(Path("data/河川關係_完整版.xlsx"))
-        river_importer.import_river_hierarchy(Path("data/河川關係_完整版.xlsx"))
-        river_importer.close()
+            watershed_importer.create_indexes()
+            station_importer.create_indexes()
 
-        # 步驟 2: 匯入集水區資料
-        print("\n【步驟 2/3】匯入集水區與流域資料")
-        print("-" * 80)
-        watershed_importer = WatershedImporter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
-        watershed_importer.create_indexes()
-        watershed_importer.import_basins(Path("data/集水區分析報表.xlsx"))
-        watershed_importer.import_watersheds(Path("data/集水區分析報表.xlsx"))
-        watershed_importer.link_watersheds_to_basins(Path("data/集水區分析報表.xlsx"))
-        watershed_importer.link_watersheds_to_rivers(Path("data/集水區分析報表.xlsx"))
-        watershed_importer.close()
-
-        # 步驟 3: 匯入測站資料
-        print("\n【步驟 3/3】匯入測站資料")
+        # 步驟 2: 依相依關係平行匯入
+        print(f"\n【步驟 2/3】匯入河川、集水區與測站資料（{args.workers} 個工作執行緒）")
         print("-" * 80)
-        station_importer = StationImporter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
-        station_importer.create_indexes()
-        station_importer.import_rainfall_stations(Path("data/測站基本資料2025.xlsx"))
-        station_importer.import_water_level_stations(Path("data/測站基本資料2025.xlsx"))
-        station_importer.link_stations_to_rivers(Path("data/測站河川配對分析報表.xlsx"))
-        station_importer.close()
-
-        # 步驟 4: Schema 遷移
-        print("\n【步驟 4/4】Schema 遷移")
+        stages = build_import_stages(river_importer, watershed_importer, station_importer)
+        for stage in stages:
+            stage.func = metrics.timed(stage.name, stage.func)
+        run_stages(stages, max_workers=args.workers)
+
+        # 步驟 3: Schema 遷移
+        print("\n【步驟 3/3】Schema 遷移")
         print("-" * 80)
-        migrate_schema(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+        if args.incremental:
+            print("  [略過] 增量模式已直接寫入 FLOWS_INTO / LOCATED_ON")
+        else:
+            with metrics.stage("Schema 遷移"):
+                migrate_schema(connection, metrics)
 
         master.show_final_statistics()
 
         print("\n" + "="*80)
         print("[完成] 所有資料匯入完成!")
         print("="*80)
+        return 0
 
     except Exception as e:
         print(f"\n[錯誤] 匯入過程發生錯誤: {e}")
         import traceback
         traceback.print_exc()
+        return 1
 
     finally:
-        master.close()
+        metrics.print_summary()
+        options = {k: str(v) if isinstance(v, Path) else v
+                   for k, v in vars(args).items() if k != 'offline_build'}
+        metrics.write_report(args.metrics_report, options)
+        connection.report_pool()
+        connection.close()
         print("\n已關閉 Neo4j 連線")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Neo4j 分區非同步關係寫入工具
+以 AsyncGraphDatabase 將關係依水系 / 流域分區，各分區在獨立交易中平行寫入。
+分區之間不共用端點節點，平行交易不會互相等待節點鎖而產生死結
+
+非同步 driver 與事件迴圈由 Neo4jConnection 持有（見 neo4j_connection.run_async），
+所有寫入共用同一個非同步連線池，連線數以 Neo4jConnection 的 async_pool_size 為上限
+"""
+import asyncio
+import time
+
+from batch_writer import DEFAULT_BATCH_SIZE, RETRYABLE_ERRORS, dataframe_to_rows
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+class PartitionedAsyncWriter:
+    """分區平行關係寫入器
+
+    query 與 BatchWriter 相同，需以 `UNWIND $rows AS row` 開頭。
+    同一分區內依序分批寫入，不同分區最多 max_concurrency 個同時進行
+
+    Args:
+        connection: 共用連線 (Neo4jConnection，需分配 async_pool_size)
+        database: 資料庫名稱
+        batch_size: 每個交易寫入筆數
+        max_concurrency: 同時寫入的分區數
+    """
+
+    def __init__(self, connection, database="neo4j", batch_size=DEFAULT_BATCH_SIZE,
+                 max_concurrency=DEFAULT_CONCURRENCY, max_retries=3, retry_delay=1.0, metrics=None):
+        self.connection = connection
+        self.metrics = metrics
+        self.database = database
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def write(self, query, frame, partitions, unit="條關係"):
+        """依分區平行寫入 frame，回傳寫入筆數
+
+        Args:
+            query: UNWIND 寫入語句
+            frame: 關係 DataFrame
+            partitions: 與 frame 對齊的分區鍵 Series（例如主流水系、流域代碼），
+                        空值歸入同一個「未分區」分區
+        """
+        if frame.empty:
+            return 0
+        keys = partitions.reindex(frame.index).fillna('(未分區)').astype(str)
+        groups = [(key, dataframe_to_rows(group)) for key, group in frame.groupby(keys.values, sort=True)]
+        # 寫入在共用事件迴圈的執行緒上執行，統計階段需由呼叫端執行緒先取得
+        stage = self.metrics.current_stage() if self.metrics is not None else None
+        return self.connection.run_async(self._write_all(query, groups, unit, stage))
+
+    async def _write_all(self, query, groups, unit, stage=None):
+        """平行寫入所有分區（stage: 統計計入的匯入階段）"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+
+        results = await asyncio.gather(*[
+            self._write_partition(semaphore, query, key, rows, stage)
+            for key, rows in groups
+        ])
+
+        elapsed = time.perf_counter() - start
+        total = sum(count for _, count, _ in results)
+
+        print(f"  [分區] 共 {len(results)} 個分區（同時 {self.max_concurrency} 個）")
+        for key, count, seconds in sorted(results, key=lambda r: r[1], reverse=True):
+            rate = count / seconds if seconds > 0 else 0.0
+            print(f"    {key}: {count} {unit}，{seconds:.2f} 秒，{rate:,.0f} {unit}/秒")
+        rate = total / elapsed if elapsed > 0 else 0.0
+        print(f"  [分區] 合計 {total} {unit}，{elapsed:.2f} 秒，{rate:,.0f} {unit}/秒")
+        return total
+
+    async def _write_partition(self, semaphore, query, key, rows, stage=None):
+        """依序寫入單一分區的所有批次
+
+        Returns:
+            tuple: (分區鍵, 寫入筆數, 耗時秒數)
+        """
+        async with semaphore:
+            t0 = time.perf_counter()
+            async with self.connection.async_session(database=self.database) as session:
+                for start in range(0, len(rows), self.batch_size):
+                    await self._write_batch(session, query, rows[start:start + self.batch_size], stage)
+            return key, len(rows), time.perf_counter() - t0
+
+    async def _write_batch(self, session, query, batch, stage=None):
+        """寫入單一批次，遇到暫時性錯誤時重試"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                t0 = time.perf_counter()
+                async with await session.begin_transaction() as tx:
+                    result = await tx.run(query, rows=batch)
+                    summary = await result.consume()
+                    await tx.commit()
+                if self.metrics is not None:
+                    self.metrics.record(summary, len(batch), time.perf_counter() - t0, stage=stage)
+                return summary
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self.retry_delay * attempt
+                print(f"  [重試] 分區批次寫入失敗 ({attempt}/{self.max_retries})，{wait:.1f} 秒後重試: {e}")
+                await asyncio.sleep(wait)
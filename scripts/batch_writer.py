@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Neo4j 批次寫入工具
+將 DataFrame 轉為參數字典列表，以 UNWIND $rows 分批送出，
+每批一個交易，取代逐列 session.run() 的大量往返
+"""
+import hashlib
+import time
+import pandas as pd
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+
+DEFAULT_BATCH_SIZE = 2000
+
+# 可重試的錯誤（死結、連線中斷、叢集切換等）
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+
+def dataframe_to_rows(df):
+    """將 DataFrame 轉為參數字典列表
+
+    - NaN / NA 轉為 None（Neo4j 視為不設定屬性）
+    - numpy 型別轉為 Python 原生型別
+    """
+    if df.empty:
+        return []
+    df = df.astype(object)
+    return df.where(pd.notna(df), None).to_dict('records')
+
+
+class BatchWriter:
+    """UNWIND 批次寫入器
+
+    query 需以 `UNWIND $rows AS row` 開頭，例如:
+        UNWIND $rows AS row
+        MERGE (r:River {code: row.code})
+        SET r.name = row.name
+    """
+
+    def __init__(self, driver, database="neo4j", batch_size=DEFAULT_BATCH_SIZE,
+                 max_retries=3, retry_delay=1.0, metrics=None):
+        self.driver = driver
+        self.database = database
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.metrics = metrics
+
+    def write(self, query, rows, unit="筆"):
+        """分批寫入 rows，回傳寫入筆數"""
+        total = len(rows)
+        if total == 0:
+            return 0
+
+        with self.driver.session(database=self.database) as session:
+            for start in range(0, total, self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                self._write_batch(session, query, batch)
+                done = start + len(batch)
+                if total > self.batch_size:
+                    print(f"  已寫入 {done}/{total} {unit}...")
+        return total
+
+    def read(self, query):
+        """執行讀取查詢，回傳所有紀錄"""
+        with self.driver.session(database=self.database) as session:
+            if self.metrics is not None:
+                return self.metrics.run(session, query)
+            return list(session.run(query))
+
+    def _write_batch(self, session, query, batch):
+        """寫入單一批次，遇到暫時性錯誤時重試"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                t0 = time.perf_counter()
+                with session.begin_transaction() as tx:
+                    summary = tx.run(query, rows=batch).consume()
+                    tx.commit()
+                if self.metrics is not None:
+                    self.metrics.record(summary, len(batch), time.perf_counter() - t0)
+                return summary
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self.retry_delay * attempt
+                print(f"  [重試] 批次寫入失敗 ({attempt}/{self.max_retries})，{wait:.1f} 秒後重試: {e}")
+                time.sleep(wait)
+
+
+# =============================================================================
+# 增量同步（只寫入有變動的資料）
+# =============================================================================
+
+def content_hashes(frame):
+    """計算每一列的內容指紋（16 位十六進位字串）"""
+    return pd.util.hash_pandas_object(frame, index=False).map('{:016x}'.format)
+
+
+class DeltaSync:
+    """以內容指紋比對來源資料與現有圖譜，只寫入差異
+
+    - 節點: 每個節點存放 content_hash，依主鍵比對新增 / 更新 / 刪除
+    - 關係: 以起點節點為單位，將其所有關係列的指紋合併後存於起點節點
+            （例如 Watershed.contains_river_hash），有變動的起點才重建關係
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def _fetch_hashes(self, query):
+        """讀取圖譜中現有的 {主鍵: 指紋}"""
+        return {record['key']: record['hash'] for record in self.writer.read(query)}
+
+    def sync_nodes(self, label, key, frame, upsert_query, unit="個節點"):
+        """同步節點，upsert_query 需設定 content_hash = row.content_hash
+
+        Returns:
+            set: 新增或更新的節點主鍵
+        """
+        frame = frame[frame[key].notna()].drop_duplicates(subset=key, keep='last')
+        frame = frame.assign(content_hash=content_hashes(frame).values)
+
+        existing = self._fetch_hashes(
+            f"MATCH (n:{label}) RETURN n.{key} AS key, n.content_hash AS hash"
+        )
+        previous = frame[key].map(existing)
+        inserted = ~frame[key].isin(existing.keys())
+        updated = ~inserted & (previous != frame['content_hash'])
+        deleted = sorted(set(existing) - set(frame[key]))
+
+        changed = frame[inserted | updated]
+        self.writer.write(upsert_query, dataframe_to_rows(changed), unit=unit)
+        self.writer.write(f"""
+            UNWIND $rows AS row
+            MATCH (n:{label} {{{key}: row.key}})
+            DETACH DELETE n
+        """, [{'key': k} for k in deleted], unit=unit)
+
+        print(f"  [增量] {label}: 新增 {int(inserted.sum())}、更新 {int(updated.sum())}、"
+              f"刪除 {len(deleted)}、未變動 {len(frame) - len(changed)}")
+        return set(changed[key])
+
+    def sync_relationships(self, rel_type, start_label, start_key, start_column,
+                           frame, merge_query, unit="條關係"):
+        """同步某一類型的關係，merge_query 以 UNWIND $rows 建立關係
+
+        Returns:
+            int: 寫入的關係列數
+        """
+        hash_property = f"{rel_type.lower()}_hash"
+        frame = frame.drop_duplicates().sort_values(list(frame.columns))
+        row_hashes = pd.util.hash_pandas_object(frame, index=False)
+        group_hashes = row_hashes.groupby(frame[start_column].values).agg(
+            lambda h: hashlib.sha1(h.values.tobytes()).hexdigest()[:16]
+        )
+
+        existing = self._fetch_hashes(f"""
+            MATCH (n:{start_label}) WHERE n.{hash_property} IS NOT NULL
+            RETURN n.{start_key} AS key, n.{hash_property} AS hash
+        """)
+        changed = [k for k, h in group_hashes.items() if existing.get(k) != h]
+        removed = sorted(set(existing) - set(group_hashes.index))
+
+        # 先移除有變動起點的舊關係，再依來源重建
+        self.writer.write(f"""
+            UNWIND $rows AS row
+            MATCH (n:{start_label} {{{start_key}: row.key}})-[r:{rel_type}]->()
+            DELETE r
+        """, [{'key': k} for k in changed + removed], unit=unit)
+        self.writer.write(f"""
+            UNWIND $rows AS row
+            MATCH (n:{start_label} {{{start_key}: row.key}})
+            REMOVE n.{hash_property}
+        """, [{'key': k} for k in removed], unit="個節點")
+
+        rows = frame[frame[start_column].isin(changed)]
+        count = self.writer.write(merge_query, dataframe_to_rows(rows), unit=unit)
+        self.writer.write(f"""
+            UNWIND $rows AS row
+            MATCH (n:{start_label} {{{start_key}: row.key}})
+            SET n.{hash_property} = row.hash
+        """, [{'key': k, 'hash': group_hashes[k]} for k in changed], unit="個節點")
+
+        print(f"  [增量] {rel_type}: 重建 {len(changed)} 個起點的關係 ({count} 條)、"
+              f"清除 {len(removed)} 個起點、未變動 {len(group_hashes) - len(changed)}")
+        return count
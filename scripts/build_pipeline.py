@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+資料建置流程（1 → 2 → 3 → 4 → 8）
+
+每個腳本視為一個建置目標，宣告輸入與輸出檔案。依輸入檔案（含腳本本身）
+的內容雜湊判斷是否需要重建，已是最新的目標直接略過；互不相依的目標
+（例如 2 與 4）以 stage_scheduler 同時執行。
+
+使用方式:
+    python scripts/build_pipeline.py                    # 建置全部（Neo4j 以增量模式同步）
+    python scripts/build_pipeline.py watersheds         # 只建置指定目標（含其上游）
+    python scripts/build_pipeline.py --dry-run          # 只列出需要重建的目標
+    python scripts/build_pipeline.py --force stations   # 強制重建 stations（上游仍依雜湊判斷）
+    python scripts/build_pipeline.py --import-args "--auto-clear"   # Neo4j 匯入參數
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from stage_scheduler import Stage, run_stages
+
+
+STATE_PATH = Path("data/.cache/build_state.json")
+LOG_DIR = Path("data/.cache/build_logs")
+
+RIVER_PDF = "file/台灣地區河川代碼(112年).pdf"
+WATERSHED_DBF = "file/110年度全臺839子集水區範圍圖_UTF8.dbf"
+# 集水區多邊形（測站 - 集水區空間配對使用）；圖層可能只有 .dbf 屬性表
+WATERSHED_SHP = "file/110年度全臺839子集水區範圍圖_UTF8.shp"
+WATERSHED_GEOMETRY = ([WATERSHED_SHP, str(Path(WATERSHED_SHP).with_suffix('.shx'))]
+                      if Path(WATERSHED_SHP).exists() else [])
+RIVER_BOUNDARY_POINTS = "frontend/src/data/riverBoundaryPoints.json"
+STATION_SOURCE = "data/測站基本資料2025.xlsx"
+RIVER_TABLE = "data/河川關係_完整版.xlsx"
+STATION_TABLE = "data/測站資料_水位與氣象.xlsx"
+ALIAS_INDEX = "data/河川別名索引.json"
+MATCHING_REPORT = "data/測站河川配對分析報表.xlsx"
+WATERSHED_REPORT = "data/集水區分析報表.xlsx"
+
+
+class Target:
+    """建置目標
+
+    Args:
+        name: 目標名稱
+        script: 執行的腳本（本身也是輸入）
+        inputs: 輸入檔案（含腳本匯入的共用模組）
+        outputs: 產生的檔案（Neo4j 匯入沒有輸出檔案）
+        args: 執行腳本時的參數
+    """
+
+    def __init__(self, name, script, inputs, outputs=(), args=()):
+        self.name = name
+        self.script = script
+        self.inputs = [script] + list(inputs)
+        self.outputs = list(outputs)
+        self.args = list(args)
+
+
+TARGETS = [
+    Target("rivers", "scripts/1_extract_rivers_from_pdf.py",
+           inputs=[RIVER_PDF, "scripts/river_pdf_extractor.py", "scripts/river_sinks.py",
+                   "scripts/batch_writer.py", "scripts/ingest_schema.py", "scripts/report_writer.py"],
+           outputs=[RIVER_TABLE]),
+    Target("stations", "scripts/2_extract_stations.py",
+           inputs=[STATION_SOURCE, "scripts/ingest_schema.py", "scripts/report_writer.py",
+                   "scripts/source_cache.py"],
+           outputs=[STATION_TABLE]),
+    Target("alias_index", "scripts/river_alias_index.py",
+           inputs=[RIVER_TABLE, "scripts/river_matching.py", "scripts/source_cache.py"],
+           outputs=[ALIAS_INDEX]),
+    Target("matching_report", "scripts/3_generate_final_report.py",
+           inputs=[STATION_TABLE, RIVER_TABLE, ALIAS_INDEX, "scripts/ingest_schema.py",
+                   "scripts/report_writer.py", "scripts/source_cache.py", "scripts/river_alias_index.py",
+                   "scripts/river_fuzzy_index.py", "scripts/river_matching.py", "scripts/river_nearest_index.py",
+                   RIVER_BOUNDARY_POINTS],
+           outputs=[MATCHING_REPORT]),
+    Target("watersheds", "scripts/4_extract_watersheds.py",
+           inputs=[WATERSHED_DBF, RIVER_TABLE, "scripts/ingest_schema.py", "scripts/report_writer.py",
+                   "scripts/source_cache.py", "scripts/watershed_source.py"],
+           outputs=[WATERSHED_REPORT]),
+    Target("neo4j", "scripts/8_import_all_to_neo4j.py",
+           inputs=[RIVER_TABLE, WATERSHED_REPORT, STATION_SOURCE, MATCHING_REPORT, ALIAS_INDEX,
+                   WATERSHED_DBF, *WATERSHED_GEOMETRY,
+                   "scripts/async_relation_writer.py", "scripts/batch_writer.py",
+                   "scripts/import_metrics.py", "scripts/ingest_schema.py", "scripts/neo4j_connection.py",
+                   "scripts/river_alias_index.py", "scripts/river_matching.py",
+                   "scripts/source_cache.py", "scripts/stage_scheduler.py",
+                   "scripts/station_watershed_join.py", "scripts/watershed_source.py"],
+           args=["--incremental"]),
+]
+
+
+# =============================================================================
+# 檔案雜湊與建置狀態
+# =============================================================================
+
+class BuildState:
+    """建置狀態（data/.cache/build_state.json）
+
+    - files: {路徑: [mtime_ns, size, sha256]}，檔案未變動時沿用雜湊不重新讀取
+    - targets: {目標: {signature, outputs: {路徑: sha256}}}
+    """
+
+    def __init__(self, path=STATE_PATH):
+        self.path = Path(path)
+        self.data = {'files': {}, 'targets': {}}
+        if self.path.exists():
+            self.data = json.loads(self.path.read_text(encoding='utf-8'))
+        self._lock = threading.Lock()
+
+    def file_hash(self, path):
+        """檔案內容雜湊，不存在時回傳 None"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        stat = path.stat()
+        key = path.as_posix()
+        with self._lock:
+            cached = self.data['files'].get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        with self._lock:
+            self.data['files'][key] = [stat.st_mtime_ns, stat.st_size, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def signature(self, target):
+        """輸入檔案與參數的合併雜湊"""
+        digest = hashlib.sha256()
+        for path in sorted(target.inputs):
+            file_hash = self.file_hash(path)
+            if file_hash is None:
+                raise FileNotFoundError(f"目標 {target.name} 缺少輸入檔案: {path}")
+            digest.update(f"{path}\0{file_hash}\n".encode('utf-8'))
+        digest.update("\0".join(target.args).encode('utf-8'))
+        return digest.hexdigest()
+
+    def is_up_to_date(self, target, signature):
+        """輸入未變動且輸出檔案仍是上次建置的內容"""
+        with self._lock:
+            record = self.data['targets'].get(target.name)
+        if not record or record['signature'] != signature:
+            return False
+        return all(self.file_hash(path) == record['outputs'].get(path) for path in target.outputs)
+
+    def mark_built(self, target, signature):
+        outputs = {path: self.file_hash(path) for path in target.outputs}
+        with self._lock:
+            self.data['targets'][target.name] = {'signature': signature, 'outputs': outputs}
+        self.save()
+
+    def save(self):
+        with self._lock:
+            text = json.dumps(self.data, ensure_ascii=False, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(text, encoding='utf-8')
+        tmp_path.replace(self.path)
+
+
+# =============================================================================
+# 建置
+# =============================================================================
+
+def run_target(target, state, force=False, dry_run=False):
+    """檢查並（必要時）執行單一目標"""
+    signature = state.signature(target)
+    if not force and state.is_up_to_date(target, signature):
+        print(f"[略過] {target.name} 已是最新")
+        return
+    if dry_run:
+        print(f"[需重建] {target.name}: {target.script}")
+        return
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_path = LOG_DIR / f"{target.name}.log"
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    t0 = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        process = subprocess.run([sys.executable, target.script] + target.args,
+                                 stdout=log, stderr=subprocess.STDOUT, env=env)
+    elapsed = time.perf_counter() - t0
+
+    if process.returncode != 0:
+        tail = log_path.read_text(encoding='utf-8', errors='replace').splitlines()[-20:]
+        print(f"[錯誤] {target.name} 執行失敗 (exit {process.returncode})，紀錄: {log_path}")
+        print("\n".join(f"    {line}" for line in tail))
+        raise RuntimeError(f"{target.script} 執行失敗")
+
+    state.mark_built(target, signature)
+    print(f"[OK] {target.name} 已重建 ({elapsed:.2f} 秒，紀錄: {log_path})")
+
+
+def select_targets(names):
+    """選取指定目標及其所有上游目標（維持原本順序）"""
+    if not names:
+        return list(TARGETS)
+    producers = {path: t for t in TARGETS for path in t.outputs}
+    by_name = {t.name: t for t in TARGETS}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise ValueError(f"未知的目標: {unknown}（可用: {list(by_name)}）")
+
+    selected, pending = set(), [by_name[n] for n in names]
+    while pending:
+        target = pending.pop()
+        if target.name in selected:
+            continue
+        selected.add(target.name)
+        pending.extend(producers[p] for p in target.inputs if p in producers)
+    return [t for t in TARGETS if t.name in selected]
+
+
+def build(names=(), force=False, dry_run=False, workers=4, import_args=None):
+    """建置指定目標
+
+    Returns:
+        float: 總耗時（秒）
+    """
+    targets = select_targets(names)
+    if import_args is not None:
+        # 以複本設定參數，不修改模組層級的 TARGETS
+        targets = [copy.copy(t) if t.name == "neo4j" else t for t in targets]
+        for target in targets:
+            if target.name == "neo4j":
+                target.args = shlex.split(import_args)
+
+    # --force 只套用在指定的目標（未指定時為全部），上游目標仍依雜湊判斷
+    forced = {t.name for t in targets} if not names else set(names)
+
+    state = BuildState()
+    produced = {path for t in targets for path in t.outputs}
+    stages = [
+        Stage(t.name, lambda t=t: run_target(t, state, force and t.name in forced, dry_run),
+              requires=[p for p in t.inputs if p in produced],
+              provides=t.outputs)
+        for t in targets
+    ]
+    # --dry-run 時上游不會真的重建，下游的判斷以目前的檔案為準
+    try:
+        return run_stages(stages, max_workers=workers)
+    finally:
+        state.save()
+
+
+def parse_args():
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="HydroGraph-TW 資料建置流程")
+    parser.add_argument('targets', nargs='*', metavar='TARGET',
+                        help=f"要建置的目標（預設全部）: {', '.join(t.name for t in TARGETS)}")
+    parser.add_argument('--force', action='store_true', help="忽略雜湊，強制重建指定目標")
+    parser.add_argument('--dry-run', action='store_true', help="只列出需要重建的目標")
+    parser.add_argument('--workers', type=int, default=4, help="同時執行的目標數（預設 4）")
+    parser.add_argument('--import-args', metavar='ARGS',
+                        help="傳給 8_import_all_to_neo4j.py 的參數（預設 --incremental）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("=" * 80)
+    print("HydroGraph-TW 資料建置")
+    print("=" * 80)
+    try:
+        build(args.targets, force=args.force, dry_run=args.dry_run,
+              workers=args.workers, import_args=args.import_args)
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"\n[錯誤] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
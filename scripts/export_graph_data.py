@@ -3,18 +3,13 @@
 從 Neo4j 匯出圖資料為前端可用的 JavaScript 檔案
 用來取代 mockData.js
 """
-from neo4j import GraphDatabase
-from dotenv import load_dotenv
 import os
 import json
 
-load_dotenv()
+from neo4j_connection import Neo4jConnection
 
-NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
-NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
-NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD')
-
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# 連線設定由環境變數 / .env 讀取（見 neo4j_connection.py）
+connection = Neo4jConnection()
 
 def export_graph_data(water_system_name=None, limit_rivers=50):
     """
@@ -28,7 +23,7 @@ def export_graph_data(water_system_name=None, limit_rivers=50):
     links = []
     node_ids = set()
 
-    with driver.session() as session:
+    with connection.session() as session:
         # 1. 取得水系
         if water_system_name:
             ws_query = """
@@ -196,4 +191,4 @@ if __name__ == '__main__':
 
     save_as_js(data, output_path)
 
-    driver.close()
+    connection.close()
@@ -2,19 +2,17 @@
 匯出 Neo4j 圖譜資料到 JSON
 用於前端視覺化
 """
-from neo4j import GraphDatabase
 import json
 
-class GraphExporter:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+from neo4j_connection import Neo4jConnection
 
-    def close(self):
-        self.driver.close()
+class GraphExporter:
+    def __init__(self, connection):
+        self.connection = connection
 
     def export_all_data(self):
         """匯出所有節點和關係"""
-        with self.driver.session() as session:
+        with self.connection.session() as session:
             # 1. 查詢主要水系（河川數 >= 5 的水系，約 30 個）
             water_systems = session.run("""
                 MATCH (ws:WaterSystem)<-[:BELONGS_TO]-(r:River)
@@ -149,13 +147,10 @@ class GraphExporter:
             }
 
 def main():
-    # Neo4j 連線設定
-    URI = "bolt://localhost:7687"
-    USER = "neo4j"
-    PASSWORD = "geoinfor"
-
+    # Neo4j 連線（設定見 neo4j_connection.py）
     print("連接 Neo4j...")
-    exporter = GraphExporter(URI, USER, PASSWORD)
+    connection = Neo4jConnection()
+    exporter = GraphExporter(connection)
 
     try:
         print("匯出資料...")
@@ -183,7 +178,7 @@ def main():
         print(f"\n[OK] 資料已儲存到: {output_file}")
 
     finally:
-        exporter.close()
+        connection.close()
         print("\n連線已關閉")
 
 if __name__ == "__main__":
@@ -24,93 +24,35 @@
 """
 
 import pandas as pd
+import numpy as np
 import json
 import os
-import math
+
+from twd97 import twd97_to_wgs84
 
 # ============================================================
 # 第一部分：座標轉換函數
 # ============================================================
 
-def twd97_to_wgs84(x, y):
+def to_wgs84_coordinates(x, y):
     """
-    將 TWD97 座標轉換為 WGS84 經緯度
+    批次將 TWD97 座標轉換為 WGS84 經緯度（GeoJSON 用，取到小數第 6 位，約 0.1 公尺）
 
-    TWD97 是台灣使用的橫麥卡托投影座標系統：
-    - 中央經線: 121°E
-    - 原點緯度: 0°
-    - 東偏移: 250,000 公尺
-    - 北偏移: 0 公尺
+    座標轉換由 twd97 模組以 NumPy 向量化一次完成，座標無效（空值）的點為 NaN
 
     參數:
-        x (float): TWD97 X 座標（東向，單位：公尺）
-        y (float): TWD97 Y 座標（北向，單位：公尺）
+        x (array-like): TWD97 X 座標（東向，單位：公尺）
+        y (array-like): TWD97 Y 座標（北向，單位：公尺）
 
     回傳:
-        tuple: (經度, 緯度) WGS84 座標
+        tuple: (經度陣列, 緯度陣列)
 
     範例:
-        >>> twd97_to_wgs84(250000, 2500000)
-        (121.0, 22.59...)
+        >>> to_wgs84_coordinates([250000], [2500000])
+        (array([121.]), array([22.59...]))
     """
-    # 檢查輸入值是否有效
-    if x is None or y is None or math.isnan(x) or math.isnan(y):
-        return None, None
-
-    # TWD97 參數
-    a = 6378137.0              # 長半軸（公尺）
-    b = 6356752.314245         # 短半軸（公尺）
-    lon0 = 121.0 * math.pi / 180  # 中央經線（弧度）
-    k0 = 0.9999                # 尺度因子
-    dx = 250000                # 東偏移（公尺）
-    dy = 0                     # 北偏移（公尺）
-
-    # 橢球參數計算
-    e = math.sqrt(1 - (b / a) ** 2)  # 第一偏心率
-    e2 = e ** 2 / (1 - e ** 2)       # 第二偏心率的平方
-
-    # 移除偏移
-    x = x - dx
-    y = y - dy
-
-    # 計算底點緯度 (Footpoint Latitude)
-    M = y / k0  # 子午線弧長
-    mu = M / (a * (1 - e ** 2 / 4 - 3 * e ** 4 / 64 - 5 * e ** 6 / 256))
-
-    # 使用級數展開計算底點緯度
-    e1 = (1 - math.sqrt(1 - e ** 2)) / (1 + math.sqrt(1 - e ** 2))
-    J1 = 3 * e1 / 2 - 27 * e1 ** 3 / 32
-    J2 = 21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32
-    J3 = 151 * e1 ** 3 / 96
-    J4 = 1097 * e1 ** 4 / 512
-
-    fp = mu + J1 * math.sin(2 * mu) + J2 * math.sin(4 * mu) + J3 * math.sin(6 * mu) + J4 * math.sin(8 * mu)
-
-    # 計算經緯度
-    C1 = e2 * math.cos(fp) ** 2
-    T1 = math.tan(fp) ** 2
-    R1 = a * (1 - e ** 2) / (1 - e ** 2 * math.sin(fp) ** 2) ** 1.5
-    N1 = a / math.sqrt(1 - e ** 2 * math.sin(fp) ** 2)
-    D = x / (N1 * k0)
-
-    # 計算緯度
-    Q1 = N1 * math.tan(fp) / R1
-    Q2 = D ** 2 / 2
-    Q3 = (5 + 3 * T1 + 10 * C1 - 4 * C1 ** 2 - 9 * e2) * D ** 4 / 24
-    Q4 = (61 + 90 * T1 + 298 * C1 + 45 * T1 ** 2 - 3 * C1 ** 2 - 252 * e2) * D ** 6 / 720
-    lat = fp - Q1 * (Q2 - Q3 + Q4)
-
-    # 計算經度
-    Q5 = D
-    Q6 = (1 + 2 * T1 + C1) * D ** 3 / 6
-    Q7 = (5 - 2 * C1 + 28 * T1 - 3 * C1 ** 2 + 8 * e2 + 24 * T1 ** 2) * D ** 5 / 120
-    lon = lon0 + (Q5 - Q6 + Q7) / math.cos(fp)
-
-    # 轉換為度
-    lat_deg = lat * 180 / math.pi
-    lon_deg = lon * 180 / math.pi
-
-    return round(lon_deg, 6), round(lat_deg, 6)
+    lon, lat = twd97_to_wgs84(x, y)
+    return np.round(lon, 6), np.round(lat, 6)
 
 
 # ============================================================
@@ -191,27 +133,21 @@ def convert_to_geojson(df):
     print(f"      TWD97 (EPSG:3826) → WGS84 (EPSG:4326)")
 
     features = []
-    converted_count = 0
-    error_count = 0
-
-    for idx, row in df.iterrows():
-        # 取得 TWD97 座標（使用左岸座標為主要點位）
-        x = row['TWD97_X_L']
-        y = row['TWD97_Y_L']
-
-        # 轉換座標
-        lon, lat = twd97_to_wgs84(x, y)
 
-        if lon is None or lat is None:
-            error_count += 1
-            continue
+    # 整批轉換座標（使用左岸座標為主要點位）
+    lon, lat = to_wgs84_coordinates(df['TWD97_X_L'], df['TWD97_Y_L'])
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    error_count = int((~valid).sum())
 
+    columns = ['BASIN', 'RIVER', 'NAME', 'CLASS', 'BANK', 'TWD97_X_L', 'TWD97_Y_L']
+    rows = df.loc[valid, columns].to_dict('records')
+    for row, point_lon, point_lat in zip(rows, lon[valid].tolist(), lat[valid].tolist()):
         # 建立 GeoJSON Feature
         feature = {
             "type": "Feature",
             "geometry": {
                 "type": "Point",
-                "coordinates": [lon, lat]
+                "coordinates": [point_lon, point_lat]
             },
             "properties": {
                 "basin": row['BASIN'],           # 水系
@@ -219,12 +155,12 @@ def convert_to_geojson(df):
                 "name": row['NAME'],             # 邊界點名稱
                 "class": row['CLASS'],           # 河川分類
                 "bank": row['BANK'],             # 岸別
-                "twd97_x": x,                    # 原始 X 座標
-                "twd97_y": y                     # 原始 Y 座標
+                "twd97_x": row['TWD97_X_L'],     # 原始 X 座標
+                "twd97_y": row['TWD97_Y_L']      # 原始 Y 座標
             }
         }
         features.append(feature)
-        converted_count += 1
+    converted_count = len(features)
 
     print(f"      成功轉換: {converted_count} 筆")
     if error_count > 0:
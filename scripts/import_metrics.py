@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+匯入效能統計
+依階段累計實際耗時、資料準備 vs 伺服器時間、查詢次數、寫入筆數與
+ResultSummary.counters，匯入結束時印出摘要並寫出 JSON 報告（可跨次比對）
+
+時間拆解:
+    wall_s    階段實際耗時
+    query_s   送出查詢到取得結果摘要的往返時間合計
+    server_s  伺服器端時間合計 (result_available_after + result_consumed_after)
+    prep_s    用戶端準備時間 = wall_s - query_s（讀檔、整理 DataFrame、轉換參數）
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+# 累計的 ResultSummary.counters 欄位
+COUNTER_FIELDS = [
+    'nodes_created', 'nodes_deleted', 'relationships_created', 'relationships_deleted',
+    'properties_set', 'labels_added', 'labels_removed',
+    'indexes_added', 'indexes_removed', 'constraints_added', 'constraints_removed',
+]
+
+OTHER_STAGE = "(其他)"
+
+
+class StageMetrics:
+    """單一階段的統計"""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_s = 0.0
+        self.query_s = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.result_available_after_ms = 0
+        self.result_consumed_after_ms = 0
+        self.counters = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    @property
+    def server_s(self):
+        return (self.result_available_after_ms + self.result_consumed_after_ms) / 1000
+
+    @property
+    def prep_s(self):
+        return max(self.wall_s - self.query_s, 0.0)
+
+    @property
+    def rows_per_s(self):
+        return self.rows / self.wall_s if self.wall_s > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'wall_s': round(self.wall_s, 4),
+            'prep_s': round(self.prep_s, 4),
+            'query_s': round(self.query_s, 4),
+            'server_s': round(self.server_s, 4),
+            'queries': self.queries,
+            'rows': self.rows,
+            'rows_per_s': round(self.rows_per_s, 1),
+            'result_available_after_ms': self.result_available_after_ms,
+            'result_consumed_after_ms': self.result_consumed_after_ms,
+            'counters': dict(self.counters),
+        }
+
+
+class ImportMetrics:
+    """匯入統計收集器
+
+    以 stage() 標記目前執行緒所屬的階段（平行階段各自一個執行緒），寫入元件以 record() 回報每次查詢。
+    非同步分區寫入在共用的事件迴圈執行緒上執行，沒有呼叫端的階段標記：
+    呼叫端先以 current_stage() 取得階段，再以 record(..., stage=) 明確指定
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stage(self, name):
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = StageMetrics(name)
+            return self.stages[name]
+
+    @contextmanager
+    def stage(self, name):
+        """標記階段並累計實際耗時"""
+        metrics = self._stage(name)
+        previous = getattr(self._local, 'stage', None)
+        self._local.stage = metrics
+        t0 = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                metrics.wall_s += elapsed
+            self._local.stage = previous
+
+    def timed(self, name, func):
+        """包裝函數，執行時計入指定階段"""
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def current_stage(self):
+        """目前執行緒所屬的階段（未標記時為 None）"""
+        return getattr(self._local, 'stage', None)
+
+    def record(self, summary, rows, elapsed, stage=None):
+        """記錄一次查詢
+
+        Args:
+            summary: neo4j ResultSummary（可為 None）
+            rows: 送出的參數列數
+            elapsed: 用戶端往返時間（秒）
+            stage: 計入的階段（current_stage() 的結果）；未指定時為目前執行緒所屬的階段
+        """
+        metrics = stage or self.current_stage() or self._stage(OTHER_STAGE)
+        with self._lock:
+            metrics.queries += 1
+            metrics.rows += rows
+            metrics.query_s += elapsed
+            if summary is None:
+                return
+            metrics.result_available_after_ms += summary.result_available_after or 0
+            metrics.result_consumed_after_ms += summary.result_consumed_after or 0
+            for field in COUNTER_FIELDS:
+                metrics.counters[field] += getattr(summary.counters, field, 0) or 0
+
+    def run(self, session, query, **params):
+        """執行查詢並記錄，回傳所有紀錄"""
+        t0 = time.perf_counter()
+        result = session.run(query, **params)
+        records = list(result)
+        self.record(result.consume(), 0, time.perf_counter() - t0)
+        return records
+
+    def to_dict(self, options=None):
+        """JSON 報告內容"""
+        stages = [m.to_dict() for m in self.stages.values()]
+        totals = StageMetrics("total")
+        for m in self.stages.values():
+            totals.query_s += m.query_s
+            totals.queries += m.queries
+            totals.rows += m.rows
+            totals.result_available_after_ms += m.result_available_after_ms
+            totals.result_consumed_after_ms += m.result_consumed_after_ms
+            for field in COUNTER_FIELDS:
+                totals.counters[field] += m.counters[field]
+        totals.wall_s = time.perf_counter() - self._start
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'options': options or {},
+            'stages': stages,
+            'totals': totals.to_dict(),
+        }
+
+    def print_summary(self):
+        """印出各階段統計表"""
+        print("\n【匯入效能統計】")
+        print(f"  {'階段':<16} {'耗時(s)':>8} {'準備(s)':>8} {'伺服器(s)':>10} {'查詢數':>7} "
+              f"{'筆數':>8} {'筆/秒':>10}")
+        for m in self.stages.values():
+            print(f"  {m.name:<16} {m.wall_s:>8.2f} {m.prep_s:>8.2f} {m.server_s:>10.2f} "
+                  f"{m.queries:>7} {m.rows:>8} {m.rows_per_s:>10,.0f}")
+
+    def write_report(self, path, options=None):
+        """寫出 JSON 報告"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(options), ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"[OK] 效能報告已儲存: {path}")
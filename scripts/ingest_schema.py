@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+來源資料欄位綱要與正規化
+每個來源（測站基本資料、河川關係表、集水區 DBF 與各報表工作表）宣告欄位名稱與型別，
+normalize() 以整欄向量化運算一次套用，取代逐格 lambda 清理與 cols[16] 位置存取:
+
+    TEXT      字串，去除前後空白，空字串視為空值
+    LINE      單行字串，另外移除換行符號（PDF 擷取的河川名稱）
+    CATEGORY  類別型別（水系、管理單位、縣市、狀態等重複值很多的欄位）
+    KEY       代碼類主鍵：字串、去除空白、轉大寫
+    FLOAT     可為空值的浮點數（Float64）
+    INT       可為空值的整數（Int64）
+
+用法:
+    stations = normalize(read_excel(path, sheet_name=0), RAINFALL_STATION)
+    nodes = select(stations, RAINFALL_STATION)     # 依綱要取出並改為節點屬性名稱
+"""
+import pandas as pd
+
+
+TEXT = 'text'
+LINE = 'line'
+CATEGORY = 'category'
+KEY = 'key'
+FLOAT = 'float'
+INT = 'int'
+
+
+class Field:
+    """欄位定義
+
+    Args:
+        column: 來源欄位名稱
+        dtype: 欄位型別（TEXT / LINE / CATEGORY / KEY / FLOAT / INT）
+        prop: select() 輸出的屬性名稱（預設同來源欄位名稱）
+        required: 來源缺少此欄位時是否視為錯誤
+        aliases: 舊版來源的欄位名稱（來源沒有 column 時，第一個存在的別名改名為 column）
+    """
+
+    def __init__(self, column, dtype, prop=None, required=True, aliases=()):
+        self.column = column
+        self.dtype = dtype
+        self.prop = prop or column
+        self.required = required
+        self.aliases = tuple(aliases)
+
+    def __repr__(self):
+        return f"Field({self.column!r}, {self.dtype!r})"
+
+
+def _text(series):
+    text = series.astype('str').str.strip()
+    return text.where(series.notna() & (text != ''))
+
+
+def convert(series, dtype):
+    """將單一欄位轉為指定型別（整欄運算）"""
+    if dtype == TEXT:
+        return _text(series)
+    if dtype == LINE:
+        return _text(series.astype('str').str.replace(r'[\r\n]', '', regex=True).where(series.notna()))
+    if dtype == CATEGORY:
+        return _text(series).astype('category')
+    if dtype == KEY:
+        return _text(series).str.upper()
+    if dtype == FLOAT:
+        return pd.to_numeric(series, errors='coerce').astype('Float64')
+    if dtype == INT:
+        return pd.to_numeric(series, errors='coerce').astype('Int64')
+    raise ValueError(f"未知的欄位型別: {dtype}")
+
+
+def normalize(df, fields, name=None):
+    """套用欄位綱要
+
+    欄位名稱去除前後空白；綱要中的欄位轉為宣告的型別，
+    其餘字串欄位只去除前後空白（與原本 clean_dataframe() 相同）
+
+    Raises:
+        KeyError: 缺少必要欄位
+    """
+    df = df.copy(deep=False)
+    df.columns = df.columns.astype(str).str.strip()
+    renames = {}
+    for field in fields:
+        if field.column not in df.columns:
+            alias = next((a for a in field.aliases if a in df.columns), None)
+            if alias is not None:
+                renames[alias] = field.column
+    if renames:
+        df = df.rename(columns=renames)
+    declared = {field.column: field for field in fields}
+    missing = [f.column for f in fields if f.required and f.column not in df.columns]
+    if missing:
+        raise KeyError(f"{name or '來源資料'} 缺少欄位: {missing}（現有欄位: {list(df.columns)}）")
+
+    for column in df.columns:
+        field = declared.get(column)
+        if field is not None:
+            df[column] = convert(df[column], field.dtype)
+        elif isinstance(df[column].dtype, pd.StringDtype):
+            df[column] = df[column].str.strip()
+        elif df[column].dtype == object:
+            # 混合型別欄位只處理字串值，數字等其他值保持原樣
+            stripped = df[column].str.strip()
+            df[column] = stripped.where(stripped.notna(), df[column])
+    return df
+
+
+def optional(fields):
+    """將欄位全部改為非必要（同名欄位只保留第一個定義）"""
+    unique = {}
+    for field in fields:
+        unique.setdefault(field.column, field)
+    return [Field(f.column, f.dtype, f.prop, required=False, aliases=f.aliases) for f in unique.values()]
+
+
+def select(df, fields):
+    """依綱要順序取出欄位並改為屬性名稱（df 需已經 normalize()）"""
+    present = [f for f in fields if f.column in df.columns]
+    frame = df[[f.column for f in present]]
+    frame.columns = [f.prop for f in present]
+    return frame
+
+
+# =============================================================================
+# 測站基本資料（data/測站基本資料2025.xlsx）
+# =============================================================================
+
+_STATION_COMMON = [
+    Field('站號', KEY, 'code'),
+    Field('站名', TEXT, 'name'),
+    Field('類別', CATEGORY, 'category'),
+    Field('存廢狀態', CATEGORY, 'status'),
+]
+_STATION_LOCATION = [
+    Field('管理單位', CATEGORY, 'management_unit'),
+    Field('流域', CATEGORY, 'water_system'),
+    Field('河川', TEXT, 'river'),
+    Field('高程(m)', FLOAT, 'elevation'),
+    Field('縣市', CATEGORY, 'city'),
+    Field('地址', TEXT, 'address'),
+    Field('TWD97M2(X坐標)', FLOAT, 'x'),
+    Field('TWD97M2(Y坐標)', FLOAT, 'y'),
+    Field('替代站號', TEXT, 'backup_station_code'),
+]
+
+# 第 1 個工作表（雨量）
+RAINFALL_STATION = _STATION_COMMON + [Field('氣象署站號', TEXT, 'cwa_code')] + _STATION_LOCATION + [
+    Field('分雨量', TEXT, 'rainfall_minute_years'),
+    Field('時雨量', TEXT, 'rainfall_hour_years'),
+    Field('日雨量', TEXT, 'rainfall_daily_years'),
+    Field('月雨量', TEXT, 'rainfall_monthly_years'),
+]
+
+# 第 2 個工作表（水位流量含砂量）
+WATER_LEVEL_STATION = _STATION_COMMON + _STATION_LOCATION + [
+    Field('時水位', TEXT, 'water_level_hour_years'),
+    Field('日水位', TEXT, 'water_level_daily_years'),
+    Field('月水位', TEXT, 'water_level_monthly_years'),
+    Field('時流量', TEXT, 'flow_hour_years'),
+    Field('日流量', TEXT, 'flow_daily_years'),
+    Field('月流量', TEXT, 'flow_monthly_years'),
+    Field('含砂量及實測流量', TEXT, 'sediment_years'),
+]
+
+# 合併後的測站表（2 號腳本輸出 data/測站資料_水位與氣象.xlsx，各工作表特有的欄位可能不存在）
+STATION_TABLE = optional(RAINFALL_STATION + WATER_LEVEL_STATION + [Field('測站類型', CATEGORY, 'type')])
+
+
+# =============================================================================
+# 河川關係表（data/河川關係_完整版.xlsx）
+# =============================================================================
+
+RIVER = [
+    Field('河川代碼', KEY, 'code'),
+    Field('河川名稱', LINE, 'name'),
+    Field('階層', INT, 'level'),
+    Field('主流水系', LINE, 'main_stream'),
+    Field('序號', TEXT, 'seq_no', required=False),
+    Field('上游河川', LINE, 'upstream', required=False),
+]
+
+
+# =============================================================================
+# 集水區（DBF 與 4 號腳本報表 data/集水區分析報表.xlsx）
+# =============================================================================
+
+WATERSHED_SOURCE = [
+    Field('WS_ID', INT),
+    Field('WS_NAME', TEXT),
+    Field('BASIN_ID', INT),
+    Field('BASIN_NAME', CATEGORY),
+    Field('AREA_M2', FLOAT),
+    Field('BRANCH', TEXT, required=False),
+]
+
+WATERSHED_LIST = WATERSHED_SOURCE + [
+    Field('流域代碼', TEXT),
+    Field('關聯河川數量', INT),
+    Field('主要河川', TEXT),
+]
+
+BASIN_STATS = [
+    Field('BASIN_NAME', TEXT, 'name'),
+    Field('集水區數量', INT, 'watershed_count'),
+    Field('關聯河川總數', INT, 'river_count'),
+    Field('總面積(km2)', FLOAT, 'area_km2'),
+    Field('平均集水區面積(km2)', FLOAT, 'avg_area_km2'),
+]
+
+WATERSHED_RIVER = [
+    Field('集水區ID', KEY, 'ws_id'),
+    Field('河川代碼', KEY, 'river_code'),
+    Field('河川階層', INT, 'river_level'),
+    Field('流域代碼', TEXT, required=False),
+]
+
+
+# =============================================================================
+# 測站河川配對報表（data/測站河川配對分析報表.xlsx「能配對的測站」）
+# =============================================================================
+
+# 舊版報表（script 3 改版前產生）的測站代號欄位名稱為「測站代號」
+MATCHED_STATION = [
+    Field('站號', KEY, 'station_code', aliases=('測站代號',)),
+    Field('河川代碼', KEY, 'river_code'),
+    Field('匹配方式', CATEGORY, 'match_type'),
+    Field('河川', TEXT, 'original_river'),
+    Field('匹配的河川', TEXT, 'matched_river'),
+]
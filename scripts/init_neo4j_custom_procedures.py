@@ -6,26 +6,19 @@ Neo4j 自定義程序初始化腳本
 完整工具清單（共 10 個）：
 - Neo4j Procedures（9 個）：本檔案定義，純 Cypher 查詢
 - DIFY CODE 工具（1 個）：searchStationObservation（查詢測站觀測資料，需呼叫外部 API）
-"""
-from neo4j import GraphDatabase
-from dotenv import load_dotenv
-import os
-
-# 載入環境變數
-load_dotenv()
 
-# 連接設定
-NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
-NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
-NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD')
+河川 / 水系名稱以 RiverAlias 節點查詢（8 號腳本由 river_alias_index.py 編譯的別名索引匯入），
+括號別名、臺/台、「水系」「流域」字尾等寫法都已是索引中的鍵，程序內不再處理字串
+"""
+from neo4j_connection import Neo4jConnection, NEO4J_URI
 
 print("=" * 80)
 print("初始化 Neo4j 自定義程序與全文索引")
 print("=" * 80)
 print(f"連接到：{NEO4J_URI}\n")
 
-# 建立連接
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# 建立連接（連線設定由環境變數 / .env 讀取，見 neo4j_connection.py）
+connection = Neo4jConnection()
 
 # Fulltext 索引定義
 FULLTEXT_INDEXES = [
@@ -156,18 +149,8 @@ CUSTOM_PROCEDURES = [
         'name': 'getStationsByRiver',
         'description': '列出某河川沿線的所有測站（如「大甲溪上有哪些測站」）',
         'query': '''
-            MATCH (s:Station)-[:LOCATED_ON]->(r:River)
-            WHERE r.name = $riverName
-               OR r.name STARTS WITH $riverName
-               OR r.name STARTS WITH ($riverName + '(')
-               OR r.name STARTS WITH ($riverName + '（')
-               OR r.name STARTS WITH ($riverName + '【')
-               OR split(r.name, '(')[0] = $riverName
-               OR split(r.name, '（')[0] = $riverName
-               OR split(r.name, '【')[0] = $riverName
-               OR r.name CONTAINS ('(' + $riverName + ')')
-               OR r.name CONTAINS ('（' + $riverName + '）')
-               OR r.name CONTAINS ('【' + $riverName + '】')
+            MATCH (:RiverAlias {key: $riverName})-[:ALIAS_OF]->(r:River)
+            MATCH (s:Station)-[:LOCATED_ON]->(r)
             RETURN s.code AS code,
                    s.name AS name,
                    CASE WHEN s:Rainfall THEN "雨量" ELSE "水位" END AS type,
@@ -197,11 +180,8 @@ CUSTOM_PROCEDURES = [
         'name': 'getStationsByWaterSystem',
         'description': '列出某水系/流域內所有河川的測站（如「大甲溪水系有哪些測站」「蘭陽溪流域的測站」）',
         'query': '''
-            MATCH (s:Station)-[:LOCATED_ON]->(r:River)-[:BELONGS_TO]->(ws:WaterSystem)
-            WHERE ws.name = $waterSystemName
-               OR ws.name = replace($waterSystemName, '水系', '')
-               OR ws.name = replace($waterSystemName, '流域', '')
-               OR ws.name + '水系' = $waterSystemName
+            MATCH (:RiverAlias {key: $waterSystemName})-[:ALIAS_OF]->(:River {level: 1})-[:BELONGS_TO]->(ws:WaterSystem)
+            MATCH (s:Station)-[:LOCATED_ON]->(r:River)-[:BELONGS_TO]->(ws)
             RETURN s.code AS code,
                    s.name AS name,
                    CASE WHEN s:Rainfall THEN "雨量" ELSE "水位" END AS type,
@@ -339,14 +319,7 @@ CUSTOM_PROCEDURES = [
         'name': 'getRiverTributaries',
         'description': '列出某河川的所有上游支流（遞迴查詢，如「大甲溪有哪些支流」）。回答時請按 levelName 分組呈現',
         'query': '''
-            MATCH (main:River)
-            WHERE main.name = $riverName
-               OR main.name STARTS WITH ($riverName + '(')
-               OR main.name STARTS WITH ($riverName + '（')
-               OR split(main.name, '(')[0] = $riverName
-               OR split(main.name, '（')[0] = $riverName
-               OR main.name CONTAINS ('(' + $riverName + ')')
-               OR main.name CONTAINS ('（' + $riverName + '）')
+            MATCH (:RiverAlias {key: $riverName})-[:ALIAS_OF]->(main:River)
             WITH main
             MATCH (tributary:River)-[:FLOWS_INTO*1..10]->(main)
             WITH DISTINCT tributary, main
@@ -386,11 +359,8 @@ CUSTOM_PROCEDURES = [
         'name': 'getRiversInWaterSystem',
         'description': '列出某水系/流域內的所有河川（如「大甲溪水系有哪些河川」「蘭陽溪流域的河川」）。回答時請按 levelName 分組呈現',
         'query': '''
-            MATCH (r:River)-[:BELONGS_TO]->(ws:WaterSystem)
-            WHERE ws.name = $waterSystemName
-               OR ws.name = replace($waterSystemName, '水系', '')
-               OR ws.name = replace($waterSystemName, '流域', '')
-               OR ws.name + '水系' = $waterSystemName
+            MATCH (:RiverAlias {key: $waterSystemName})-[:ALIAS_OF]->(:River {level: 1})-[:BELONGS_TO]->(ws:WaterSystem)
+            MATCH (r:River)-[:BELONGS_TO]->(ws)
             OPTIONAL MATCH (r)-[:FLOWS_INTO]->(downstream:River)
             WITH r, downstream
             ORDER BY r.level, downstream.name, r.name
@@ -426,15 +396,10 @@ CUSTOM_PROCEDURES = [
         'name': 'getRiverFlowPath',
         'description': '查詢河川流向（如「南湖溪流到哪裡」「這條河最後流到哪」）',
         'query': '''
-            MATCH (start:River)
-            WHERE start.name = $riverName
-               OR start.name STARTS WITH ($riverName + '(')
-               OR start.name STARTS WITH ($riverName + '（')
-               OR split(start.name, '(')[0] = $riverName
-               OR split(start.name, '（')[0] = $riverName
-               OR start.name CONTAINS ('(' + $riverName + ')')
-               OR start.name CONTAINS ('（' + $riverName + '）')
+            MATCH (:RiverAlias {key: $riverName})-[alias:ALIAS_OF]->(start:River)
             WITH start
+            ORDER BY alias.rank
+            LIMIT 1
             MATCH path = (start)-[:FLOWS_INTO*0..10]->(end:River)
             WHERE NOT (end)-[:FLOWS_INTO]->()
             WITH [node IN nodes(path) | node.name] AS riverPath
@@ -452,7 +417,7 @@ CUSTOM_PROCEDURES = [
 ]
 
 try:
-    with driver.session() as session:
+    with connection.session() as session:
         # 檢查 APOC 是否可用
         print("[檢查] 驗證 APOC 是否已安裝...")
         try:
@@ -504,7 +469,7 @@ try:
     print("[清理] 移除舊的自定義程序...")
 
     # 先在 neo4j 列出程序
-    with driver.session(database="neo4j") as neo4j_session:
+    with connection.session(database="neo4j") as neo4j_session:
         try:
             result = neo4j_session.run("CALL apoc.custom.list() YIELD name RETURN name")
             procedures = [r['name'] for r in result]
@@ -514,7 +479,7 @@ try:
 
     # 再在 system 執行刪除
     if procedures:
-        with driver.session(database="system") as system_session:
+        with connection.session(database="system") as system_session:
             for proc_name in procedures:
                 try:
                     # dropProcedure(name, databaseName) - 必須指定目標資料庫
@@ -530,7 +495,7 @@ try:
         print("    [INFO] 沒有舊程序需要清理\n")
 
     # 使用 system database 來安裝程序（installProcedure 必須在 system db 執行）
-    with driver.session(database="system") as system_session:
+    with connection.session(database="system") as system_session:
         # 建立所有自定義程序
         print("[建立] 開始建立自定義程序（使用 system database）...\n")
         created_count = 0
@@ -581,7 +546,7 @@ try:
     print("=" * 80)
 
     # 在 neo4j database 驗證已建立的程序
-    with driver.session(database="neo4j") as neo4j_session:
+    with connection.session(database="neo4j") as neo4j_session:
         print("\n[驗證] 已建立的自定義程序：\n")
         result = neo4j_session.run("CALL apoc.custom.list() YIELD name, description RETURN name, description")
         for record in result:
@@ -649,5 +614,5 @@ except Exception as e:
     traceback.print_exc()
 
 finally:
-    driver.close()
+    connection.close()
     print("\n已關閉 Neo4j 連線")
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Neo4j 連線管理
+所有匯入器與工具共用同一個已調校的 driver（同一個連線池），
+連線帳密與連線池設定統一由環境變數 / .env 讀取
+
+非同步寫入（async_relation_writer）使用同一個 Neo4jConnection 的非同步 driver:
+非同步 driver 的連線不能跨事件迴圈共用，因此由連線物件在專屬執行緒上維持單一事件迴圈與
+單一非同步 driver，所有非同步寫入（包含不同工作執行緒送出的）都在這個迴圈上執行。
+連線上限 max_pool_size 由同步與非同步 driver 分配（async_pool_size 為非同步的份額），
+兩者合計不超過 max_pool_size；同步與非同步 session 一併計入使用率統計
+
+環境變數:
+    NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD / NEO4J_DATABASE
+    NEO4J_MAX_POOL_SIZE        連線池上限
+    NEO4J_FETCH_SIZE           每次向伺服器拉取的紀錄數
+    NEO4J_ACQUISITION_TIMEOUT  取得連線的等待上限（秒）
+"""
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+
+NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
+NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
+NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'geoinfor')
+NEO4J_DATABASE = os.getenv('NEO4J_DATABASE', 'neo4j')
+
+DEFAULT_POOL_SIZE = int(os.getenv('NEO4J_MAX_POOL_SIZE', 50))
+DEFAULT_FETCH_SIZE = int(os.getenv('NEO4J_FETCH_SIZE', 1000))
+DEFAULT_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_ACQUISITION_TIMEOUT', 60.0))
+
+
+class Neo4jConnection:
+    """共用 Neo4j 連線
+
+    session() 與 driver.session() 介面相同，可直接傳給 BatchWriter 等
+    需要 driver 的元件；同時統計使用中的 session 數，用於回報連線池使用率
+
+    用法:
+        with Neo4jConnection() as connection:
+            with connection.session() as session:
+                session.run("RETURN 1")
+    """
+
+    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD,
+                 database=NEO4J_DATABASE, max_pool_size=DEFAULT_POOL_SIZE,
+                 fetch_size=DEFAULT_FETCH_SIZE, acquisition_timeout=DEFAULT_ACQUISITION_TIMEOUT,
+                 async_pool_size=0):
+        self.uri = uri
+        self.auth = (user, password)
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.fetch_size = fetch_size
+        self.acquisition_timeout = acquisition_timeout
+        # 非同步份額最多到上限減一，同步 driver 至少保留一條連線
+        self.async_pool_size = max(0, min(async_pool_size, max_pool_size - 1))
+        self.sync_pool_size = max_pool_size - self.async_pool_size
+        self.driver = GraphDatabase.driver(uri, auth=self.auth, **self.driver_config(self.sync_pool_size))
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._peak = 0
+        self._opened = 0
+
+        self._async_lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+        self._async_driver = None
+        self._async_slots = None
+
+    def driver_config(self, pool_size):
+        """driver 連線池設定（同步與非同步 driver 共用，連線數各自為分配到的份額）"""
+        return {
+            'max_connection_pool_size': pool_size,
+            'connection_acquisition_timeout': self.acquisition_timeout,
+            'fetch_size': self.fetch_size,
+        }
+
+    def _count_open(self):
+        with self._lock:
+            self._active += 1
+            self._opened += 1
+            self._peak = max(self._peak, self._active)
+
+    def _count_close(self):
+        with self._lock:
+            self._active -= 1
+
+    @contextmanager
+    def session(self, database=None, **config):
+        """開啟 session，未指定 database 時使用預設資料庫"""
+        self._count_open()
+        try:
+            with self.driver.session(database=database or self.database, **config) as session:
+                yield session
+        finally:
+            self._count_close()
+
+    # -------------------------------------------------------------------------
+    # 非同步 driver（專屬事件迴圈）
+    # -------------------------------------------------------------------------
+
+    def _start_async(self):
+        """啟動專屬事件迴圈執行緒並在迴圈內建立非同步 driver（只建立一次）"""
+        with self._async_lock:
+            if self._loop is not None:
+                return
+            if self.async_pool_size == 0:
+                raise RuntimeError("非同步寫入需要分配連線份額（Neo4jConnection(async_pool_size=N)）")
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="neo4j-async", daemon=True)
+            thread.start()
+
+            async def create_driver():
+                # 同時開啟的非同步 session 不超過非同步份額（多個寫入同時進行時在此等待）
+                self._async_slots = asyncio.Semaphore(self.async_pool_size)
+                return AsyncGraphDatabase.driver(self.uri, auth=self.auth,
+                                                 **self.driver_config(self.async_pool_size))
+
+            self._async_driver = asyncio.run_coroutine_threadsafe(create_driver(), loop).result()
+            self._loop, self._loop_thread = loop, thread
+
+    def run_async(self, coro):
+        """在共用事件迴圈上執行 coroutine 並等待結果（可由任何執行緒呼叫）
+
+        coroutine 內以 async_session() 取得連線
+        """
+        try:
+            self._start_async()
+        except Exception:
+            coro.close()
+            raise
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @asynccontextmanager
+    async def async_session(self, database=None, **config):
+        """開啟非同步 session（只能在 run_async() 執行的 coroutine 內使用）"""
+        async with self._async_slots:
+            self._count_open()
+            try:
+                async with self._async_driver.session(database=database or self.database, **config) as session:
+                    yield session
+            finally:
+                self._count_close()
+
+    def _close_async(self):
+        with self._async_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._async_driver.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+            self._loop = self._loop_thread = self._async_driver = self._async_slots = None
+
+    def pool_status(self):
+        """連線池使用狀況
+
+        Returns:
+            dict: max_pool_size, sync_pool_size, async_pool_size,
+                  active, peak, opened（同步與非同步 session 合計）, utilisation（尖峰 / 上限）
+        """
+        with self._lock:
+            return {
+                'max_pool_size': self.max_pool_size,
+                'sync_pool_size': self.sync_pool_size,
+                'async_pool_size': self.async_pool_size,
+                'active': self._active,
+                'peak': self._peak,
+                'opened': self._opened,
+                'utilisation': self._peak / self.max_pool_size if self.max_pool_size else 0.0,
+            }
+
+    def report_pool(self):
+        """印出連線池使用率"""
+        status = self.pool_status()
+        split = (f"（同步 {status['sync_pool_size']} + 非同步 {status['async_pool_size']}）"
+                 if status['async_pool_size'] else "")
+        print(f"[連線池] 上限 {status['max_pool_size']} 條連線{split}，尖峰同時使用 {status['peak']} 條 "
+              f"({status['utilisation']:.0%})，共開啟 {status['opened']} 個 session")
+
+    def close(self):
+        self._close_async()
+        self.driver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 報表寫出器（單次寫出）
+以 openpyxl 的 write-only 模式逐列串流寫出工作表，凍結窗格、欄寬與標題列樣式在同一次寫出時設定，
+不必再以 load_workbook() 重新開啟剛寫好的檔案設定凍結窗格後再存一次；
+write-only 模式不在記憶體中保留儲存格物件，工作表再大記憶體用量也維持固定
+
+用法:
+    with ReportWriter('data/報表.xlsx') as writer:
+        writer.write_sheet(summary_df, '摘要統計')
+        writer.write_sheet(basin_stats, '流域統計', index=True)
+
+    write_report('data/河川關係_完整版.xlsx', {'Sheet1': df})   # 單一工作表
+"""
+import os
+import re
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+
+FREEZE_PANES = 'A2'         # 凍結第一列（標題列）
+MIN_COLUMN_WIDTH = 6
+MAX_COLUMN_WIDTH = 50
+# 欄寬估算只取前幾列（全形字元算兩個字寬）
+WIDTH_SAMPLE_ROWS = 1000
+WIDE_CHAR_PATTERN = re.compile(r'[^\x00-\xff]')
+# 儲存格值逐段轉換的列數（只複製這一段為 object，不複製整個工作表）
+CHUNK_ROWS = 10000
+
+HEADER_FONT = Font(bold=True)
+HEADER_FILL = PatternFill('solid', start_color='DDEBF7')
+HEADER_BORDER = Border(bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+
+
+def _display_width(series):
+    """欄位內容的最大顯示寬度（全形字元算兩個字寬）"""
+    text = series.head(WIDTH_SAMPLE_ROWS).dropna().astype(str)
+    if text.empty:
+        return 0
+    return int((text.str.len() + text.str.count(WIDE_CHAR_PATTERN)).max())
+
+
+def _cell_values(frame, chunk_rows=CHUNK_ROWS):
+    """逐列取出儲存格值（空值轉為 None、numpy 型別轉為 Python 原生型別，與 to_excel 相同）
+
+    每次只轉換 chunk_rows 列，記憶體用量不隨工作表大小增加
+    """
+    for start in range(0, len(frame), chunk_rows):
+        values = frame.iloc[start:start + chunk_rows].astype(object)
+        values = values.where(values.notna(), None)
+        yield from values.itertuples(index=False, name=None)
+
+
+class ReportWriter:
+    """單次寫出的 Excel 報表
+
+    Args:
+        path: 輸出檔案
+        freeze_panes: 每個工作表的凍結窗格（None 為不凍結）
+    """
+
+    def __init__(self, path, freeze_panes=FREEZE_PANES):
+        self.path = Path(path)
+        self.freeze_panes = freeze_panes
+        self.workbook = Workbook(write_only=True)
+        self.sheet_names = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
+        return False
+
+    def write_sheet(self, df, sheet_name, index=False):
+        """寫出一個工作表（標題列為粗體、底色、下框線；欄寬依內容估算）
+
+        index=True 時索引寫在第一欄，標題為索引名稱（與 DataFrame.to_excel 相同）
+        """
+        frame = df.reset_index() if index else df
+        frame = frame.set_axis([str(col) for col in frame.columns], axis=1)
+
+        ws = self.workbook.create_sheet(sheet_name)
+        ws.freeze_panes = self.freeze_panes
+        for i, column in enumerate(frame.columns, 1):
+            width = max(len(column) + len(WIDE_CHAR_PATTERN.findall(column)), _display_width(frame.iloc[:, i - 1]))
+            ws.column_dimensions[get_column_letter(i)].width = min(max(width + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+
+        header = []
+        for column in frame.columns:
+            cell = WriteOnlyCell(ws, value=column)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.border = HEADER_BORDER
+            cell.alignment = HEADER_ALIGNMENT
+            header.append(cell)
+        ws.append(header)
+        for row in _cell_values(frame):
+            ws.append(row)
+        self.sheet_names.append(sheet_name)
+        return ws
+
+    def save(self):
+        """寫出檔案（先寫暫存檔再更名，中斷時不會留下不完整的報表）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp{self.path.suffix}")
+        try:
+            self.workbook.save(tmp_path)
+            tmp_path.replace(self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+def write_report(path, sheets, freeze_panes=FREEZE_PANES):
+    """寫出多個工作表（sheets: 工作表名稱 -> DataFrame，依順序寫出）"""
+    with ReportWriter(path, freeze_panes) as writer:
+        for sheet_name, df in sheets.items():
+            writer.write_sheet(df, sheet_name)
+    return Path(path)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+河川別名索引（編譯後的查詢結構）
+由河川關係表一次產生所有名稱變體鍵，存為版本化的 JSON 檔，
+配對報表（3 號腳本）、Neo4j 匯入（8 號腳本）與自定義程序共用同一份鍵集合，
+查詢時只需以原字串查表，不必再各自移除括號、替換臺/台或去除「水系」字尾
+
+鍵的種類（同一鍵對應多條河川時，依下列順序決定主要河川）:
+    name          主名稱（移除括號）            '乾溪(里仁溪)' -> '乾溪'
+    alias         括號內的別名                  '乾溪(里仁溪)' -> '里仁溪'
+    full          含括號的完整名稱              '乾溪(里仁溪)'
+    spelling      臺/台 互換的寫法              '臺東溪' <-> '台東溪'
+    water_system  主流加「水系」「流域」字尾    '大甲溪' -> '大甲溪水系'、'大甲溪流域'
+    short         主名稱去除「溪」字尾          '大甲溪' -> '大甲'
+
+name 與 alias 為測站配對使用的鍵，優先於其他種類，彼此之間依河川表順序
+（同一河川內主名稱優先於別名），與原本逐列建立的對照表相同
+
+用法:
+    python scripts/river_alias_index.py      # 由河川關係表重新產生索引檔
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from river_matching import name_variants
+from source_cache import file_hash, read_excel
+
+
+# 索引格式或變體規則變動時遞增，舊版索引檔會自動重建
+INDEX_VERSION = 1
+
+RIVER_EXCEL = Path("data/河川關係_完整版.xlsx")
+ALIAS_INDEX_PATH = Path("data/河川別名索引.json")
+
+KINDS = ('name', 'alias', 'full', 'spelling', 'water_system', 'short')
+# 測站配對使用的鍵（與 3 號腳本原本的直接匹配 / 別名匹配規則相同）
+MATCH_KINDS = ('name', 'alias')
+
+SPELLINGS = [('臺', '台'), ('台', '臺')]
+WATER_SYSTEM_SUFFIXES = ('水系', '流域')
+SHORT_SUFFIX = '溪'
+
+
+def _derived_keys(rivers, variants):
+    """由主名稱 / 別名衍生其他寫法的鍵"""
+    frames = []
+
+    # 含括號的完整名稱（與主名稱不同者）
+    full = rivers['河川名稱'].astype(str).str.strip()
+    main = variants[variants['kind'] == 'name'].set_index('source')['variant']
+    full = full[full != main.reindex(full.index)]
+    frames.append(pd.DataFrame({'source': full.index, 'order': 0, 'variant': full.values, 'kind': 'full'}))
+
+    # 主流的水系 / 流域名稱
+    main_streams = main[rivers['階層'].reindex(main.index) == 1]
+    for order, suffix in enumerate(WATER_SYSTEM_SUFFIXES):
+        frames.append(pd.DataFrame({'source': main_streams.index, 'order': order,
+                                    'variant': (main_streams + suffix).values, 'kind': 'water_system'}))
+
+    # 去除「溪」字尾（至少保留兩個字）
+    short = main[main.str.endswith(SHORT_SUFFIX) & (main.str.len() >= 3)].str[:-len(SHORT_SUFFIX)]
+    frames.append(pd.DataFrame({'source': short.index, 'order': 0, 'variant': short.values, 'kind': 'short'}))
+
+    # 臺/台 互換（套用在以上所有鍵）
+    keys = pd.concat([variants] + frames, ignore_index=True)
+    for old, new in SPELLINGS:
+        swapped = keys[keys['variant'].str.contains(old, regex=False)]
+        frames.append(swapped.assign(variant=swapped['variant'].str.replace(old, new, regex=False),
+                                     kind='spelling'))
+    return frames
+
+
+def build_alias_index(rivers_df, source_sha256=None):
+    """由河川關係表建立別名索引
+
+    Returns:
+        dict: version、source_sha256、rivers（河川表順序）、keys（鍵 -> 種類與河川序號，第一條為主要河川）、
+              collisions（對應多個河川代碼的鍵）
+    """
+    rivers = rivers_df.reset_index(drop=True)
+    variants = name_variants(rivers['河川名稱'])
+    variants['kind'] = np.where(variants['order'] == 0, 'name', 'alias')
+    keys = pd.concat([variants] + _derived_keys(rivers, variants), ignore_index=True)
+    keys = keys[keys['variant'] != '']
+
+    # 配對用的鍵依河川表順序；其他種類排在後面，依種類順序
+    rank = {kind: 0 if kind in MATCH_KINDS else i for i, kind in enumerate(KINDS)}
+    keys['tier'] = keys['kind'].map(rank)
+    keys = keys.sort_values(['tier', 'source', 'order'], kind='stable')
+    keys = keys.drop_duplicates(['variant', 'source'], keep='first')
+
+    grouped = keys.groupby('variant', sort=False)
+    kinds = grouped['kind'].first()
+    sources = grouped['source'].agg(list)
+
+    codes = rivers['河川代碼'].astype(str).tolist()
+    collisions = {}
+    for key, members in sources.items():
+        key_codes = list(dict.fromkeys(codes[i] for i in members))
+        if len(key_codes) > 1:
+            collisions[key] = key_codes
+
+    return {
+        'version': INDEX_VERSION,
+        'source_sha256': source_sha256,
+        'rivers': [
+            {'code': code, 'name': name, 'level': int(level),
+             'main_stream': None if pd.isna(main_stream) else str(main_stream)}
+            for code, name, level, main_stream in zip(
+                codes, rivers['河川名稱'].astype(str), rivers['階層'], rivers['主流水系'])
+        ],
+        'keys': {key: {'kind': kinds[key], 'rivers': [int(i) for i in members]}
+                 for key, members in sources.items()},
+        'collisions': collisions,
+    }
+
+
+class RiverAliasIndex:
+    """別名索引（查表為 dict 查詢，不做任何字串處理）"""
+
+    def __init__(self, data):
+        self.version = data['version']
+        self.source_sha256 = data['source_sha256']
+        self.rivers = data['rivers']
+        self.keys = data['keys']
+        self.collisions = data['collisions']
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidates(self, name, kinds=None):
+        """名稱對應的所有河川（主要河川在前）"""
+        entry = self.keys.get(name)
+        if entry is None or (kinds is not None and entry['kind'] not in kinds):
+            return []
+        return [self.rivers[i] for i in entry['rivers']]
+
+    def lookup(self, name, kinds=None):
+        """名稱對應的主要河川，找不到時回傳 None"""
+        matches = self.candidates(name, kinds)
+        return matches[0] if matches else None
+
+    def variant_frame(self, kinds=MATCH_KINDS):
+        """指定種類的鍵 -> 主要河川對照表（river_matching.match_stations 使用）
+
+        Returns:
+            DataFrame: variant、河川名稱、河川代碼
+        """
+        keys = [(key, entry['rivers'][0]) for key, entry in self.keys.items() if entry['kind'] in kinds]
+        return pd.DataFrame({
+            'variant': pd.Series([key for key, _ in keys], dtype=object),
+            '河川名稱': pd.Series([self.rivers[i]['name'] for _, i in keys], dtype=object),
+            '河川代碼': pd.Series([self.rivers[i]['code'] for _, i in keys], dtype=object),
+        })
+
+    def alias_frame(self):
+        """RiverAlias 節點屬性（key、kind、collision）"""
+        return pd.DataFrame({
+            'key': list(self.keys),
+            'kind': [entry['kind'] for entry in self.keys.values()],
+            'collision': [key in self.collisions for key in self.keys],
+        })
+
+    def alias_of_frame(self):
+        """RiverAlias -> River 關係（同一鍵的每個河川代碼一列，rank 0 為主要河川）"""
+        rows = []
+        for key, entry in self.keys.items():
+            codes = dict.fromkeys(self.rivers[i]['code'] for i in entry['rivers'])
+            rows.extend((key, code, rank) for rank, code in enumerate(codes))
+        return pd.DataFrame(rows, columns=['alias_key', 'river_code', 'rank'])
+
+
+def write_alias_index(data, path=ALIAS_INDEX_PATH):
+    """寫出索引檔（先寫暫存檔再更名；內容固定排序，來源未變時檔案內容相同）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding='utf-8')
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def compile_alias_index(rivers_path=RIVER_EXCEL, path=ALIAS_INDEX_PATH):
+    """由河川關係表產生索引檔"""
+    data = build_alias_index(read_excel(rivers_path), file_hash(rivers_path))
+    write_alias_index(data, path)
+    index = RiverAliasIndex(data)
+    print(f"[OK] 河川別名索引: {len(index.rivers)} 條河川、{len(index)} 個鍵"
+          f"（{len(index.collisions)} 個鍵對應多個河川代碼）: {path}")
+    return index
+
+
+def load_alias_index(rivers_path=RIVER_EXCEL, path=ALIAS_INDEX_PATH):
+    """讀取索引檔；不存在、版本不同或河川關係表已變動時重新產生"""
+    path = Path(path)
+    if path.exists():
+        data = json.loads(path.read_text(encoding='utf-8'))
+        if data.get('version') == INDEX_VERSION and data.get('source_sha256') == file_hash(rivers_path):
+            return RiverAliasIndex(data)
+        print(f"[INFO] 河川別名索引已過期，重新產生: {path}")
+    return compile_alias_index(rivers_path, path)
+
+
+def main():
+    if not RIVER_EXCEL.exists():
+        print(f"[錯誤] 找不到河川關係表: {RIVER_EXCEL}，請先執行 1 號腳本")
+        return 1
+    index = compile_alias_index()
+    for kind in KINDS:
+        count = sum(1 for entry in index.keys.values() if entry['kind'] == kind)
+        print(f"  {kind}: {count} 個鍵")
+    for key, codes in list(index.collisions.items())[:10]:
+        print(f"  [INFO] 名稱衝突 {key}: {', '.join(codes)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
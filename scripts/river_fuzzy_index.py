@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+河川名稱模糊候選索引
+對無法精確配對的河川名稱（如「客雅溪」實際為「客雅溪排水」）提供排序後的候選河川:
+
+1. 以字元二元組（bigram，前後加邊界符號）建立反向索引，查詢時以 bincount 一次算出
+   每個名稱鍵共用的 bigram 數，只保留長度差與共用數都達到下界的鍵
+   （q-gram 下界：每次編輯最多破壞 2 個 bigram）
+2. 以限定距離的編輯距離驗證候選，相似度 = 1 - 距離 / 較長名稱長度，
+   允許的距離同時受 max_distance 與 min_score 限制
+3. 依測站的水系（流域）與站號前綴限縮河川範圍（索引中不存在的水系或前綴不限縮）
+
+名稱鍵來自 river_alias_index 的別名索引（主名稱、別名、完整名稱、臺/台寫法），
+單次查詢只處理少數候選，大型外部測站清單也能逐筆快速比對
+"""
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from river_matching import BRACKET_ALIAS_PATTERN, BRACKET_REMOVE_PATTERN
+
+
+# 參與模糊比對的鍵種類（不含「水系」字尾與去除「溪」字尾的縮寫）
+FUZZY_KINDS = ('name', 'alias', 'full', 'spelling')
+DEFAULT_MAX_DISTANCE = 2
+DEFAULT_MIN_SCORE = 0.5
+DEFAULT_LIMIT = 3
+# 站號前綴與河川代碼比對的長度（依序嘗試，與 Schema 遷移的代碼檢查相同）
+CODE_PREFIX_LENGTHS = (4, 3)
+
+
+def bigrams(text):
+    """字元二元組（前後加邊界符號，兩個字的名稱也有 3 個 bigram）"""
+    padded = f"\x02{text}\x03"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def query_variants(text):
+    """單一名稱的變體（主名稱 + 括號內別名，規則同 river_matching.name_variants）"""
+    names = [BRACKET_REMOVE_PATTERN.sub('', text).strip()]
+    names += [alias.strip() for alias in BRACKET_ALIAS_PATTERN.findall(text)]
+    return list(dict.fromkeys(n for n in names if n))
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein 距離；超過 max_distance 時提早結束並回傳 max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyRiverIndex:
+    """河川名稱模糊候選索引
+
+    Args:
+        alias_index: RiverAliasIndex
+        max_distance: 可接受的最大編輯距離
+        min_score: 可接受的最低相似度
+    """
+
+    def __init__(self, alias_index, kinds=FUZZY_KINDS, max_distance=DEFAULT_MAX_DISTANCE,
+                 min_score=DEFAULT_MIN_SCORE):
+        self.rivers = alias_index.rivers
+        self.max_distance = max_distance
+        self.min_score = min_score
+        self.keys = []
+        self.key_rivers = []
+        postings = defaultdict(list)
+        for key, entry in alias_index.keys.items():
+            if entry['kind'] not in kinds:
+                continue
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self.key_rivers.append(entry['rivers'])
+            for gram in bigrams(key):
+                postings[gram].append(key_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+
+        # 限縮範圍: 水系 -> 河川序號、代碼前綴 -> 河川序號
+        self.by_water_system = defaultdict(set)
+        self.by_code_prefix = defaultdict(set)
+        for i, river in enumerate(self.rivers):
+            if river['main_stream']:
+                self.by_water_system[river['main_stream']].add(i)
+            for length in CODE_PREFIX_LENGTHS:
+                self.by_code_prefix[river['code'][:length]].add(i)
+
+    def allowed_rivers(self, water_system=None, station_code=None):
+        """依水系與站號前綴限縮的河川序號集合，不限縮時回傳 None"""
+        allowed = None
+        if water_system and water_system in self.by_water_system:
+            allowed = self.by_water_system[water_system]
+        if station_code:
+            for length in CODE_PREFIX_LENGTHS:
+                prefixed = self.by_code_prefix.get(str(station_code)[:length])
+                if prefixed:
+                    allowed = prefixed if allowed is None else allowed & prefixed
+                    break
+        return allowed
+
+    def _key_candidates(self, name):
+        """長度差與共用 bigram 數達到下界的名稱鍵
+
+        Returns:
+            list[tuple]: (鍵序號, 該鍵允許的最大編輯距離)
+        """
+        arrays = [self.postings[gram] for gram in bigrams(name) if gram in self.postings]
+        if not arrays:
+            return []
+        shared = np.bincount(np.concatenate(arrays), minlength=len(self.keys))
+        longer = np.maximum(self.key_lengths, len(name))
+        allowed = np.minimum(self.max_distance, np.floor(longer * (1 - self.min_score))).astype(int)
+        ok = ((shared > 0)
+              & (np.abs(self.key_lengths - len(name)) <= allowed)
+              & (shared >= longer + 1 - 2 * allowed))
+        key_ids = np.flatnonzero(ok)
+        return list(zip(key_ids.tolist(), allowed[key_ids].tolist()))
+
+    def suggest(self, name, water_system=None, station_code=None, limit=DEFAULT_LIMIT):
+        """名稱的候選河川（相似度由高到低）
+
+        Args:
+            name: 河川名稱（括號內的別名也會分別比對）
+            water_system: 測站所屬水系（流域）
+            station_code: 站號（前 4 / 3 碼與河川代碼比對）
+
+        Returns:
+            list[dict]: 河川名稱、河川代碼、相似度、編輯距離、比對名稱
+        """
+        if name is None or pd.isna(name) or str(name).strip() in ('', 'nan'):
+            return []
+        allowed = self.allowed_rivers(water_system, station_code)
+        queries = query_variants(str(name).strip())
+
+        best = {}
+        for query in queries:
+            for key_id, max_distance in self._key_candidates(query):
+                key = self.keys[key_id]
+                distance = edit_distance(query, key, max_distance)
+                if distance > max_distance:
+                    continue
+                score = 1 - distance / max(len(query), len(key))
+                for river_id in self.key_rivers[key_id]:
+                    if allowed is not None and river_id not in allowed:
+                        continue
+                    if river_id not in best or score > best[river_id][0]:
+                        best[river_id] = (score, distance, key)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+        return [{
+            '河川名稱': self.rivers[river_id]['name'],
+            '河川代碼': self.rivers[river_id]['code'],
+            '相似度': round(score, 3),
+            '編輯距離': distance,
+            '比對名稱': key,
+        } for river_id, (score, distance, key) in ranked]
+
+    def suggest_frame(self, stations, name_column='河川', water_system_column='流域',
+                      code_column='站號', limit=DEFAULT_LIMIT):
+        """逐一測站產生候選建議
+
+        Returns:
+            DataFrame: 測站原索引 (source)、建議順位與 suggest() 的欄位
+        """
+        def column(name):
+            return stations[name] if name in stations.columns else pd.Series(None, index=stations.index)
+
+        rows = []
+        for source, name, water_system, code in zip(stations.index, column(name_column),
+                                                    column(water_system_column), column(code_column)):
+            water_system = None if pd.isna(water_system) else str(water_system)
+            code = None if pd.isna(code) else str(code)
+            for rank, suggestion in enumerate(self.suggest(name, water_system, code, limit), 1):
+                rows.append({'source': source, '建議順位': rank, **suggestion})
+        return pd.DataFrame(rows, columns=['source', '建議順位', '河川名稱', '河川代碼',
+                                           '相似度', '編輯距離', '比對名稱'])
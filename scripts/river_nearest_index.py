@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+測站鄰近河川索引（KD-tree）
+以河川邊界點（export_river_geodata.py 匯出的 frontend/src/data/riverBoundaryPoints.json，
+每點有 TWD97 座標與所屬河川名稱）建立 KD-tree，所有測站一次批次查詢最近的邊界點，
+依河川去除重複後取最近的 k 條河川與距離，作為名稱配對的交叉檢查與補充:
+
+    一致      名稱配對的河川在鄰近候選中
+    不一致    名稱配對的河川不在鄰近候選中（需人工確認河川欄位或座標）
+    補充      名稱無法配對，以鄰近候選作為建議
+
+邊界點的河川名稱以別名索引（river_alias_index）對應到河川代碼，同名河川取同水系者，
+對應不到的點不列入；
+座標為 TWD97 (EPSG:3826)，距離單位為公尺
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+RIVER_BOUNDARY_POINTS = Path("frontend/src/data/riverBoundaryPoints.json")
+DEFAULT_K = 3
+DEFAULT_MAX_DISTANCE = 5000.0
+# 每條河川有多個邊界點，查詢 k × 此數的最近點後再依河川去除重複
+POINTS_PER_RIVER = 8
+
+
+def resolve_river(alias_index, name, basin):
+    """邊界點的河川名稱 -> 河川
+
+    同名河川（例如各水系都有的清水溪）取主流水系與邊界點所屬水系（basin）相同者，
+    都不相同時才取主要河川（rank 0）；名稱對應不到時回傳 None
+    """
+    candidates = alias_index.candidates(name)
+    for river in candidates:
+        if river['main_stream'] == basin:
+            return river
+    return candidates[0] if candidates else None
+
+
+def load_boundary_points(alias_index, path=RIVER_BOUNDARY_POINTS):
+    """讀取河川邊界點並對應河川代碼（見 resolve_river）
+
+    Returns:
+        tuple: (DataFrame[河川代碼, 河川名稱, 邊界點, x, y], 對應不到河川代碼的名稱清單)
+    """
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    points = pd.DataFrame([feature['properties'] for feature in data['features']])
+    rivers = [resolve_river(alias_index, name, basin) for name, basin in zip(points['river'], points['basin'])]
+    resolved = np.array([river is not None for river in rivers], dtype=bool)
+    unresolved = sorted(points.loc[~resolved, 'river'].unique())
+
+    points = points[resolved]
+    return pd.DataFrame({
+        '河川代碼': [river['code'] for river in rivers if river is not None],
+        '河川名稱': [river['name'] for river in rivers if river is not None],
+        '邊界點': points['name'].values,
+        'x': points['twd97_x'].astype(float).values,
+        'y': points['twd97_y'].astype(float).values,
+    }), unresolved
+
+
+class NearestRiverIndex:
+    """河川邊界點 KD-tree
+
+    Args:
+        points: load_boundary_points() 的邊界點
+    """
+
+    def __init__(self, points):
+        self.points = points.reset_index(drop=True)
+        self.codes = self.points['河川代碼'].to_numpy(dtype=object)
+        self.names = self.points['河川名稱'].to_numpy(dtype=object)
+        self.tree = cKDTree(self.points[['x', 'y']].to_numpy(dtype=float))
+
+    def query(self, x, y, k=DEFAULT_K, max_distance=DEFAULT_MAX_DISTANCE):
+        """批次查詢每個點最近的 k 條河川
+
+        Returns:
+            DataFrame: source（輸入位置）、候選順位、河川代碼、河川名稱、距離(m)；
+                       無座標或範圍內沒有邊界點者不列出
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        columns = ['source', '候選順位', '河川代碼', '河川名稱', '距離(m)']
+        if len(valid) == 0 or len(self.points) == 0:
+            return pd.DataFrame(columns=columns)
+
+        n_points = min(k * POINTS_PER_RIVER, len(self.points))
+        distances, indices = self.tree.query(np.column_stack([x[valid], y[valid]]), k=n_points,
+                                             distance_upper_bound=max_distance)
+        distances = distances.reshape(len(valid), n_points)
+        indices = indices.reshape(len(valid), n_points)
+
+        # 攤平（每列已依距離排序），範圍外的點 index 為 len(points)
+        found = np.isfinite(distances)
+        candidates = pd.DataFrame({
+            'source': np.repeat(valid, n_points)[found.ravel()],
+            'point': indices[found],
+            '距離(m)': distances[found],
+        })
+        candidates['河川代碼'] = self.codes[candidates['point']]
+        candidates = candidates.drop_duplicates(['source', '河川代碼'], keep='first')
+        candidates['候選順位'] = candidates.groupby('source').cumcount() + 1
+        candidates = candidates[candidates['候選順位'] <= k]
+        candidates['河川名稱'] = self.names[candidates['point']]
+        candidates['距離(m)'] = candidates['距離(m)'].round(1)
+        return candidates[columns].reset_index(drop=True)
+
+    def cross_check(self, stations, x_column='TWD97M2(X坐標)', y_column='TWD97M2(Y坐標)',
+                    code_column='河川代碼', k=DEFAULT_K, max_distance=DEFAULT_MAX_DISTANCE):
+        """以鄰近候選檢查名稱配對結果
+
+        Args:
+            stations: 測站（含座標與名稱配對的河川代碼，未配對者為空值）
+
+        Returns:
+            DataFrame: source（測站原索引）、候選順位、河川代碼、河川名稱、距離(m)、比對結果
+        """
+        nearest = self.query(stations[x_column].to_numpy(dtype=float, na_value=np.nan),
+                             stations[y_column].to_numpy(dtype=float, na_value=np.nan), k, max_distance)
+        nearest['source'] = stations.index[nearest['source'].to_numpy(dtype=int)]
+
+        matched_code = stations[code_column].reindex(nearest['source'])
+        in_candidates = (nearest['河川代碼'].values == matched_code.values)
+        agrees = pd.Series(in_candidates).groupby(nearest['source'].values).transform('any').values
+        nearest['比對結果'] = np.where(matched_code.isna().values, '補充', np.where(agrees, '一致', '不一致'))
+        return nearest
@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+"""
+河川代碼 PDF 表格提取
+分為兩個階段：
+1. 逐頁解析表格（pdfplumber，各頁互相獨立，以多個行程平行執行）
+2. 依頁碼順序合併跨行的河川名稱並建立階層關係（純 Python，單一執行緒）
+
+第 2 階段需要跨頁追蹤各階層最新的河川，因此只能依序執行；
+第 1 階段的結果依頁碼排序後再交給第 2 階段，輸出與逐頁依序處理完全相同
+
+第 1 階段的結果依「頁面內容雜湊 + 表格設定雜湊」快取於 data/.cache/pdf_pages，
+只調整第 2 階段規則時不需重新解析 PDF；新年度的 PDF 也只重新解析內容有變動的頁面
+
+第 1 階段有兩種解析方式（profile）:
+    generic  pdfplumber extract_tables()，通用的格線 / 文字偵測
+    layout   依固定 7 欄版面直接讀取字元：欄位以固定 x 邊界切分，
+             列以河川代碼欄的水平格線切分，同一格內的多行文字直接接起來
+"""
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pdfminer
+import pdfplumber
+from pdfminer.converter import PDFLayoutAnalyzer
+from pdfminer.layout import LTChar
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import apply_matrix_pt
+
+
+# 表格起始頁（第 6 頁 = index 5）
+TABLE_START_PAGE = 5
+
+# 標題列關鍵字
+HEADER_KEYWORDS = ["序號", "序号", "主流名稱", "主流名称",
+                   "支流名稱", "支流名称", "次支流",
+                   "次次支流", "河川代碼", "河川代码",
+                   "維基數據", "维基数据", "名稱", "名称"]
+
+PAGE_CACHE_DIR = Path("data/.cache/pdf_pages")
+
+PROFILES = ('generic', 'layout')
+
+# 河川代碼表版面：序號、主流、支流、次支流、次次支流、次次次支流、河川代碼 7 欄的 x 邊界
+# （右側的維基數據欄不需要，不在範圍內）
+RIVER_TABLE_LAYOUT = {
+    'columns': [60.4, 90.2, 144.9, 193.0, 268.4, 341.6, 387.9, 445.5],
+    'rule_max_height': 2.0,   # 高度小於此值的矩形視為水平格線
+    'line_tolerance': 3.0,    # 同一行文字的 y 容許誤差
+}
+
+
+# =============================================================================
+# 第 1 階段：逐頁解析表格
+# =============================================================================
+
+def extract_page_tables(pdf_path, page_numbers, profile='generic'):
+    """解析指定頁面的表格（在工作行程中執行）
+
+    Returns:
+        list: [(頁碼 index, [table, ...]), ...]，table 為列清單，每列為各欄文字
+    """
+    if profile == 'layout':
+        return extract_layout_tables(pdf_path, page_numbers)
+
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num in page_numbers:
+            results.append((page_num, pdf.pages[page_num].extract_tables()))
+    return results
+
+
+class _LayoutCollector(PDFLayoutAnalyzer):
+    """只收集字元與河川代碼欄水平格線的 pdfminer 裝置
+
+    不建立線段 / 矩形物件，也不做版面分析，比 pdfplumber 的完整物件解析輕量
+    """
+
+    def __init__(self, rsrcmgr, layout):
+        super().__init__(rsrcmgr, laparams=None)
+        self.rule_x0, self.rule_x1 = layout['columns'][-2], layout['columns'][-1]
+        self.rule_max_height = layout['rule_max_height']
+        self.chars = []
+        self.rules = []
+
+    def paint_path(self, gstate, stroke, fill, evenodd, path):
+        """記錄橫跨河川代碼欄的水平格線 y 座標"""
+        subpath = []
+        for segment in list(path) + [('m',)]:
+            if segment[0] == 'm' and subpath:
+                xs, ys = zip(*subpath)
+                if (max(ys) - min(ys) < self.rule_max_height
+                        and min(xs) < self.rule_x1 and max(xs) > self.rule_x0):
+                    self.rules.append((max(ys) + min(ys)) / 2)
+                subpath = []
+            if len(segment) >= 3:
+                subpath.append(apply_matrix_pt(self.ctm, segment[-2:]))
+
+    def receive_layout(self, ltpage):
+        self.chars = [obj for obj in ltpage if isinstance(obj, LTChar)]
+
+
+def _layout_table(chars, rules, layout):
+    """以欄位邊界與水平格線把字元排成表格
+
+    相鄰兩條格線之間為一列；列內依 y 分成多行，同一欄各行文字依序接起來
+    """
+    columns = layout['columns']
+    rules = sorted(set(round(y, 1) for y in rules))
+    bands = {}
+    for char in chars:
+        x_mid, y_mid = (char.x0 + char.x1) / 2, (char.y0 + char.y1) / 2
+        band = bisect.bisect(rules, y_mid)
+        if not (columns[0] <= x_mid < columns[-1]) or band in (0, len(rules)):
+            continue  # 表格範圍外（標題、頁碼、附註、維基數據欄）
+        bands.setdefault(band, []).append(char)
+
+    table = []
+    for band in sorted(bands, reverse=True):  # PDF 座標 y 向上，由上而下排列
+        lines = []
+        for char in sorted(bands[band], key=lambda c: (-c.y1, c.x0)):
+            if lines and lines[-1][0] - char.y1 <= layout['line_tolerance']:
+                lines[-1][1].append(char)
+            else:
+                lines.append((char.y1, [char]))
+
+        cells = [''] * (len(columns) - 1)
+        for _, line in lines:
+            texts = [''] * len(cells)
+            for char in sorted(line, key=lambda c: c.x0):
+                texts[bisect.bisect_right(columns, (char.x0 + char.x1) / 2) - 1] += char.get_text()
+            for i, text in enumerate(texts):
+                cells[i] += re.sub(r'\s+', ' ', text).strip()
+        table.append(cells)
+    return table
+
+
+def extract_layout_tables(pdf_path, page_numbers, layout=RIVER_TABLE_LAYOUT):
+    """以固定版面解析指定頁面（layout profile）
+
+    Returns:
+        list: [(頁碼 index, [table]), ...]，與 extract_page_tables() 相同格式
+    """
+    wanted = set(page_numbers)
+    results = []
+    with open(pdf_path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        rsrcmgr = PDFResourceManager(caching=True)
+        for page_num, page in enumerate(PDFPage.create_pages(document)):
+            if page_num not in wanted:
+                continue
+            device = _LayoutCollector(rsrcmgr, layout)
+            PDFPageInterpreter(rsrcmgr, device).process_page(page)
+            results.append((page_num, [_layout_table(device.chars, device.rules, layout)]))
+    return results
+
+
+def settings_hash(profile='generic'):
+    """解析設定雜湊（含 pdfplumber / pdfminer 版本，升級後重新解析）"""
+    payload = {'pdfplumber': pdfplumber.__version__, 'pdfminer': pdfminer.__version__,
+               'profile': profile, 'layout': RIVER_TABLE_LAYOUT if profile == 'layout' else None}
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _page_fingerprint(page, font_hashes):
+    """頁面內容雜湊：內容串流 + 頁面尺寸 + 字型（字型名稱與 ToUnicode 對照表）
+
+    font_hashes 以物件編號記住已計算的字型，多頁共用的字型只計算一次
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(page.page_obj.mediabox).encode('utf-8'))
+    for stream in page.page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+
+    fonts = resolve1(page.page_obj.resources.get('Font')) or {}
+    for name in sorted(fonts):
+        objid = getattr(fonts[name], 'objid', None)
+        font_hash = font_hashes.get(objid)
+        if font_hash is None:
+            font = resolve1(fonts[name])
+            font_digest = hashlib.sha256(repr(font.get('BaseFont')).encode('utf-8'))
+            to_unicode = resolve1(font.get('ToUnicode'))
+            if to_unicode is not None:
+                font_digest.update(to_unicode.get_data())
+            font_hash = font_digest.digest()
+            if objid is not None:
+                font_hashes[objid] = font_hash
+        digest.update(name.encode('utf-8'))
+        digest.update(font_hash)
+    return digest.hexdigest()
+
+
+def page_fingerprints(pdf_path):
+    """所有表格頁的內容雜湊
+
+    Returns:
+        dict: {頁碼 index: 雜湊}
+    """
+    font_hashes = {}
+    with pdfplumber.open(pdf_path) as pdf:
+        return {page_num: _page_fingerprint(pdf.pages[page_num], font_hashes)
+                for page_num in range(TABLE_START_PAGE, len(pdf.pages))}
+
+
+class PageCache:
+    """逐頁表格快取
+
+    每頁一個 gzip JSON 檔：<頁面雜湊前 16 碼>-<設定雜湊前 12 碼>.json.gz。
+    以頁面內容為鍵（而非整份 PDF），頁碼位移或其他頁面改版時仍可沿用
+    """
+
+    def __init__(self, cache_dir=PAGE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, page_hash, settings_key):
+        return self.cache_dir / f"{page_hash[:16]}-{settings_key[:12]}.json.gz"
+
+    def load(self, page_hash, settings_key):
+        """讀取快取的表格，不存在時回傳 None"""
+        path = self.path(page_hash, settings_key)
+        if not path.exists():
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, page_hash, settings_key, tables):
+        """寫入快取（先寫暫存檔再更名）"""
+        path = self.path(page_hash, settings_key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(tables, f, ensure_ascii=False)
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+# 已開啟的 PDF（逐頁任務共用，每個行程只開啟一次）
+_worker_pdfs = {}
+
+
+def _extract_page(pdf_path, page_num, profile):
+    """解析單一頁面（行程池的任務）"""
+    if profile == 'layout':
+        return extract_layout_tables(pdf_path, [page_num])[0][1]
+    if pdf_path not in _worker_pdfs:
+        _worker_pdfs[pdf_path] = pdfplumber.open(pdf_path)
+    page = _worker_pdfs[pdf_path].pages[page_num]
+    try:
+        return page.extract_tables()
+    finally:
+        page.close()  # 釋放該頁已解析的物件
+
+
+def iter_page_tables(pdf_path, workers=None, use_cache=True, profile='generic'):
+    """依頁碼順序逐頁產生表格（快取 → 平行解析）
+
+    逐頁送交行程池，同時最多 workers * 2 頁在處理或等待取用，
+    呼叫端取用的速度決定解析進度，記憶體只保留少數頁面
+
+    Args:
+        pdf_path: PDF 路徑
+        workers: 行程數（預設為 CPU 核心數，1 表示不開新行程）
+        use_cache: 是否使用逐頁快取
+        profile: 解析方式（generic / layout）
+
+    Yields:
+        tuple: (頁碼 index, [table, ...])
+    """
+    pdf_path = str(pdf_path)
+    fingerprints = page_fingerprints(pdf_path)
+    settings_key = settings_hash(profile)
+    cache = PageCache()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(fingerprints)))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = deque()  # (頁碼, 快取的表格 / Future / None 表示就地解析)
+    parsed = 0
+
+    def take():
+        nonlocal parsed
+        page_num, item = pending.popleft()
+        if isinstance(item, list):
+            return page_num, item
+        tables = item.result() if item is not None else _extract_page(pdf_path, page_num, profile)
+        if use_cache:
+            cache.save(fingerprints[page_num], settings_key, tables)
+        parsed += 1
+        return page_num, tables
+
+    try:
+        for page_num, page_hash in fingerprints.items():
+            item = cache.load(page_hash, settings_key) if use_cache else None
+            if item is None and executor is not None:
+                item = executor.submit(_extract_page, pdf_path, page_num, profile)
+            pending.append((page_num, item))
+            while len(pending) > workers * 2:
+                yield take()
+        while pending:
+            yield take()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        elif pdf_path in _worker_pdfs:
+            _worker_pdfs.pop(pdf_path).close()
+
+    if use_cache:
+        print(f"[快取] {len(fingerprints) - parsed} 頁沿用快取，{parsed} 頁重新解析")
+
+
+def extract_pages(pdf_path, workers=None, use_cache=True, profile='generic'):
+    """解析所有表格頁
+
+    Returns:
+        list: [(頁碼 index, [table, ...]), ...]，依頁碼排序
+    """
+    return list(iter_page_tables(pdf_path, workers, use_cache, profile))
+
+
+# =============================================================================
+# 第 2 階段：合併多行名稱並建立階層
+# =============================================================================
+
+def clean_field(field):
+    """清理欄位：移除換行、回車、多餘空白"""
+    if not field:
+        return ""
+    return str(field).replace('\n', '').replace('\r', '').replace('  ', ' ').strip()
+
+
+def merge_table_rows(table):
+    """合併多行的河川名稱
+
+    河川代碼為空的列視為上一列名稱的延續，併入上一列
+    """
+    merged_rows = []
+    pending_row = None
+
+    for row in table[1:]:
+        if not row or len(row) < 7:
+            continue
+
+        # 過濾掉標題列
+        row_str = str(row[0]) + str(row[1]) + str(row[2]) + str(row[3])
+        if any(keyword in row_str for keyword in HEADER_KEYWORDS):
+            continue
+
+        river_code = clean_field(row[6]) if len(row) > 6 else ""
+
+        # 如果河川代碼為空或 None，可能是延續上一行的名稱
+        if (not river_code or river_code == "None" or river_code == "nan") and pending_row:
+            # 合併到上一行
+            for i in range(1, 6):  # 合併主流、支流等欄位
+                if row[i]:
+                    pending_row[i] = (pending_row[i] or "") + clean_field(row[i])
+            continue
+
+        # 如果有待處理的行，先保存
+        if pending_row:
+            merged_rows.append(pending_row)
+
+        # 儲存當前行作為待處理行
+        pending_row = row.copy()
+
+    # 處理最後一行
+    if pending_row:
+        merged_rows.append(pending_row)
+
+    return merged_rows
+
+
+def iter_rivers(page_tables):
+    """依頁碼順序建立河川階層，逐筆產生通過檢查的河川資料
+
+    Args:
+        page_tables: 依頁碼排序的 (頁碼, [table, ...])，可為 iter_page_tables() 產生器
+
+    Yields:
+        dict: 河川資料（序號、河川名稱、河川代碼、階層、上游河川、主流水系）
+    """
+    # 追蹤每個階層的最新河川（用於建立父子關係）
+    last_river_at_level = {}
+
+    for _, tables in page_tables:
+        for table in tables:
+            if not table:
+                continue
+
+            for row in merge_table_rows(table):
+                seq_no = row[0]
+                main_river = clean_field(row[1])  # 主流名稱
+                tributary_1 = clean_field(row[2])  # 支流名稱
+                tributary_2 = clean_field(row[3])  # 次支流名稱
+                tributary_3 = clean_field(row[4])  # 次次支流名稱
+                tributary_4 = clean_field(row[5]) if len(row) > 5 else ""  # 次次次支流名稱
+                river_code = clean_field(row[6]) if len(row) > 6 else ""  # 河川代碼
+
+                # 過濾空行
+                if not any([main_river, tributary_1, tributary_2, tributary_3, tributary_4]):
+                    continue
+
+                # 決定河川名稱和階層
+                if tributary_4:
+                    river_name = tributary_4
+                    level = 5
+                elif tributary_3:
+                    river_name = tributary_3
+                    level = 4
+                elif tributary_2:
+                    river_name = tributary_2
+                    level = 3
+                elif tributary_1:
+                    river_name = tributary_1
+                    level = 2
+                else:
+                    river_name = main_river
+                    level = 1
+
+                # 過濾無效資料
+                if not river_name or river_name == "None":
+                    continue
+
+                # 過濾明顯錯誤的資料
+                # 1. 河川代碼為空或不合理
+                if not river_code or river_code == "None" or river_code == "nan":
+                    continue
+                # 2. 河川名稱太短（少於3字，可能是提取錯誤）
+                if len(river_name) < 3:
+                    continue
+                # 3. 河川名稱只有括號和符號
+                if river_name.startswith('(') and river_name.count('(') >= len(river_name) / 2:
+                    continue
+
+                # 根據階層決定上游河川（父河川）
+                if level == 1:
+                    parent_name = None
+                    current_main_river = river_name  # 主流水系就是自己
+                else:
+                    parent_name = last_river_at_level.get(level - 1, None)
+                    current_main_river = last_river_at_level.get(1, main_river)  # 主流水系
+
+                # 更新此階層的最新河川
+                last_river_at_level[level] = river_name
+                # 清除更深階層的記錄（因為換了新的父河川）
+                for deeper_level in range(level + 1, 6):
+                    last_river_at_level.pop(deeper_level, None)
+
+                yield {
+                    "序號": seq_no,
+                    "河川名稱": river_name,
+                    "河川代碼": river_code,
+                    "階層": level,
+                    "上游河川": parent_name,
+                    "主流水系": current_main_river
+                }
+
+
+def build_hierarchy(page_tables):
+    """依頁碼順序建立河川階層
+
+    Returns:
+        list: 河川資料 dict 清單
+    """
+    return list(iter_rivers(page_tables))
+
+
+def iter_river_hierarchy(pdf_path, workers=None, use_cache=True, profile='generic'):
+    """串流提取河川階層：頁面一解析完成就產生該頁的河川資料
+
+    不需要整份表格在記憶體中，可直接交給 river_sinks 的寫出器逐筆消化
+    """
+    return iter_rivers(iter_page_tables(pdf_path, workers, use_cache, profile))
+
+
+# =============================================================================
+# 解析方式比較
+# =============================================================================
+
+def _merge_stats(page_tables):
+    """統計有效列數與被併入上一列的續行數"""
+    rows = merges = 0
+    for _, tables in page_tables:
+        for table in tables:
+            if not table:
+                continue
+            valid = [row for row in table[1:]
+                     if row and len(row) >= 7
+                     and not any(keyword in str(row[0]) + str(row[1]) + str(row[2]) + str(row[3])
+                                 for keyword in HEADER_KEYWORDS)]
+            rows += len(valid)
+            merges += len(valid) - len(merge_table_rows(table))
+    return rows, merges
+
+
+def benchmark_profiles(pdf_path, max_diffs=10):
+    """比較 generic 與 layout 兩種解析方式的速度與結果（不使用快取、單一行程）
+
+    Returns:
+        dict: 各方式的耗時、列數、續行合併數，以及河川資料逐列比對結果
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = list(range(TABLE_START_PAGE, len(pdf.pages)))
+
+    report = {'pages': len(pages), 'profiles': {}}
+    rivers = {}
+    for profile in PROFILES:
+        t0 = time.perf_counter()
+        page_tables = extract_page_tables(pdf_path, pages, profile)
+        elapsed = time.perf_counter() - t0
+        rows, merges = _merge_stats(page_tables)
+        rivers[profile] = build_hierarchy(page_tables)
+        report['profiles'][profile] = {
+            'seconds': round(elapsed, 3),
+            'seconds_per_page': round(elapsed / len(pages), 4),
+            'rows': rows,
+            'merges': merges,
+            'rivers': len(rivers[profile]),
+        }
+
+    generic, layout = rivers['generic'], rivers['layout']
+    diffs = [(i, a, b) for i, (a, b) in enumerate(zip(generic, layout)) if a != b]
+    report['identical'] = len(diffs) == 0 and len(generic) == len(layout)
+    report['differences'] = len(diffs) + abs(len(generic) - len(layout))
+
+    print(f"\n【解析方式比較】共 {len(pages)} 頁")
+    print(f"  {'方式':<8} {'總耗時(s)':>9} {'每頁(s)':>8} {'有效列':>7} {'續行合併':>8} {'河川':>6}")
+    for profile, stats in report['profiles'].items():
+        print(f"  {profile:<8} {stats['seconds']:>9.2f} {stats['seconds_per_page']:>8.3f} "
+              f"{stats['rows']:>7} {stats['merges']:>8} {stats['rivers']:>6}")
+    speedup = report['profiles']['generic']['seconds'] / max(report['profiles']['layout']['seconds'], 1e-9)
+    report['speedup'] = round(speedup, 2)
+    print(f"  layout 加速 {speedup:.2f} 倍")
+
+    if report['identical']:
+        print(f"[OK] 兩種方式的河川資料逐列相同（{len(generic)} 筆）")
+    else:
+        print(f"[警告] 河川資料有 {report['differences']} 筆不同"
+              f"（generic {len(generic)} 筆，layout {len(layout)} 筆）")
+        for i, a, b in diffs[:max_diffs]:
+            print(f"  第 {i + 1} 筆")
+            print(f"    generic: {a}")
+            print(f"    layout : {b}")
+    return report
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+河川資料串流寫出器
+搭配 river_pdf_extractor.iter_river_hierarchy() 逐筆消化河川資料，
+各寫出器只保留一個批次在記憶體中，不需要整份表格
+
+用法:
+    sinks = [JsonlSink("data/rivers.jsonl"), ParquetSink("data/rivers.parquet")]
+    count = drain(iter_river_hierarchy(pdf_path), sinks)
+"""
+import json
+import os
+from pathlib import Path
+
+from batch_writer import DEFAULT_BATCH_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+
+class RecordSink:
+    """寫出器基底類別：write() 逐筆寫入，close() 完成寫出，abort() 放棄寫出"""
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class _FileSink(RecordSink):
+    """寫入暫存檔，close() 時才更名為正式檔名，中途失敗不會留下不完整的檔案"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        self.count = 0
+        self.closed = False
+
+    def _finish(self):
+        """結束寫入（關閉檔案），之後暫存檔會更名為正式檔名"""
+        raise NotImplementedError
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._finish()
+        finally:
+            self.tmp_path.unlink(missing_ok=True)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._finish()
+            self.tmp_path.replace(self.path)
+            print(f"[OK] 已寫出 {self.count} 筆: {self.path}")
+        finally:
+            self.tmp_path.unlink(missing_ok=True)
+
+
+class JsonlSink(_FileSink):
+    """JSON Lines：每筆一行"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = open(self.tmp_path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False))
+        self.file.write('\n')
+        self.count += 1
+
+    def _finish(self):
+        self.file.close()
+
+
+class ParquetSink(_FileSink):
+    """Parquet：每 batch_size 筆寫出一個 row group"""
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        if not HAS_PARQUET:
+            raise RuntimeError("寫出 Parquet 需要安裝 pyarrow")
+        super().__init__(path)
+        self.batch_size = batch_size
+        self.schema = pa.schema([
+            ("序號", pa.string()),
+            ("河川名稱", pa.string()),
+            ("河川代碼", pa.string()),
+            ("階層", pa.int64()),
+            ("上游河川", pa.string()),
+            ("主流水系", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        self.buffer = []
+
+    def write(self, record):
+        self.buffer.append(record)
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.writer.write_table(pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def _finish(self):
+        self._flush()
+        self.writer.close()
+
+
+class Neo4jBatchSink(RecordSink):
+    """Neo4j：累積 batch_size 筆後以 BatchWriter 送出一個 UNWIND 交易
+
+    Args:
+        writer: BatchWriter
+        query: `UNWIND $rows AS row` 開頭的寫入語句
+        to_row: 將河川資料轉為查詢參數的函數
+    """
+
+    def __init__(self, writer, query, to_row=dict, batch_size=DEFAULT_BATCH_SIZE, unit="筆"):
+        self.writer = writer
+        self.query = query
+        self.to_row = to_row
+        self.batch_size = batch_size
+        self.unit = unit
+        self.buffer = []
+        self.count = 0
+
+    def write(self, record):
+        self.buffer.append(self.to_row(record))
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.count += self.writer.write(self.query, self.buffer, unit=self.unit)
+            self.buffer = []
+
+    def close(self):
+        self._flush()
+        print(f"[OK] 已寫入 Neo4j {self.count} {self.unit}")
+
+
+class ListSink(RecordSink):
+    """收集到記憶體（需要整份表格的輸出，如 Excel）"""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+def drain(records, sinks):
+    """將產生器的每一筆資料交給所有寫出器
+
+    全部成功後關閉寫出器（正式寫出）；中途發生錯誤時放棄所有寫出器
+
+    Returns:
+        int: 處理筆數
+    """
+    count = 0
+    try:
+        for record in records:
+            for sink in sinks:
+                sink.write(record)
+            count += 1
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.close()
+    return count
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+來源資料快取
+每個 Excel 工作表只以 openpyxl 解析一次：
+- 同一個行程內，所有讀取者共用同一份記憶體中的 DataFrame
+- 解析結果另存為 Parquet（以檔案內容雜湊 + 工作表名稱為鍵），
+  來源未變動時，之後的執行直接讀 Parquet，完全不經過 openpyxl
+
+Parquet 無法表示的工作表（混合型別欄位）或未安裝 pyarrow 時改存 pickle
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet 引擎)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+
+CACHE_DIR = Path("data/.cache/sources")
+
+
+def file_hash(path):
+    """計算檔案內容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SourceCache:
+    """Excel 工作表快取
+
+    read_excel() 回傳共用 DataFrame 的淺複本：資料本身共用，
+    呼叫端改欄位名稱或整欄重新指定不會影響其他讀取者
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._frames = {}
+        self._hashes = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _content_hash(self, path):
+        """檔案雜湊，以 (路徑, 修改時間, 大小) 記住避免重複計算"""
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        if key not in self._hashes:
+            self._hashes[key] = file_hash(path)
+        return self._hashes[key]
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def parquet_path(self, path, content_hash, sheet_name):
+        """快取檔路徑: <檔名>-<雜湊前 16 碼>-<工作表>.parquet"""
+        sheet = re.sub(r'[\\/:*?"<>|\s]', '_', str(sheet_name))
+        return self.cache_dir / f"{Path(path).stem}-{content_hash[:16]}-{sheet}.parquet"
+
+    def sheet_names(self, path):
+        """工作表名稱清單（同樣依檔案雜湊快取）"""
+        path = Path(path)
+        content_hash = self._content_hash(path)
+        key = (content_hash, None)
+        with self._key_lock(key):
+            if key not in self._frames:
+                names_path = self.cache_dir / f"{path.stem}-{content_hash[:16]}.sheets.json"
+                if names_path.exists():
+                    names = json.loads(names_path.read_text(encoding='utf-8'))
+                else:
+                    names = pd.ExcelFile(path).sheet_names
+                    names_path.parent.mkdir(parents=True, exist_ok=True)
+                    names_path.write_text(json.dumps(names, ensure_ascii=False), encoding='utf-8')
+                self._frames[key] = names
+        return list(self._frames[key])
+
+    def read_excel(self, path, sheet_name=0):
+        """讀取工作表（記憶體 → Parquet → openpyxl）"""
+        path = Path(path)
+        content_hash = self._content_hash(path)
+        key = (content_hash, sheet_name)
+
+        # 同一工作表同時只由一個執行緒解析，其他執行緒等待後共用結果
+        with self._key_lock(key):
+            if key not in self._frames:
+                self._frames[key] = self._load(path, content_hash, sheet_name)
+        return self._frames[key].copy(deep=False)
+
+    def _load(self, path, content_hash, sheet_name):
+        cache_path = self.parquet_path(path, content_hash, sheet_name)
+        pickle_path = cache_path.with_suffix('.pkl')
+        if HAS_PARQUET and cache_path.exists():
+            return pd.read_parquet(cache_path)
+        if pickle_path.exists():
+            return pd.read_pickle(pickle_path)
+
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        if HAS_PARQUET:
+            try:
+                self._atomic_write(cache_path, lambda tmp: df.to_parquet(tmp, index=False))
+                return df
+            except Exception:
+                # 同一欄混有數字與文字（如「時水位」年份欄）時 Parquet 無法表示，改存 pickle
+                pass
+        self._atomic_write(pickle_path, df.to_pickle)
+        return df
+
+    @staticmethod
+    def _atomic_write(path, write):
+        """先寫入暫存檔再更名，避免其他行程讀到寫到一半的快取"""
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            write(tmp_path)
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+# 行程內共用的快取
+SOURCE_CACHE = SourceCache()
+
+
+def read_excel(path, sheet_name=0):
+    """以共用快取讀取 Excel 工作表"""
+    return SOURCE_CACHE.read_excel(path, sheet_name)
+
+
+def sheet_names(path):
+    """以共用快取取得工作表名稱"""
+    return SOURCE_CACHE.sheet_names(path)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+相依性排程工具
+每個階段宣告需要 (requires) 與產生 (provides) 的資源（例如節點標籤），
+排程器以執行緒池平行執行所有相依條件已滿足的階段
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Stage:
+    """排程階段
+
+    Args:
+        name: 階段名稱
+        func: 執行函數（不帶參數）
+        requires: 執行前必須完成的資源
+        provides: 完成後產生的資源
+    """
+
+    def __init__(self, name, func, requires=(), provides=()):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.provides = tuple(provides)
+        self.elapsed = None
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+def _check_stages(stages):
+    """檢查資源是否都有來源，並找出相依循環"""
+    providers = {}
+    for stage in stages:
+        for resource in stage.provides:
+            providers.setdefault(resource, []).append(stage)
+
+    for stage in stages:
+        missing = [r for r in stage.requires if r not in providers]
+        if missing:
+            raise ValueError(f"階段 {stage.name} 需要的資源沒有任何階段產生: {missing}")
+
+    # 模擬執行順序，無法前進代表有循環
+    done, pending = set(), list(stages)
+    while pending:
+        ready = [s for s in pending
+                 if all(p in done for r in s.requires for p in providers[r] if p is not s)]
+        if not ready:
+            raise ValueError(f"階段相依關係有循環: {[s.name for s in pending]}")
+        done.update(ready)
+        pending = [s for s in pending if s not in ready]
+
+    return providers
+
+
+def run_stages(stages, max_workers=4):
+    """依相依關係平行執行所有階段
+
+    某資源由多個階段產生時（例如 Station 由雨量、水位兩個階段產生），
+    需等所有產生者都完成才算就緒。任一階段失敗時不再啟動新階段，
+    等待執行中的階段結束後拋出例外。
+
+    Returns:
+        float: 總耗時（秒）
+    """
+    providers = _check_stages(stages)
+    done = set()
+    pending = list(stages)
+    running = {}
+    error = None
+    start = time.perf_counter()
+
+    def is_ready(stage):
+        return all(p in done for r in stage.requires for p in providers[r] if p is not stage)
+
+    def timed(stage):
+        t0 = time.perf_counter()
+        try:
+            stage.func()
+        finally:
+            stage.elapsed = time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            if error is None:
+                # 只送出空閒執行緒數量的階段，讓「開始」訊息與實際執行一致
+                ready = [s for s in pending if is_ready(s)]
+                for stage in ready[:max_workers - len(running)]:
+                    pending.remove(stage)
+                    print(f"\n[排程] 開始: {stage.name}")
+                    running[pool.submit(timed, stage)] = stage
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    print(f"[排程] 失敗: {stage.name} - {exc}")
+                    error = error or exc
+                else:
+                    print(f"[排程] 完成: {stage.name} ({stage.elapsed:.2f} 秒)")
+                    done.add(stage)
+
+    if error is not None:
+        raise error
+
+    elapsed = time.perf_counter() - start
+    total = sum(s.elapsed for s in stages if s.elapsed is not None)
+    print(f"\n[排程] 全部完成: 實際耗時 {elapsed:.2f} 秒，各階段合計 {total:.2f} 秒"
+          f"（{max_workers} 個工作執行緒）")
+    return elapsed
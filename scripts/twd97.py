@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+TWD97 (TM2, EPSG:3826) ↔ WGS84 (EPSG:4326) 座標轉換
+以 NumPy 陣列一次轉換整批座標（輸入可為純量、list、Series 或陣列），
+橢球與級數常數在載入模組時計算一次；空值 / NaN 輸入得到 NaN 輸出
+
+TWD97 TM2 投影參數:
+    GRS80 橢球（a = 6378137、b = 6356752.314245）
+    中央經線 121°E、尺度因子 0.9999、東偏移 250,000 公尺
+
+級數展開參考: https://github.com/snksos3/twd97-to-wgs84
+backend='pyproj' 改以 pyproj 轉換（需安裝 pyproj），用於交叉檢查級數展開的精度
+
+用法:
+    lon, lat = twd97_to_wgs84(df['x'], df['y'])
+    x, y = wgs84_to_twd97(lon, lat)
+    python scripts/twd97.py --benchmark      # 100 萬點轉換耗時與兩種 backend 的差異
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+
+# =============================================================================
+# 投影常數（只計算一次）
+# =============================================================================
+
+A = 6378137.0               # 長半軸（公尺）
+B = 6356752.314245          # 短半軸（公尺）
+LON0 = np.radians(121.0)    # 中央經線
+K0 = 0.9999                 # 尺度因子
+DX = 250000.0               # 東偏移（公尺）
+DY = 0.0                    # 北偏移（公尺）
+
+E2 = 1 - (B / A) ** 2       # 第一偏心率平方
+EP2 = E2 / (1 - E2)         # 第二偏心率平方
+E4 = E2 ** 2
+E6 = E2 ** 3
+
+# 子午線弧長級數
+M0 = 1 - E2 / 4 - 3 * E4 / 64 - 5 * E6 / 256
+M2 = 3 * E2 / 8 + 3 * E4 / 32 + 45 * E6 / 1024
+M4 = 15 * E4 / 256 + 45 * E6 / 1024
+M6 = 35 * E6 / 3072
+
+# 底點緯度級數
+E1 = (1 - np.sqrt(1 - E2)) / (1 + np.sqrt(1 - E2))
+J1 = 3 * E1 / 2 - 27 * E1 ** 3 / 32
+J2 = 21 * E1 ** 2 / 16 - 55 * E1 ** 4 / 32
+J3 = 151 * E1 ** 3 / 96
+J4 = 1097 * E1 ** 4 / 512
+# fp = μ + sin 2μ · (F0 + F1 cos 2μ + F2 cos² 2μ + F3 cos³ 2μ)（倍角公式展開上式級數）
+F0 = J1 - J3
+F1 = 2 * J2 - 4 * J4
+F2 = 4 * J3
+F3 = 8 * J4
+
+TWD97_CRS = "EPSG:3826"
+WGS84_CRS = "EPSG:4326"
+
+_transformers = {}
+
+
+def _as_array(values):
+    """轉為 float 陣列（None / pd.NA 轉為 NaN）"""
+    if hasattr(values, 'to_numpy'):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    return np.asarray(values, dtype=float)
+
+
+def _pyproj_transform(source, target, u, v):
+    try:
+        from pyproj import Transformer
+    except ImportError as e:
+        raise ImportError("backend='pyproj' 需要安裝 pyproj") from e
+    key = (source, target)
+    if key not in _transformers:
+        _transformers[key] = Transformer.from_crs(source, target, always_xy=True)
+    return _transformers[key].transform(u, v)
+
+
+# =============================================================================
+# 座標轉換
+# =============================================================================
+
+def twd97_to_wgs84(x, y, backend='numpy'):
+    """TWD97 TM2 → WGS84 經緯度
+
+    Args:
+        x: TWD97 X 座標（東向，公尺）
+        y: TWD97 Y 座標（北向，公尺）
+        backend: 'numpy'（級數展開）或 'pyproj'
+
+    Returns:
+        tuple: (經度, 緯度) 陣列（純量輸入時為 0 維陣列，可直接 float()）
+
+    範例:
+        >>> lon, lat = twd97_to_wgs84(250000, 2500000)     # (121.0, 22.6...)
+    """
+    x = _as_array(x)
+    y = _as_array(y)
+    if backend == 'pyproj':
+        return tuple(np.asarray(v) for v in _pyproj_transform(TWD97_CRS, WGS84_CRS, x, y))
+
+    # 底點緯度
+    mu = (y - DY) / (K0 * A * M0)
+    sin_mu = np.sin(mu)
+    sin2_mu = sin_mu * sin_mu
+    s2 = 2 * sin_mu * np.sqrt(1 - sin2_mu)     # sin 2μ（|μ| < 90°，cos μ 取正根）
+    c2 = 1 - 2 * sin2_mu                        # cos 2μ
+    fp = mu + s2 * (((F3 * c2 + F2) * c2 + F1) * c2 + F0)
+
+    # 係數中的純量項預先合併、冪次以連乘與 Horner 形式計算、cos 由 sin 開根號求得，
+    # 減少整批陣列運算的次數（三角函數與 ** 對 2 以外的指數都遠比乘法慢）
+    sin_fp = np.sin(fp)
+    sin2 = sin_fp * sin_fp
+    cos2 = 1 - sin2
+    cos_fp = np.sqrt(cos2)
+    W = 1 - E2 * sin2
+    T1 = sin2 / cos2                    # tan² fp
+    C1 = EP2 * cos2
+    D = (x - DX) * np.sqrt(W) / (A * K0)    # (x - dx) / (N1 k0)，N1 = a / √W
+    D2 = D * D
+
+    # lat = fp - N1 tan(fp) / R1 · (D²/2 - Q3 D⁴/24 + Q4 D⁶/720)，N1 / R1 = W / (1 - e²)
+    Q3 = (5 - 9 * EP2) + 3 * T1 + C1 * (10 - 4 * C1)
+    Q4 = (61 - 252 * EP2) + T1 * (90 + 45 * T1) + C1 * (298 - 3 * C1)
+    lat = fp - (sin_fp / cos_fp) * W / (1 - E2) * D2 * (0.5 - D2 * (Q3 / 24 - D2 * Q4 / 720))
+
+    # lon = lon0 + (D - Q6 D³/6 + Q7 D⁵/120) / cos(fp)
+    Q6 = 1 + 2 * T1 + C1
+    Q7 = (5 + 8 * EP2) + T1 * (28 + 24 * T1) - C1 * (2 + 3 * C1)
+    lon = LON0 + D * (1 - D2 * (Q6 / 6 - D2 * Q7 / 120)) / cos_fp
+
+    return np.degrees(lon), np.degrees(lat)
+
+
+def wgs84_to_twd97(lon, lat, backend='numpy'):
+    """WGS84 經緯度 → TWD97 TM2
+
+    Args:
+        lon: 經度（度）
+        lat: 緯度（度）
+        backend: 'numpy'（級數展開）或 'pyproj'
+
+    Returns:
+        tuple: (X, Y) 陣列（公尺）
+    """
+    lon = _as_array(lon)
+    lat = _as_array(lat)
+    if backend == 'pyproj':
+        return tuple(np.asarray(v) for v in _pyproj_transform(WGS84_CRS, TWD97_CRS, lon, lat))
+
+    phi = np.radians(lat)
+    sin_phi = np.sin(phi)
+    cos_phi = np.sqrt(1 - sin_phi * sin_phi)    # |φ| ≤ 90°，cos φ 取正根
+    tan_phi = sin_phi / cos_phi
+    N = A / np.sqrt(1 - E2 * sin_phi * sin_phi)
+    T = tan_phi * tan_phi
+    C = EP2 * cos_phi * cos_phi
+    L = (np.radians(lon) - LON0) * cos_phi
+    L2 = L * L
+    L3 = L2 * L
+
+    # 子午線弧長（sin 2φ、4φ、6φ 以倍角公式由 sin φ、cos φ 展開）
+    s2 = 2 * sin_phi * cos_phi
+    c2 = 1 - 2 * sin_phi * sin_phi
+    M = A * (M0 * phi - s2 * (M2 - 2 * M4 * c2 + M6 * (4 * c2 * c2 - 1)))
+
+    x = DX + K0 * N * (L + (1 - T + C) * L3 / 6
+                       + (5 - 18 * T + T * T + 72 * C - 58 * EP2) * L3 * L2 / 120)
+    y = DY + K0 * (M + N * tan_phi * (L2 / 2
+                                      + (5 - T + 9 * C + 4 * C * C) * L2 * L2 / 24
+                                      + (61 - 58 * T + T * T + 600 * C - 330 * EP2) * L3 * L3 / 720))
+    return x, y
+
+
+# =============================================================================
+# 效能與精度檢查
+# =============================================================================
+
+def _best_time(func, *args, repeat=3, **kwargs):
+    """執行 repeat 次取最短耗時（第一次執行含配置記憶體的成本）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark(n=1_000_000, seed=0):
+    """隨機產生台灣本島範圍內的 n 個點，比較轉換耗時與兩種 backend 的差異"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(150000, 350000, n)
+    y = rng.uniform(2420000, 2800000, n)
+
+    inverse_time, (lon, lat) = _best_time(twd97_to_wgs84, x, y)
+    forward_time, (x2, y2) = _best_time(wgs84_to_twd97, lon, lat)
+
+    print(f"[OK] {n:,} 點 TWD97 → WGS84: {inverse_time * 1000:.1f} ms")
+    print(f"[OK] {n:,} 點 WGS84 → TWD97: {forward_time * 1000:.1f} ms")
+    print(f"  往返誤差: 最大 {max(np.abs(x2 - x).max(), np.abs(y2 - y).max()) * 1000:.3f} mm")
+
+    try:
+        pyproj_time, (ref_lon, ref_lat) = _best_time(twd97_to_wgs84, x, y, backend='pyproj')
+    except ImportError:
+        print("[INFO] 未安裝 pyproj，略過交叉檢查")
+        return
+    # 緯度 1 度約 110.9 公里；經度乘上 cos(緯度)
+    dlat = np.abs(lat - ref_lat) * 110900
+    dlon = np.abs(lon - ref_lon) * 111320 * np.cos(np.radians(ref_lat))
+    print(f"  pyproj: {pyproj_time * 1000:.1f} ms，與級數展開最大差異 {max(dlat.max(), dlon.max()) * 1000:.3f} mm")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TWD97 ↔ WGS84 座標轉換")
+    parser.add_argument('--benchmark', action='store_true', help="100 萬點轉換耗時與 pyproj 交叉檢查")
+    parser.add_argument('--points', type=int, default=1_000_000, help="benchmark 點數（預設 1,000,000）")
+    parser.add_argument('coords', nargs='*', type=float, metavar='X Y', help="TWD97 座標（可多組）")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.points)
+        return 0
+    if not args.coords or len(args.coords) % 2:
+        parser.print_help()
+        return 1
+    x, y = np.array(args.coords[0::2]), np.array(args.coords[1::2])
+    for xi, yi, lon, lat in zip(x, y, *twd97_to_wgs84(x, y)):
+        print(f"  ({xi:.2f}, {yi:.2f}) -> 經度 {lon:.6f}, 緯度 {lat:.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
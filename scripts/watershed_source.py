@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+集水區圖層讀取（欄式）
+以 pyogrio 將 shapefile / DBF 直接讀成 Arrow 表格，只讀取需要的欄位，幾何可選擇是否載入:
+
+- columns: 欄位投影，只解析指定的屬性欄位
+- geometry=True: 一併載入多邊形（shapely 物件，欄位名稱 geometry），需要 .shp
+- bbox: (xmin, ymin, xmax, ymax) 只取外框與範圍相交的集水區（座標為圖層的 TWD97）
+- 快取: 完整屬性與幾何（WKB）另存為 Feather（以 .dbf / .shp 內容雜湊為鍵），
+        來源未變動時之後的讀取直接以記憶體對應讀取欄位，不再解析 shapefile；
+        屬性與幾何來自同一份快取，後續空間運算不必再完整讀一次圖層
+
+未安裝 pyogrio 時改以 dbfread 逐筆讀取 DBF（只有屬性）
+
+用法:
+    watersheds = read_watersheds()                                   # 所有屬性
+    polygons = read_watersheds(columns=['WS_ID'], geometry=True)     # 集水區 ID + 多邊形
+"""
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from source_cache import file_hash
+
+try:
+    import pyogrio
+    HAS_PYOGRIO = True
+except ImportError:
+    HAS_PYOGRIO = False
+
+try:
+    import shapely
+    HAS_SHAPELY = True
+except ImportError:
+    HAS_SHAPELY = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_FEATHER = True
+except ImportError:
+    HAS_FEATHER = False
+
+
+WATERSHED_SHAPEFILE = Path("file/110年度全臺839子集水區範圍圖_UTF8.shp")
+CACHE_DIR = Path("data/.cache/watersheds")
+# 快取格式變動時遞增
+CACHE_VERSION = 1
+GEOMETRY_COLUMN = 'geometry'
+
+
+def source_files(path=WATERSHED_SHAPEFILE):
+    """圖層的 .shp 與 .dbf 路徑（.shp 不存在時為 None）"""
+    path = Path(path)
+    shp_path = path.with_suffix('.shp')
+    return (shp_path if shp_path.exists() else None), path.with_suffix('.dbf')
+
+
+def read_crs(path=WATERSHED_SHAPEFILE):
+    """圖層座標系統（由 .prj 判讀，例如 'EPSG:3826'；無 .prj 或無法判讀時回傳 None）"""
+    prj_path = Path(path).with_suffix('.prj')
+    if not prj_path.exists():
+        return None
+    try:
+        from pyproj import CRS
+    except ImportError:
+        return None
+    crs = CRS.from_wkt(prj_path.read_text(encoding='utf-8'))
+    epsg = crs.to_epsg()
+    return f"EPSG:{epsg}" if epsg else crs.to_wkt()
+
+
+def _require_geometry(shp_path, reason):
+    if shp_path is None:
+        raise FileNotFoundError(f"{reason}需要集水區圖層的 .shp 檔（目前只有 .dbf 屬性表）")
+    if not (HAS_PYOGRIO and HAS_SHAPELY):
+        raise ImportError(f"{reason}需要 pyogrio 與 shapely")
+
+
+def _read_pyogrio(shp_path, dbf_path, columns=None, geometry=False, bbox=None):
+    """以 pyogrio 讀成 DataFrame（幾何為 WKB bytes，欄位名稱 geometry）"""
+    source = shp_path if shp_path is not None else dbf_path
+    _, table = pyogrio.read_arrow(source, columns=columns, read_geometry=geometry, bbox=bbox)
+    df = table.to_pandas()
+    if 'wkb_geometry' in df.columns:
+        df = df.rename(columns={'wkb_geometry': GEOMETRY_COLUMN})
+    return df
+
+
+def _read_dbfread(dbf_path, columns=None):
+    """以 dbfread 逐筆讀取（未安裝 pyogrio 時使用）"""
+    from dbfread import DBF
+    df = pd.DataFrame(iter(DBF(dbf_path, encoding='utf-8')))
+    return df[list(columns)] if columns is not None else df
+
+
+class WatershedSource:
+    """集水區圖層讀取器（屬性 / 幾何共用同一份 Feather 快取）"""
+
+    def __init__(self, path=WATERSHED_SHAPEFILE, cache_dir=CACHE_DIR):
+        self.path = Path(path)
+        self.cache_dir = Path(cache_dir)
+        self.shp_path, self.dbf_path = source_files(self.path)
+
+    def content_hash(self):
+        """.dbf（與 .shp）內容雜湊"""
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        for path in (self.dbf_path, self.shp_path):
+            if path is not None:
+                digest.update(file_hash(path).encode())
+        return digest.hexdigest()
+
+    def cache_path(self):
+        """快取檔路徑: <圖層名稱>-<雜湊前 16 碼>.feather"""
+        return self.cache_dir / f"{self.dbf_path.stem}-{self.content_hash()[:16]}.feather"
+
+    def _build_cache(self, cache_path):
+        """完整讀取一次（所有屬性 + 幾何）寫出 Feather"""
+        df = _read_pyogrio(self.shp_path, self.dbf_path, geometry=self.shp_path is not None)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+            tmp_path.replace(cache_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _read_cache(self, columns, geometry):
+        cache_path = self.cache_path()
+        if not cache_path.exists():
+            self._build_cache(cache_path)
+        if columns is not None:
+            columns = list(columns) + ([GEOMETRY_COLUMN] if geometry else [])
+        elif not geometry:
+            with pa.memory_map(str(cache_path)) as source:
+                names = pa.ipc.open_file(source).schema.names
+            columns = [c for c in names if c != GEOMETRY_COLUMN]
+        return feather.read_table(cache_path, columns=columns, memory_map=True).to_pandas()
+
+    def read(self, columns=None, geometry=False, bbox=None, use_cache=True):
+        """讀取集水區
+
+        Args:
+            columns: 屬性欄位（None 為全部）
+            geometry: 是否載入多邊形（shapely 物件，欄位 geometry）
+            bbox: (xmin, ymin, xmax, ymax)，只取外框與範圍相交者（需要幾何）
+            use_cache: 是否使用 Feather 快取
+
+        Raises:
+            FileNotFoundError: 要求幾何或 bbox 但圖層缺少 .shp
+        """
+        if geometry or bbox is not None:
+            _require_geometry(self.shp_path, "載入幾何或範圍篩選")
+        if not HAS_PYOGRIO:
+            return _read_dbfread(self.dbf_path, columns)
+
+        if use_cache and HAS_FEATHER:
+            df = self._read_cache(columns, geometry or bbox is not None)
+            if bbox is not None:
+                # 與 OGR 空間篩選相同：外框與範圍相交
+                bounds = shapely.bounds(shapely.from_wkb(df[GEOMETRY_COLUMN].values))
+                xmin, ymin, xmax, ymax = bbox
+                hit = ((bounds[:, 0] <= xmax) & (bounds[:, 2] >= xmin) &
+                       (bounds[:, 1] <= ymax) & (bounds[:, 3] >= ymin))
+                df = df[hit].reset_index(drop=True)
+                if not geometry:
+                    df = df.drop(columns=GEOMETRY_COLUMN)
+        else:
+            # OGR 的空間篩選需要一併讀取幾何
+            df = _read_pyogrio(self.shp_path, self.dbf_path, columns, geometry or bbox is not None, bbox)
+            if bbox is not None and not geometry:
+                df = df.drop(columns=GEOMETRY_COLUMN)
+
+        if geometry:
+            df[GEOMETRY_COLUMN] = shapely.from_wkb(df[GEOMETRY_COLUMN].values)
+        df.attrs['crs'] = read_crs(self.path)
+        return df
+
+
+def read_watersheds(path=WATERSHED_SHAPEFILE, columns=None, geometry=False, bbox=None, use_cache=True):
+    """讀取集水區圖層（見 WatershedSource.read）"""
+    return WatershedSource(path).read(columns, geometry, bbox, use_cache)
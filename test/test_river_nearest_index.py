@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+鄰近河川索引測試（同名河川依邊界點所屬水系對應）
+
+執行:
+    python -m pytest test/test_river_nearest_index.py
+    python test/test_river_nearest_index.py
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+from river_alias_index import RiverAliasIndex, build_alias_index
+from river_nearest_index import NearestRiverIndex, load_boundary_points, resolve_river
+
+
+# 兩個水系都有「清水溪」，河川表中濁水溪的排在前面（rank 0）
+RIVERS = pd.DataFrame({
+    '河川代碼': ['1510', '151001', '1140', '114001'],
+    '河川名稱': ['濁水溪', '清水溪', '蘭陽溪', '清水溪'],
+    '階層': [1, 2, 1, 2],
+    '主流水系': ['濁水溪', '濁水溪', '蘭陽溪', '蘭陽溪'],
+})
+
+
+def _alias_index():
+    return RiverAliasIndex(build_alias_index(RIVERS))
+
+
+def _boundary_file(directory, points):
+    path = Path(directory) / 'points.json'
+    features = [{'type': 'Feature', 'properties': point} for point in points]
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}, ensure_ascii=False),
+                    encoding='utf-8')
+    return path
+
+
+def test_resolve_river_prefers_same_basin():
+    alias_index = _alias_index()
+    assert alias_index.lookup('清水溪')['code'] == '151001'
+    assert resolve_river(alias_index, '清水溪', '蘭陽溪')['code'] == '114001'
+    assert resolve_river(alias_index, '清水溪', '濁水溪')['code'] == '151001'
+    # 水系都不相同時取主要河川；名稱對應不到時為 None
+    assert resolve_river(alias_index, '清水溪', '淡水河')['code'] == '151001'
+    assert resolve_river(alias_index, '不存在溪', '蘭陽溪') is None
+
+
+def test_boundary_points_and_cross_check_use_basin():
+    with tempfile.TemporaryDirectory() as directory:
+        path = _boundary_file(directory, [
+            {'basin': '蘭陽溪', 'river': '清水溪', 'name': '宜蘭清水溪', 'twd97_x': 320000, 'twd97_y': 2730000},
+            {'basin': '濁水溪', 'river': '清水溪', 'name': '南投清水溪', 'twd97_x': 210000, 'twd97_y': 2630000},
+            {'basin': '蘭陽溪', 'river': '不存在溪', 'name': '未知', 'twd97_x': 0, 'twd97_y': 0},
+        ])
+        points, unresolved = load_boundary_points(_alias_index(), path)
+
+    assert points['河川代碼'].tolist() == ['114001', '151001']
+    assert unresolved == ['不存在溪']
+
+    # 宜蘭的測站名稱配對到蘭陽溪水系的清水溪，鄰近候選應一致
+    stations = pd.DataFrame({'TWD97M2(X坐標)': [320100.0], 'TWD97M2(Y坐標)': [2730100.0], '河川代碼': ['114001']})
+    nearest = NearestRiverIndex(points).cross_check(stations)
+    assert nearest['河川代碼'].tolist() == ['114001']
+    assert nearest['比對結果'].tolist() == ['一致']
+
+
+if __name__ == "__main__":
+    test_resolve_river_prefers_same_basin()
+    test_boundary_points_and_cross_check_use_basin()
+    print("[OK] 鄰近河川索引測試通過")